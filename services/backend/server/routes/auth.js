@@ -6,6 +6,7 @@ const mongoose = require('mongoose');
 const { OAuth2Client } = require('google-auth-library');
 const User = require('../models/User');
 const auth = require('../middleware/auth');
+const { notifyFriendAPI } = require('../services/friendApi');
 
 // Google OAuth client
 const googleClient = new OAuth2Client(process.env.GOOGLE_CLIENT_ID);
@@ -72,7 +73,11 @@ router.delete('/users/:id', auth(['admin']), async (req, res) => {
 
     // Remove user's products as cleanup
     const Product = require('../models/Products');
-    await Product.deleteMany({ seller: user._id });
+    const products = await Product.find({ seller: user._id });
+    await Product.deleteMany({ _id: { $in: products.map(p => p._id) } });
+
+    // Notify friend's API so the search service drops them too
+    await Promise.all(products.map(p => notifyFriendAPI(p, 'product-deleted')));
 
     await User.deleteOne({ _id: user._id });
     res.json({ message: 'User and associated products deleted' });
@@ -4,44 +4,10 @@ const axios = require('axios');
 const Product = require('../models/Products');
 const auth = require('../middleware/auth');
 const mapboxService = require('../services/mapboxService');
+const { notifyFriendAPI } = require('../services/friendApi');
 require('dotenv').config();
 
 
-// 🆕 HELPER FUNCTION - Notify friend's API of product changes
-async function notifyFriendAPI(productData, action) {
-  try {
-    const friendApiUrl = process.env.FRIEND_API_URL;
-
-    if (!friendApiUrl) {
-      console.log('⚠ FRIEND_API_URL not set in .env');
-      return;
-    }
-
-    // Construct webhook URL using backticks for template literals
-    const webhookUrl = friendApiUrl + '/webhook/' + action;
-    console.log('📤 Notifying friend API: POST' + webhookUrl);
-
-    const payload = {
-      product_id: productData._id.toString(),
-      title: productData.title,
-      category: productData.category,
-      description: productData.description,
-      price: productData.price,
-      quantity: productData.quantity,
-      address: productData.address,
-      phone_no: productData.phone_no
-    };
-
-    console.log('📦 Webhook payload:', payload);
-
-    const response = await axios.post(webhookUrl, payload, { timeout: 10000 });
-
-    console.log('✅' + action + ' webhook sent successfully: ', response.data);
-  } catch (err) {
-    console.error('❌ Failed to notify friend API for ' + action + ':', err.message);
-  }
-}
-
 // POST /api/products/search
 router.post('/search', auth([]), async (req, res) => {
   const { query } = req.body;
@@ -52,7 +18,7 @@ router.post('/search', auth([]), async (req, res) => {
 
     if (friendServerUrl) {
       try {
-        const requestUrl = friendServerUrl + '/recommend?query=' + encodeURIComponent(query);
+        const requestUrl = friendServerUrl + '/recommend?include_products=true&query=' + encodeURIComponent(query);
         console.log('Requesting from friend server:', requestUrl);
 
         const resp = await axios.get(requestUrl, {
@@ -74,6 +40,12 @@ router.post('/search', auth([]), async (req, res) => {
 
         console.log('Extracted product IDs:', ids);
 
+        // Search service already returns hydrated products from its cache
+        if (Array.isArray(resp.data.products) && resp.data.products.length > 0) {
+          console.log('Using ' + resp.data.products.length + ' hydrated products from friends recommendations');
+          return res.json({ products: resp.data.products, source: 'friend' });
+        }
+
         if (ids.length > 0) {
           const products = await Product.find({ _id: { $in: ids } });
           if (products.length > 0) {
@@ -329,6 +301,10 @@ router.delete('/:id', auth(['seller', 'admin']), async (req, res) => {
     }
 
     await Product.deleteOne({ _id: req.params.id });
+
+    // Notify friend's API
+    await notifyFriendAPI(product, 'product-deleted');
+
     res.json({ message: 'Product deleted successfully' });
   } catch (err) {
     console.error(err);
@@ -0,0 +1,38 @@
+const axios = require('axios');
+
+// 🆕 HELPER FUNCTION - Notify friend's API of product changes
+async function notifyFriendAPI(productData, action) {
+  try {
+    const friendApiUrl = process.env.FRIEND_API_URL;
+
+    if (!friendApiUrl) {
+      console.log('⚠ FRIEND_API_URL not set in .env');
+      return;
+    }
+
+    // Construct webhook URL using backticks for template literals
+    const webhookUrl = friendApiUrl + '/webhook/' + action;
+    console.log('📤 Notifying friend API: POST' + webhookUrl);
+
+    const payload = {
+      product_id: productData._id.toString(),
+      title: productData.title,
+      category: productData.category,
+      description: productData.description,
+      price: productData.price,
+      quantity: productData.quantity,
+      address: productData.address,
+      phone_no: productData.phone_no
+    };
+
+    console.log('📦 Webhook payload:', payload);
+
+    const response = await axios.post(webhookUrl, payload, { timeout: 10000 });
+
+    console.log('✅' + action + ' webhook sent successfully: ', response.data);
+  } catch (err) {
+    console.error('❌ Failed to notify friend API for ' + action + ':', err.message);
+  }
+}
+
+module.exports = { notifyFriendAPI };
@@ -16,13 +16,94 @@ class Settings:
     MONGODB_DATABASE: str = os.getenv("MONGODB_DATABASE", "product")
     MONGODB_COLLECTION: str = os.getenv("MONGODB_COLLECTION", "products")
     
+    # MongoDB connection pool (shared by sync callers and the async facade)
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+    MONGODB_MIN_POOL_SIZE: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", "5"))
+    MONGODB_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "60000"))
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "5000"))
+    # Worker threads used to run PyMongo calls off the event loop
+    MONGODB_IO_THREADS: int = int(os.getenv("MONGODB_IO_THREADS", "16"))
+    
     # Gemini AI
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
     
+    # Speculative chat search: start searching the user's words while Gemini
+    # is still deciding, reuse the results if its tool query is close enough
+    CHAT_SPECULATIVE_SEARCH: bool = os.getenv("CHAT_SPECULATIVE_SEARCH", "false").lower() in ("1", "true", "yes")
+    CHAT_SPECULATIVE_MIN_SIMILARITY: float = float(os.getenv("CHAT_SPECULATIVE_MIN_SIMILARITY", "0.85"))
+    # Number of recent user messages the speculative query is built from
+    CHAT_SPECULATIVE_HISTORY: int = int(os.getenv("CHAT_SPECULATIVE_HISTORY", "3"))
+    
+    # Chat session store
+    CHAT_SESSION_TTL_MINUTES: int = int(os.getenv("CHAT_SESSION_TTL_MINUTES", "60"))
+    CHAT_MAX_SESSIONS: int = int(os.getenv("CHAT_MAX_SESSIONS", "10000"))
+    CHAT_SESSION_SHARDS: int = int(os.getenv("CHAT_SESSION_SHARDS", "16"))
+    CHAT_SESSION_SWEEP_SECONDS: float = float(os.getenv("CHAT_SESSION_SWEEP_SECONDS", "30"))
+    # "memory" (per process) or "disk" (survives restarts, shared by workers)
+    CHAT_SESSION_BACKEND: str = os.getenv("CHAT_SESSION_BACKEND", "memory")
+    CHAT_SESSION_DIR: str = os.getenv("CHAT_SESSION_DIR", str(Path(__file__).resolve().parent.parent.parent / ".chat_sessions"))
+    # Per-session caps on model history (Content entries) and visible messages
+    CHAT_MAX_HISTORY_CONTENTS: int = int(os.getenv("CHAT_MAX_HISTORY_CONTENTS", "40"))
+    CHAT_MAX_MESSAGES: int = int(os.getenv("CHAT_MAX_MESSAGES", "100"))
+    
+    # Prompt size per chat turn: older turns beyond the budget are summarised
+    CHAT_CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "1500"))
+    CHAT_CONTEXT_SUMMARY_CHARS: int = int(os.getenv("CHAT_CONTEXT_SUMMARY_CHARS", "600"))
+    # Store system prompt + tools as Gemini cached content (needs a model and
+    # prompt size that support explicit caching; falls back to inline)
+    CHAT_CONTEXT_CACHING: bool = os.getenv("CHAT_CONTEXT_CACHING", "false").lower() in ("1", "true", "yes")
+    CHAT_CONTEXT_CACHE_TTL_SECONDS: int = int(os.getenv("CHAT_CONTEXT_CACHE_TTL_SECONDS", "3600"))
+    # First retry delay after a transient cache creation failure (doubles per failure)
+    CHAT_CONTEXT_CACHE_RETRY_SECONDS: float = float(os.getenv("CHAT_CONTEXT_CACHE_RETRY_SECONDS", "60"))
+    
+    # /chat/start greetings come from an in-memory pool. 0 keeps the built-in
+    # canned greetings (fully offline); otherwise the model rewrites the pool
+    # in the background at this interval
+    CHAT_GREETING_REFRESH_SECONDS: float = float(os.getenv("CHAT_GREETING_REFRESH_SECONDS", "0"))
+    CHAT_GREETING_POOL_SIZE: int = int(os.getenv("CHAT_GREETING_POOL_SIZE", "5"))
+    
+    # Cache of search_and_recommend_products results by normalized query
+    # (0 disables). Below 1.0, similarity also matches near-duplicate queries
+    CHAT_TOOL_CACHE_SIZE: int = int(os.getenv("CHAT_TOOL_CACHE_SIZE", "512"))
+    CHAT_TOOL_CACHE_SIMILARITY: float = float(os.getenv("CHAT_TOOL_CACHE_SIMILARITY", "1.0"))
+    
     # Model
     MODEL_NAME: str = "all-MiniLM-L6-v2"
     EMBEDDING_DIMENSION: int = 384
+    # Query encoder inference: "torch" or "onnx" (ONNX Runtime, needs
+    # sentence-transformers[onnx]); optional dynamic int8 ONNX quantization
+    # for "arm64", "avx2", "avx512" or "avx512_vnni" CPUs
+    ENCODER_BACKEND: str = os.getenv("ENCODER_BACKEND", "torch")
+    ENCODER_ONNX_QUANTIZATION: str = os.getenv("ENCODER_ONNX_QUANTIZATION", "")
+    ENCODER_THREADS: int = int(os.getenv("ENCODER_THREADS", "0"))
+    ENCODER_ONNX_DIR: str = os.getenv("ENCODER_ONNX_DIR", str(Path(__file__).resolve().parent.parent.parent / "cache" / "onnx"))
+    # Encode a few sample queries at startup so the first request is not slow
+    ENCODER_WARMUP: bool = os.getenv("ENCODER_WARMUP", "true").lower() in ("1", "true", "yes")
+    # In-memory semantic index: "none" (float32), "int8" or "binary" (sign
+    # bits); quantized modes re-rank the top candidates from int8 codes +
+    # residuals
+    EMBEDDING_QUANTIZATION: str = os.getenv("EMBEDDING_QUANTIZATION", "none")
+    EMBEDDING_RERANK_CANDIDATES: int = int(os.getenv("EMBEDDING_RERANK_CANDIDATES", "200"))
+    # Format new embeddings are written to MongoDB in: "float" or "int8"
+    EMBEDDING_STORAGE: str = os.getenv("EMBEDDING_STORAGE", "float")
+    
+    # Startup: answer searches with BM25 only while the encoder is loading
+    # (otherwise they get 503 until /health/ready passes)
+    SEARCH_KEYWORD_ONLY_WHILE_WARMING: bool = os.getenv("SEARCH_KEYWORD_ONLY_WHILE_WARMING", "true").lower() in ("1", "true", "yes")
+    
+    # Per-request stage timing: send a Server-Timing header on every search
+    # (otherwise only with debug=true), and log searches slower than
+    # SEARCH_SLOW_QUERY_MS (0 disables) for a sampled fraction of requests
+    SEARCH_SERVER_TIMING: bool = os.getenv("SEARCH_SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+    SEARCH_SLOW_QUERY_MS: float = float(os.getenv("SEARCH_SLOW_QUERY_MS", "500"))
+    SEARCH_SLOW_QUERY_SAMPLE_RATE: float = float(os.getenv("SEARCH_SLOW_QUERY_SAMPLE_RATE", "0.1"))
+    SEARCH_SLOW_QUERY_LOG_SIZE: int = int(os.getenv("SEARCH_SLOW_QUERY_LOG_SIZE", "100"))
+    
+    # /admin/slow-queries, /admin/profile and /admin/tracemalloc/* (off by
+    # default: they expose queries and code paths, and profiling costs CPU)
+    ADMIN_PROFILING: bool = os.getenv("ADMIN_PROFILING", "false").lower() in ("1", "true", "yes")
+    PROFILE_MAX_SECONDS: float = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
     
     # API
     API_TITLE: str = "Construction Materials Semantic Search"
@@ -1,28 +1,49 @@
 """MongoDB database operations"""
 import time
-import dns.resolver
-from typing import Dict, List, Optional
-from pymongo import MongoClient
-from pymongo.errors import AutoReconnect, ConnectionFailure
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
 from bson import ObjectId
+from bson.errors import InvalidId
 from app.core.config import settings
 
-# Force Google DNS to fix flaky local DNS resolution for MongoDB Atlas SRV records
-dns.resolver.default_resolver = dns.resolver.Resolver(configure=False)
-dns.resolver.default_resolver.nameservers = ['8.8.8.8', '8.8.4.4', '1.1.1.1']
+# pymongo and dnspython are imported on first connect, not at import time
+if TYPE_CHECKING:
+    from pymongo import MongoClient
+
+_dns_configured = False
+
+
+def _configure_dns() -> None:
+    """Force Google DNS to fix flaky local DNS resolution for MongoDB Atlas SRV records"""
+    global _dns_configured
+    if _dns_configured:
+        return
+    import dns.resolver
+    
+    dns.resolver.default_resolver = dns.resolver.Resolver(configure=False)
+    dns.resolver.default_resolver.nameservers = ['8.8.8.8', '8.8.4.4', '1.1.1.1']
+    _dns_configured = True
 
 
 class DatabaseManager:
     """Manages MongoDB database operations"""
     
     def __init__(self):
-        self.client: Optional[MongoClient] = None
+        self.client: Optional["MongoClient"] = None
         self.db = None
         self.collection = None
+        # Awaitable facade for request-path lookups (see AsyncDatabaseManager)
+        self.aio = AsyncDatabaseManager(self)
     
     def connect(self, max_retries: int = 5, retry_delay: int = 3) -> None:
         """Establish MongoDB connection with retry logic"""
+        from pymongo import MongoClient
+        from pymongo.errors import AutoReconnect, ConnectionFailure
+        
         settings.validate()
+        _configure_dns()
         for attempt in range(1, max_retries + 1):
             try:
                 self.client = MongoClient(
@@ -30,6 +51,10 @@ class DatabaseManager:
                     serverSelectionTimeoutMS=15000,
                     connectTimeoutMS=15000,
                     socketTimeoutMS=30000,
+                    maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                    minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                    maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+                    waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
                     retryReads=True,
                     retryWrites=True,
                 )
@@ -49,11 +74,14 @@ class DatabaseManager:
     
     def disconnect(self) -> None:
         """Close MongoDB connection"""
+        self.aio.shutdown()
         if self.client:
             self.client.close()
     
     def get_all_materials(self, max_retries: int = 5, retry_delay: int = 5) -> List[Dict]:
         """Retrieve all materials from database (excluding special index documents)"""
+        from pymongo.errors import AutoReconnect, ConnectionFailure
+        
         if self.collection is None:
             raise RuntimeError("Database not connected")
         
@@ -83,6 +111,21 @@ class DatabaseManager:
             {"$set": {"embedding": embedding}}
         )
     
+    def update_embedding_fields(
+        self,
+        material_id: str,
+        fields: Dict[str, Any],
+        unset: Sequence[str] = ()
+    ) -> None:
+        """Set embedding fields in one format and remove those of other formats"""
+        if self.collection is None:
+            raise RuntimeError("Database not connected")
+        
+        update: Dict[str, Any] = {"$set": fields}
+        if unset:
+            update["$unset"] = {field: "" for field in unset}
+        self.collection.update_one({"_id": ObjectId(material_id)}, update)
+    
     def find_by_id(self, material_id: str) -> Optional[Dict]:
         """Find material by ID"""
         if self.collection is None:
@@ -92,3 +135,81 @@ class DatabaseManager:
         if doc:
             doc['_id'] = str(doc['_id'])
         return doc
+    
+    def find_many_by_ids(
+        self,
+        material_ids: List[str],
+        projection: Optional[Dict[str, Any]] = None
+    ) -> List[Dict]:
+        """
+        Find several materials with a single $in query
+        
+        Results follow the order of ``material_ids`` (i.e. ranking order);
+        malformed or missing IDs are skipped.
+        """
+        if self.collection is None:
+            raise RuntimeError("Database not connected")
+        
+        object_ids = []
+        for material_id in material_ids:
+            try:
+                object_ids.append(ObjectId(material_id))
+            except (InvalidId, TypeError):
+                continue
+        
+        if not object_ids:
+            return []
+        
+        docs_by_id = {}
+        for doc in self.collection.find({"_id": {"$in": object_ids}}, projection):
+            doc['_id'] = str(doc['_id'])
+            docs_by_id[doc['_id']] = doc
+        
+        return [docs_by_id[material_id] for material_id in material_ids if material_id in docs_by_id]
+
+
+class AsyncDatabaseManager:
+    """
+    Awaitable facade over a DatabaseManager
+    
+    PyMongo is synchronous, so each call is dispatched to a dedicated thread
+    pool sized to the connection pool. Coroutines await the result instead of
+    blocking the event loop on a Mongo round trip.
+    """
+    
+    def __init__(self, manager: DatabaseManager):
+        self._manager = manager
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=min(settings.MONGODB_IO_THREADS, settings.MONGODB_MAX_POOL_SIZE),
+                thread_name_prefix="mongo-io",
+            )
+        return self._executor
+    
+    async def run(self, func, *args, **kwargs) -> Any:
+        """Run any blocking database callable on the Mongo I/O pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), functools.partial(func, *args, **kwargs)
+        )
+    
+    async def find_by_id(self, material_id: str) -> Optional[Dict]:
+        """Find material by ID without blocking the event loop"""
+        return await self.run(self._manager.find_by_id, material_id)
+    
+    async def find_many_by_ids(
+        self,
+        material_ids: List[str],
+        projection: Optional[Dict[str, Any]] = None
+    ) -> List[Dict]:
+        """Fetch several materials in one round trip, preserving ranking order"""
+        return await self.run(self._manager.find_many_by_ids, material_ids, projection)
+    
+    def shutdown(self) -> None:
+        """Release the I/O threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,33 @@
+"""Fast JSON encoding for hot-path responses"""
+import json
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+# fastapi is only needed to build responses; keeps the BM25 / cache
+# modules importable without it
+if TYPE_CHECKING:
+    from fastapi import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib fallback
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode ``obj`` as compact UTF-8 JSON (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def json_response(body: bytes, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> "Response":
+    """
+    Wrap an already-encoded JSON body
+
+    Returning a Response directly bypasses FastAPI's response_model
+    validation and re-encoding; the declared response_model still
+    documents the shape in OpenAPI.
+    """
+    from fastapi import Response
+
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,285 @@
+"""In-process metrics with Prometheus text exposition
+
+Counters, gauges and histograms hold plain floats behind a per-series
+lock, so recording costs a bisect and two additions - cheap enough to
+leave on in the search hot path. Gauges can instead read a callback at
+scrape time (index sizes, cache entries). ``render()`` returns the
+Prometheus text format served at GET /metrics.
+
+Values are per process: with several uvicorn workers, scrape each one
+(or aggregate) as usual for multi-process Prometheus targets.
+"""
+import bisect
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds: sub-millisecond numpy stages up to multi-second LLM calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+_registry: List["_Metric"] = []
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Value:
+    """One counter / gauge series"""
+
+    __slots__ = ("_lock", "_value", "_function")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = float(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value from ``function`` at scrape time instead"""
+        self._function = function
+
+    def get(self) -> float:
+        if self._function is not None:
+            return float(self._function())
+        return self._value
+
+
+class _HistogramValue:
+    """One histogram series: per-bucket counts plus sum"""
+
+    __slots__ = ("_lock", "_upper_bounds", "_counts", "_sum")
+
+    def __init__(self, upper_bounds: Sequence[float]):
+        self._lock = threading.Lock()
+        self._upper_bounds = upper_bounds
+        # Last slot is the +Inf bucket
+        self._counts = [0] * (len(upper_bounds) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        bucket = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self._counts[bucket] += 1
+            self._sum += value
+
+    def time(self) -> "_Timer":
+        """Observe the duration of the ``with`` block in seconds"""
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class _Timer:
+    """Context manager recording elapsed seconds into a histogram series"""
+
+    __slots__ = ("_series", "_started")
+
+    def __init__(self, series: _HistogramValue):
+        self._series = series
+        self._started = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._series.observe(time.perf_counter() - self._started)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values) -> object:
+        """The series for these label values (create on first use)"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _label_str(self, key: Tuple[str, ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def _render_child(self, key: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{self._label_str(key)} {_format_value(child.get())}"]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            try:
+                lines.extend(self._render_child(key, child))
+            except Exception:
+                # A failing gauge callback drops its series, not the scrape
+                continue
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be read from a callback"""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self.labels().set_function(function)
+
+
+class Histogram(_Metric):
+    """Distribution of observations (latencies) in cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _render_child(self, key: Tuple[str, ...], child: _HistogramValue) -> List[str]:
+        counts, total = child.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            cumulative += count
+            le = self._label_str(key, (("le", _format_value(bound)),))
+            lines.append(f"{self.name}_bucket{le} {cumulative}")
+        labels = self._label_str(key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render() -> bytes:
+    """Every registered metric in Prometheus text format"""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+# ── Instruments ────────────────────────────────────────────────────────────
+
+SEARCH_STAGE_SECONDS = Histogram(
+    "search_stage_seconds",
+    "Hybrid search time per stage (prefilter, encode, semantic, bm25, fusion, serialize)",
+    ["stage"],
+)
+REQUEST_SECONDS = Histogram(
+    "search_request_duration_seconds",
+    "End-to-end handler latency per endpoint",
+    ["endpoint"],
+)
+REQUEST_ERRORS = Counter(
+    "search_request_errors_total",
+    "Requests that failed with a server error, per endpoint",
+    ["endpoint"],
+)
+WEBHOOK_EVENTS = Counter(
+    "search_webhook_events_total",
+    "Product webhooks by event and outcome (success, rejected, failure)",
+    ["event", "outcome"],
+)
+
+MATERIALS_LOADED = Gauge("search_materials_loaded", "Materials in the semantic index")
+KEYWORD_DOCUMENTS = Gauge("search_keyword_documents", "Documents in the BM25 index")
+BM25_POSTINGS = Gauge("search_bm25_postings", "Postings (term, document pairs) in the BM25 index")
+EMBEDDING_INDEX_BYTES = Gauge("search_embedding_index_bytes", "Memory held by the in-memory embedding index")
+PRODUCT_CACHE_ENTRIES = Gauge("search_product_cache_entries", "Products in the pre-encoded response cache")
+ENGINE_READY = Gauge("search_engine_ready", "1 once the encoder and both indexes are loaded")
+
+CHAT_TURN_SECONDS = Histogram(
+    "chat_turn_duration_seconds",
+    "Chat turn latency end to end (message, stream)",
+    ["mode"],
+)
+CHAT_LLM_SECONDS = Histogram(
+    "chat_llm_call_duration_seconds",
+    "Gemini generate call latency (reply, summary); streams until fully drained",
+    ["call"],
+)
+CHAT_TOOL_SECONDS = Histogram(
+    "chat_tool_duration_seconds",
+    "Product search tool execution time, including cache and speculation",
+)
+CHAT_TOOL_CACHE = Counter(
+    "chat_tool_cache_lookups_total",
+    "Tool-result cache lookups by status (hit, semantic_hit, miss)",
+    ["status"],
+)
+CHAT_SESSIONS = Gauge("chat_sessions", "Chat sessions held in this process")
@@ -0,0 +1,207 @@
+"""On-demand profiling of a running worker process
+
+``StackSampler`` is a pure-Python sampling profiler: a background thread
+reads every thread's current stack (``sys._current_frames()``) at a fixed
+interval for a bounded window. Unlike cProfile it sees the event loop and
+the ``asyncio.to_thread`` workers at once and adds no per-call overhead to
+the code being profiled. Results are collapsed stacks ("folded" format,
+one ``frame;frame;frame count`` line per unique stack) that flamegraph.pl,
+inferno or speedscope render directly.
+
+``AllocationTracker`` wraps ``tracemalloc``: each snapshot is diffed
+against the previous one, so calling it across a burst of requests shows
+which source lines kept memory (chat sessions, index appends, caches).
+"""
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+
+# Leaf frames of threads blocked waiting for work (event loop select,
+# idle executor workers, condition waits); dropped unless include_idle
+IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+}
+
+_SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to the service or site-packages, for readable frames"""
+    if filename.startswith(_SERVICE_DIR):
+        return os.path.relpath(filename, _SERVICE_DIR)
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return os.path.basename(filename)
+
+
+class StackSampler:
+    """Time-boxed sampling profiler over all threads of this process"""
+
+    def __init__(self, interval: float = 0.01, max_depth: int = 64, include_idle: bool = False):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.include_idle = include_idle
+        self.samples = 0
+        self.duration = 0.0
+        self.stacks: Counter = Counter()
+        self._labels: Dict[Any, str] = {}
+
+    def _frame_label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _is_idle(self, frame) -> bool:
+        code = frame.f_code
+        return (os.path.basename(code.co_filename), code.co_name) in IDLE_LEAVES
+
+    def sample_once(self, skip_ident: int) -> None:
+        """Record the current stack of every thread but ``skip_ident``"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == skip_ident:
+                continue
+            if not self.include_idle and self._is_idle(frame):
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f"thread-{ident}"))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self, seconds: float) -> "StackSampler":
+        """Sample for ``seconds`` (blocking; call from a worker thread)"""
+        own = threading.get_ident()
+        started = time.perf_counter()
+        deadline = started + seconds
+        while True:
+            tick = time.perf_counter()
+            if tick >= deadline:
+                break
+            self.sample_once(own)
+            # Fixed-rate schedule; sampling cost doesn't stretch the interval
+            time.sleep(max(0.0, self.interval - (time.perf_counter() - tick)))
+        self.duration = time.perf_counter() - started
+        return self
+
+    def collapsed(self) -> str:
+        """Folded stacks, heaviest first (input for flamegraph.pl / speedscope)"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self, limit: int = 25) -> Dict[str, Any]:
+        """Sample counts plus the hottest functions by self and total samples"""
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            if frames:
+                self_counts[frames[-1]] += count
+            for frame in set(frames):
+                total_counts[frame] += count
+        stack_samples = sum(self.stacks.values()) or 1
+        return {
+            "duration_s": round(self.duration, 3),
+            "interval_ms": round(self.interval * 1000, 3),
+            "samples": self.samples,
+            "stack_samples": sum(self.stacks.values()),
+            "top_self": [
+                {"frame": frame, "samples": count, "percent": round(100 * count / stack_samples, 1)}
+                for frame, count in self_counts.most_common(limit)
+            ],
+            "top_total": [
+                {"frame": frame, "samples": count, "percent": round(100 * count / stack_samples, 1)}
+                for frame, count in total_counts.most_common(limit)
+            ],
+        }
+
+
+class AllocationTracker:
+    """tracemalloc snapshots diffed against the previous snapshot"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous: Optional[tracemalloc.Snapshot] = None
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1) -> None:
+        """Start tracing allocations (costs memory and CPU while on)"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+            self._previous = None
+
+    def stop(self) -> None:
+        with self._lock:
+            tracemalloc.stop()
+            self._previous = None
+
+    def _take_snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    def snapshot(self, group_by: str = "lineno", limit: int = 25) -> Dict[str, Any]:
+        """
+        Take a snapshot and diff it against the previous one
+
+        Args:
+            group_by: "lineno", "filename" or "traceback"
+            limit: Number of entries returned, largest growth first
+
+        Returns:
+            Traced memory totals and the top entries; the first snapshot
+            after start() has no baseline and lists current allocations
+        """
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        with self._lock:
+            snapshot = self._take_snapshot()
+            previous, self._previous = self._previous, snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        report: Dict[str, Any] = {
+            "traced_kb": round(current / 1024, 1),
+            "peak_kb": round(peak / 1024, 1),
+            "baseline": previous is not None,
+        }
+        if previous is None:
+            stats = snapshot.statistics(group_by)[:limit]
+            report["top"] = [self._stat(stat) for stat in stats]
+        else:
+            stats = snapshot.compare_to(previous, group_by)[:limit]
+            report["top"] = [
+                dict(self._stat(stat), size_diff_kb=round(stat.size_diff / 1024, 1), count_diff=stat.count_diff)
+                for stat in stats
+            ]
+        return report
+
+    @staticmethod
+    def _stat(stat) -> Dict[str, Any]:
+        frames: List[str] = [f"{_short_path(frame.filename)}:{frame.lineno}" for frame in stat.traceback]
+        return {
+            "location": frames[0] if len(frames) == 1 else frames,
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count,
+        }
+
+
+allocations = AllocationTracker()
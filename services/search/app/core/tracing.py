@@ -0,0 +1,149 @@
+"""Per-request stage timing for search requests
+
+Search stages (encode, semantic, bm25, fusion, serialize, ...) are timed
+with ``Stage.time()``, which always feeds the stage histogram in /metrics
+and, when the current request is being traced, also adds the elapsed time
+to that request's ``RequestTrace``. The trace lives in a context variable,
+so it follows the request into ``asyncio.to_thread`` workers without being
+passed through the engines.
+
+A request is traced when it asks for a timing breakdown (``debug``), when
+SEARCH_SERVER_TIMING is on, or when it is sampled for the slow-query log
+(SEARCH_SLOW_QUERY_MS / SEARCH_SLOW_QUERY_SAMPLE_RATE). Untraced requests
+pay one context variable lookup per stage.
+"""
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.encoding import dumps
+from app.core.metrics import SEARCH_STAGE_SECONDS
+
+
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("request_trace", default=None)
+
+# Most recent slow-query records, newest last (GET /admin/slow-queries)
+slow_queries: Deque[Dict[str, Any]] = deque(maxlen=settings.SEARCH_SLOW_QUERY_LOG_SIZE)
+
+
+class RequestTrace:
+    """Stage timings collected for one request"""
+
+    __slots__ = ("stages", "total", "_started", "_token")
+
+    def __init__(self):
+        # Stage -> seconds, summed if a stage runs more than once
+        self.stages: Dict[str, float] = {}
+        self.total = 0.0
+        self._started = time.perf_counter()
+        self._token = None
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def breakdown(self) -> Dict[str, float]:
+        """Milliseconds per stage plus ``total`` (wall time of the request)"""
+        timings = {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()}
+        timings["total"] = round(self.total * 1000, 3)
+        return timings
+
+    def server_timing(self) -> str:
+        """Value for the ``Server-Timing`` response header"""
+        return ", ".join(f"{stage};dur={ms}" for stage, ms in self.breakdown().items())
+
+
+class _StageTimer:
+    """Context manager timing one run of a stage"""
+
+    __slots__ = ("_stage", "_series", "_started")
+
+    def __init__(self, stage: str, series):
+        self._stage = stage
+        self._series = series
+        self._started = 0.0
+
+    def __enter__(self) -> "_StageTimer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        elapsed = time.perf_counter() - self._started
+        self._series.observe(elapsed)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(self._stage, elapsed)
+
+
+class Stage:
+    """A named search stage, timed into /metrics and the active request trace"""
+
+    __slots__ = ("name", "_series")
+
+    def __init__(self, name: str):
+        self.name = name
+        self._series = SEARCH_STAGE_SECONDS.labels(name)
+
+    def time(self) -> _StageTimer:
+        return _StageTimer(self.name, self._series)
+
+
+def begin(debug: bool = False) -> Optional[RequestTrace]:
+    """
+    Start tracing the current request if it should be traced
+
+    Args:
+        debug: The caller asked for a timing breakdown
+
+    Returns:
+        The active trace, or None when the request is not traced
+    """
+    sampled = (
+        settings.SEARCH_SLOW_QUERY_MS > 0
+        and random.random() < settings.SEARCH_SLOW_QUERY_SAMPLE_RATE
+    )
+    if not (debug or sampled or settings.SEARCH_SERVER_TIMING):
+        return None
+    trace = RequestTrace()
+    trace._token = _current_trace.set(trace)
+    return trace
+
+
+def finish(trace: Optional[RequestTrace], endpoint: str, query: Any, params: Dict[str, Any]) -> None:
+    """
+    Stop tracing and log the request if it was slower than SEARCH_SLOW_QUERY_MS
+
+    Args:
+        trace: Result of begin() (None is a no-op)
+        endpoint: Endpoint name used in /metrics
+        query: Search query text
+        params: Remaining search parameters, logged with slow queries
+    """
+    if trace is None:
+        return
+    trace.total = time.perf_counter() - trace._started
+    if trace._token is not None:
+        _current_trace.reset(trace._token)
+        trace._token = None
+
+    threshold_ms = settings.SEARCH_SLOW_QUERY_MS
+    if threshold_ms <= 0 or trace.total * 1000 < threshold_ms:
+        return
+    record = {
+        "timestamp": datetime.now().isoformat(),
+        "endpoint": endpoint,
+        "query": query,
+        "params": params,
+        "timings_ms": trace.breakdown(),
+    }
+    slow_queries.append(record)
+    print(f"🐢 Slow query ({record['timings_ms']['total']} ms): {dumps(record).decode()}")
+
+
+def recent_slow_queries(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Logged slow queries, newest first"""
+    records = list(reversed(slow_queries))
+    return records if limit is None else records[:limit]
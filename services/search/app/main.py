@@ -1,51 +1,207 @@
 """FastAPI application for construction materials semantic search"""
-from typing import Optional
+import asyncio
+import functools
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from datetime import datetime
 
+from app.core import metrics, tracing
 from app.core.config import settings
+from app.core.encoding import dumps, json_response
 from app.models.schemas import (
-    Material, SearchRequest, SearchResponse, HealthResponse, HybridSearchRequest,
-    WebhookProductAdded, WebhookProductUpdated 
+    Material, SearchRequest, SearchResponse, HealthResponse, HybridSearchRequest, SearchFilters, GeoQuery,
+    BatchSearchRequest, BatchSearchResponse,
+    WebhookProductAdded, WebhookProductUpdated, WebhookProductDeleted
 )
 from app.services.hybrid_search import HybridSearchEngine
-from app.services.gemini_chat import GeminiChatService
+from app.services.quantization import has_embedding
 from app.routers.chat import router as chat_router, set_chat_service
+from app.routers.admin import router as admin_router
+
+# google-genai is imported by the chat service in the background at startup
+if TYPE_CHECKING:
+    from app.services.gemini_chat import GeminiChatService
 
 
 # Global service instances
 search_engine: Optional[HybridSearchEngine] = None
-chat_service: Optional[GeminiChatService] = None
+chat_service: Optional["GeminiChatService"] = None
+startup_task: Optional[asyncio.Task] = None
+chat_startup_task: Optional[asyncio.Task] = None
 
+# Serialises index mutations (webhooks, cache rebuilds), which run off the event loop
+index_lock = asyncio.Lock()
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Manage application lifecycle"""
-    global search_engine
+
+def _startup_done(task: asyncio.Task) -> None:
+    """Log a failed background startup (state is already 'failed')"""
+    if not task.cancelled() and task.exception() is not None:
+        print(f"❌ Search engine startup failed: {task.exception()}")
+
+
+def _require_engine(ready: bool = False) -> HybridSearchEngine:
+    """
+    Return the search engine or raise 503 while it is still starting
     
-    print("Initializing hybrid search engine...")
-    search_engine = HybridSearchEngine()
-    search_engine.initialize()
-    print("Search engine ready!")
+    Args:
+        ready: Also require the encoder (index mutations, full hybrid
+            search); otherwise BM25-only serving during warm-up is enough
+    """
+    if not search_engine or search_engine.state == "failed":
+        raise HTTPException(status_code=503, detail="Search engine not initialized")
+    if not (search_engine.semantic_ready if ready else search_engine.accepting_queries):
+        raise HTTPException(
+            status_code=503,
+            detail=f"Search engine is {search_engine.state}",
+            headers={"Retry-After": "5"}
+        )
+    return search_engine
+
+
+_SERIALIZE_STAGE = tracing.Stage("serialize")
+
+
+def _timed_endpoint(endpoint: str):
+    """Record handler latency, and server errors, for ``endpoint`` in /metrics"""
+    latency = metrics.REQUEST_SECONDS.labels(endpoint)
+    errors = metrics.REQUEST_ERRORS.labels(endpoint)
     
-    # Initialise Gemini chat service
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await handler(*args, **kwargs)
+            except HTTPException as e:
+                if e.status_code >= 500:
+                    errors.inc()
+                raise
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def _traced_response(body: bytes, trace: Optional[tracing.RequestTrace], debug: bool) -> Response:
+    """
+    JSON response for a traced search
+    
+    Adds a Server-Timing header (debug or SEARCH_SERVER_TIMING) and, with
+    debug, splices the stage breakdown into the body as ``timings``.
+    """
+    if trace is None:
+        return json_response(body)
+    headers = None
+    if debug or settings.SEARCH_SERVER_TIMING:
+        headers = {"Server-Timing": trace.server_timing()}
+    if debug:
+        body = body[:-1] + b',"timings":' + dumps(trace.breakdown()) + b"}"
+    return json_response(body, headers=headers)
+
+
+def _counted_webhook(event: str):
+    """Count webhook calls by outcome: success, rejected (4xx) or failure"""
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            try:
+                result = await handler(*args, **kwargs)
+            except HTTPException as e:
+                outcome = "rejected" if e.status_code < 500 else "failure"
+                metrics.WEBHOOK_EVENTS.labels(event, outcome).inc()
+                raise
+            except Exception:
+                metrics.WEBHOOK_EVENTS.labels(event, "failure").inc()
+                raise
+            metrics.WEBHOOK_EVENTS.labels(event, "success").inc()
+            return result
+        return wrapper
+    return decorator
+
+
+def _search_params(filters: Optional[SearchFilters], geo: Optional[GeoQuery], **params) -> Dict[str, Any]:
+    """Search parameters as logged with slow queries (unset filters omitted)"""
+    if filters is not None:
+        params["filters"] = filters.model_dump(exclude_none=True)
+    if geo is not None:
+        params["geo"] = geo.model_dump(exclude_none=True)
+    return params
+
+
+def _bind_gauges(engine: HybridSearchEngine) -> None:
+    """Point the index-size gauges at the live engine (read at scrape time)"""
+    metrics.MATERIALS_LOADED.set_function(lambda: engine.semantic_engine.material_count)
+    metrics.KEYWORD_DOCUMENTS.set_function(lambda: len(engine.keyword_engine.docmap))
+    metrics.BM25_POSTINGS.set_function(engine.keyword_engine.postings_count)
+    metrics.EMBEDDING_INDEX_BYTES.set_function(lambda: engine.semantic_engine.index.nbytes)
+    metrics.PRODUCT_CACHE_ENTRIES.set_function(lambda: len(engine.product_cache))
+    metrics.ENGINE_READY.set_function(lambda: 1.0 if engine.semantic_ready else 0.0)
+    metrics.CHAT_SESSIONS.set_function(lambda: len(chat_service.sessions) if chat_service else 0)
+
+
+def _create_chat_service() -> "GeminiChatService":
+    """Import and initialise the Gemini chat service (runs in a worker thread)"""
+    from app.services.gemini_chat import GeminiChatService
+    
+    service = GeminiChatService()
+    service.initialize()
+    return service
+
+
+async def _start_chat_service() -> None:
+    """Bring up the chat advisor; /chat endpoints return 503 until it is set"""
     global chat_service
     try:
-        chat_service = GeminiChatService()
-        chat_service.initialize()
-        chat_service.set_search_engine(search_engine)
-        set_chat_service(chat_service)
+        service = await asyncio.to_thread(_create_chat_service)
+        service.set_search_engine(search_engine)
+        service.start()
+        chat_service = service
+        set_chat_service(service)
         print("✅ Chat advisor ready!")
     except Exception as e:
         print(f"⚠️  Chat advisor disabled (Gemini init failed): {e}")
-        chat_service = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Manage application lifecycle
+    
+    Search engine startup (model, catalog, BM25) and the chat advisor run
+    in the background so the app accepts connections immediately;
+    /health/ready reports when search has finished.
+    """
+    global search_engine, startup_task, chat_startup_task
+    
+    search_engine = HybridSearchEngine()
+    _bind_gauges(search_engine)
+    startup_task = asyncio.create_task(asyncio.to_thread(search_engine.initialize))
+    startup_task.add_done_callback(_startup_done)
+    
+    # Initialise Gemini chat service
+    chat_startup_task = asyncio.create_task(_start_chat_service())
     
     yield
     
     print("Shutting down...")
+    if chat_startup_task and not chat_startup_task.done():
+        await chat_startup_task
+    if chat_service:
+        await chat_service.stop()
+    if startup_task and not startup_task.done():
+        # The worker thread can't be interrupted; let it finish first
+        try:
+            await startup_task
+        except Exception:
+            pass
     if search_engine:
         search_engine.shutdown()
 
@@ -80,6 +236,9 @@ app.add_middleware(
 # Register chat advisor router
 app.include_router(chat_router)
 
+# Slow-query log and on-demand profiling (disabled unless ADMIN_PROFILING=true)
+app.include_router(admin_router)
+
 
 @app.get("/", tags=["General"])
 async def root():
@@ -89,11 +248,19 @@ async def root():
         "version": settings.API_VERSION,
         "endpoints": {
             "search": "/search",
+            "search_batch": "/search/batch",
+            "search_stream": "/search/stream",
             "recommend": "/recommend",
             "chat_start": "/chat/start",
             "chat_message": "/chat/message",
+            "chat_message_stream": "/chat/message/stream",
             "chat_history": "/chat/history/{session_id}",
             "health": "/health",
+            "health_live": "/health/live",
+            "health_ready": "/health/ready",
+            "metrics": "/metrics",
+            "slow_queries": "/admin/slow-queries",
+            "profile": "/admin/profile",
             "rebuild_cache": "/rebuild-cache",
             "docs": "/docs"
         }
@@ -103,24 +270,82 @@ async def root():
 @app.get("/health", response_model=HealthResponse, tags=["General"])
 async def health_check():
     """Check API health and return statistics"""
-    if not search_engine:
-        raise HTTPException(status_code=503, detail="Search engine not initialized")
+    engine = _require_engine()
     
-    stats = search_engine.get_stats()
+    stats = engine.get_stats()
     return {
-        "status": "healthy",
+        "status": "healthy" if engine.semantic_ready else engine.state,
         "materials_loaded": stats["semantic_materials"],
         "model": stats["model"]
     }
 
 
+@app.get("/health/live", tags=["General"])
+async def health_live():
+    """
+    Liveness probe: the process is up and serving HTTP
+    
+    Only fails (503) if search engine startup crashed, so the orchestrator
+    restarts the instance instead of waiting on it forever.
+    """
+    if search_engine and search_engine.state == "failed":
+        return json_response(dumps({"status": "failed", "error": search_engine.startup_error}), status_code=503)
+    return json_response(dumps({"status": "alive"}))
+
+
+@app.get("/health/ready", tags=["General"])
+async def health_ready():
+    """
+    Readiness probe: 200 once the encoder, vector index and BM25 are loaded
+    
+    Returns 503 with the current startup state (`starting`, `warming`,
+    `failed`) before that. While `warming`, search endpoints already answer
+    with BM25-only results unless SEARCH_KEYWORD_ONLY_WHILE_WARMING=false.
+    """
+    state = search_engine.state if search_engine else "starting"
+    body = {
+        "status": state,
+        "startup_timings": search_engine.startup_timings if search_engine else {}
+    }
+    if state != "ready":
+        if state == "failed":
+            body["error"] = search_engine.startup_error
+        return json_response(dumps(body), status_code=503)
+    return json_response(dumps(body))
+
+
+@app.get("/metrics", tags=["General"])
+async def metrics_endpoint():
+    """
+    Prometheus metrics for this worker process
+    
+    Stage and endpoint latency histograms, webhook counters, index size
+    gauges and chat turn / LLM / tool timings. See app/core/metrics.py.
+    """
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/search", response_model=SearchResponse, tags=["Search"])
+@_timed_endpoint("search")
 async def search_get(
     query: str = Query(..., description="Natural language search query", min_length=1),
     top_k: int = Query(5, description="Number of results to return", ge=1, le=50),
     min_score: float = Query(0.3, description="Minimum combined score", ge=0.0, le=1.0),
     semantic_weight: float = Query(0.6, description="Weight for semantic search", ge=0.0, le=1.0),
-    keyword_weight: float = Query(0.4, description="Weight for keyword search", ge=0.0, le=1.0)
+    keyword_weight: float = Query(0.4, description="Weight for keyword search", ge=0.0, le=1.0),
+    fusion: Literal["minmax", "zscore", "rrf"] = Query("minmax", description="Score fusion method"),
+    exact_union: bool = Query(False, description="Score every candidate exactly in both legs before fusing"),
+    category: Optional[List[str]] = Query(None, description="Filter by category (repeat for several)"),
+    min_price: Optional[float] = Query(None, description="Minimum price", ge=0.0),
+    max_price: Optional[float] = Query(None, description="Maximum price", ge=0.0),
+    min_quantity: Optional[int] = Query(None, description="Minimum available quantity", ge=0),
+    in_stock: bool = Query(False, description="Only products with quantity > 0"),
+    lat: Optional[float] = Query(None, description="Latitude of the search center", ge=-90.0, le=90.0),
+    lng: Optional[float] = Query(None, description="Longitude of the search center", ge=-180.0, le=180.0),
+    radius_km: Optional[float] = Query(None, description="Only products within this distance of lat/lng", gt=0.0),
+    decay_km: Optional[float] = Query(None, description="Boost products nearer to lat/lng", gt=0.0),
+    geo_weight: float = Query(0.3, description="Share of the score given to proximity", ge=0.0, le=1.0),
+    debug: bool = Query(False, description="Add a per-stage timing breakdown and Server-Timing header")
 ):
     """
     Hybrid search for construction materials using semantic + keyword matching
@@ -129,6 +354,20 @@ async def search_get(
     - Semantic search (BERT embeddings + cosine similarity)
     - Keyword search (BM25 ranking)
     
+    Fusion methods: `minmax` (default), `zscore`, `rrf` (reciprocal rank)
+    
+    Optional filters (`category`, `min_price`, `max_price`, `min_quantity`,
+    `in_stock`) are applied before ranking, so `top_k` is filled from
+    matching products only.
+    
+    Location-aware search: pass `lat`/`lng` with `radius_km` to restrict
+    to nearby products and/or `decay_km` to boost nearer ones, e.g.
+    "cement near me" in a single request.
+    
+    `debug=true` adds `timings` (milliseconds per stage: prefilter, encode,
+    semantic, bm25, fusion, serialize, total) to the body and a
+    `Server-Timing` header.
+    
     Example queries:
     - cement for foundation work
     - steel rods for reinforcement
@@ -136,51 +375,177 @@ async def search_get(
     - paint for exterior walls
     - tiles for bathroom flooring
     """
-    if not search_engine:
-        raise HTTPException(status_code=503, detail="Search engine not initialized")
+    _require_engine()
     
+    geo = None
+    if lat is not None or lng is not None:
+        if lat is None or lng is None:
+            raise HTTPException(status_code=400, detail="Both lat and lng are required for location search")
+        geo = GeoQuery(lat=lat, lng=lng, radius_km=radius_km, decay_km=decay_km, geo_weight=geo_weight)
+    
+    filters = SearchFilters(
+        categories=category,
+        min_price=min_price,
+        max_price=max_price,
+        min_quantity=min_quantity,
+        in_stock=in_stock
+    )
+    trace = tracing.begin(debug)
     try:
-        results = search_engine.search(query, top_k, min_score, semantic_weight, keyword_weight)
-        return {
-            "query": query,
-            "results": results,
-            "total": len(results)
-        }
+        results = search_engine.search(
+            query, top_k, min_score, semantic_weight, keyword_weight,
+            fusion=fusion, exact_union=exact_union, filters=filters, geo=geo
+        )
+        # Pre-encoded product fragments; skips response_model validation
+        with _SERIALIZE_STAGE.time():
+            body = search_engine.product_cache.encode_search_response(query, results)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+    finally:
+        tracing.finish(trace, "search", query, _search_params(
+            top_k=top_k, min_score=min_score, semantic_weight=semantic_weight,
+            keyword_weight=keyword_weight, fusion=fusion, exact_union=exact_union,
+            filters=filters, geo=geo
+        ))
+    return _traced_response(body, trace, debug)
 
 
 @app.post("/search", response_model=SearchResponse, tags=["Search"])
+@_timed_endpoint("search")
 async def search_post(request: HybridSearchRequest):
     """Hybrid search for construction materials using JSON request body"""
-    if not search_engine:
-        raise HTTPException(status_code=503, detail="Search engine not initialized")
+    _require_engine()
     
+    trace = tracing.begin(request.debug)
     try:
         results = search_engine.search(
             request.query, 
             request.top_k, 
             request.min_score,
             request.semantic_weight,
-            request.keyword_weight
+            request.keyword_weight,
+            fusion=request.fusion,
+            exact_union=request.exact_union,
+            filters=request.filters,
+            geo=request.geo
         )
-        return {
-            "query": request.query,
-            "results": results,
-            "total": len(results)
-        }
+        with _SERIALIZE_STAGE.time():
+            body = search_engine.product_cache.encode_search_response(request.query, results)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+    finally:
+        tracing.finish(trace, "search", request.query, request.model_dump(
+            exclude={"query", "debug"}, exclude_none=True
+        ))
+    return _traced_response(body, trace, request.debug)
+
+
+async def _search_events(request: HybridSearchRequest, sse: bool):
+    """Encode search_stages() output as NDJSON lines or SSE events, one result per event"""
+    cache = search_engine.product_cache
+    
+    def frame(event: bytes, data: bytes) -> bytes:
+        if sse:
+            return b"event: " + event + b"\ndata: " + data + b"\n\n"
+        return b'{"event":"' + event + b'",' + data[1:] + b"\n"
+    
+    yield frame(b"start", b'{"query":' + dumps(request.query) + b"}")
+    try:
+        async for stage, results in search_engine.search_stages(
+            request.query,
+            request.top_k,
+            request.min_score,
+            request.semantic_weight,
+            request.keyword_weight,
+            fusion=request.fusion,
+            exact_union=request.exact_union,
+            filters=request.filters,
+            geo=request.geo
+        ):
+            stage_name = stage.encode()
+            for rank, result in enumerate(results, 1):
+                yield frame(stage_name, b"".join((
+                    b'{"rank":', str(rank).encode(),
+                    b',"result":', cache.encode_search_result(result), b"}"
+                )))
+            yield frame(stage_name + b"_done", b'{"total":' + str(len(results)).encode() + b"}")
+    except Exception as e:
+        print(f"❌ Streaming search failed: {str(e)}")
+        yield frame(b"error", dumps({"detail": f"Search failed: {str(e)}"}))
+
+
+@app.post("/search/stream", tags=["Search"])
+async def search_stream(request: HybridSearchRequest, http_request: Request):
+    """
+    Progressive hybrid search, streamed one result at a time
+    
+    Emits newline-delimited JSON (or Server-Sent Events when the client
+    sends `Accept: text/event-stream`). The cheap BM25 leg is reported
+    first as provisional `keyword` events so UIs can render something
+    immediately; `final` events carry the fused ranking once the semantic
+    leg finishes. Event sequence:
+    
+    - `start` - `{"query"}`
+    - `keyword` - `{"rank", "result"}` per BM25 match (semantic/combined scores null)
+    - `keyword_done` - `{"total"}`
+    - `final` - `{"rank", "result"}` per fused result (same shape as `/search` results)
+    - `final_done` - `{"total"}`
+    - `error` - `{"detail"}` if the search fails mid-stream
+    """
+    _require_engine()
+    
+    sse = "text/event-stream" in http_request.headers.get("accept", "")
+    return StreamingResponse(
+        _search_events(request, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/search/batch", response_model=BatchSearchResponse, tags=["Search"])
+@_timed_endpoint("search_batch")
+async def search_batch(request: BatchSearchRequest):
+    """
+    Run several hybrid searches in one call
+    
+    All queries are encoded in a single model batch and scored together,
+    which is much cheaper per query than separate `/search` calls - e.g.
+    when comparing alternatives. Each entry accepts the same fields as
+    `POST /search`; results come back in request order.
+    """
+    _require_engine()
+    
+    try:
+        batch_results = search_engine.search_batch(request.searches)
+        cache = search_engine.product_cache
+        with _SERIALIZE_STAGE.time():
+            body = b"".join((
+                b'{"results":[',
+                b",".join(
+                    cache.encode_search_response(search.query, results)
+                    for search, results in zip(request.searches, batch_results)
+                ),
+                b'],"total":', str(len(batch_results)).encode(), b"}"
+            ))
+        return json_response(body)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch search failed: {str(e)}")
 
 
 @app.get("/recommend", tags=["Search"])
+@_timed_endpoint("recommend")
 async def recommend_products(
-    query: str = Query(..., description="Natural language search query", min_length=1)
+    query: str = Query(..., description="Natural language search query", min_length=1),
+    include_products: bool = Query(False, description="Also return full product documents from the in-memory cache"),
+    debug: bool = Query(False, description="Add a per-stage timing breakdown and Server-Timing header")
 ):
     """
     Get top 10 recommended product IDs based on hybrid search
     
-    Returns only product IDs - optimized for clean integration
+    Returns only product IDs - optimized for clean integration.
+    With `include_products=true` the full product documents are returned
+    too (served from the in-memory cache), so callers don't need to
+    re-query MongoDB by ID.
     
     Default parameters:
     - top_k: 10
@@ -193,9 +558,9 @@ async def recommend_products(
     - steel rods for reinforcement
     - waterproofing material
     """
-    if not search_engine:
-        raise HTTPException(status_code=503, detail="Search engine not initialized")
+    _require_engine()
     
+    trace = tracing.begin(debug)
     try:
         results = search_engine.search(
             query=query,
@@ -208,35 +573,45 @@ async def recommend_products(
         # Extract only product IDs
         product_ids = [result["_id"] for result in results]
         
-        return {
-            "product_ids": product_ids
-        }
+        with _SERIALIZE_STAGE.time():
+            if include_products:
+                body = b"".join((
+                    b'{"product_ids":', dumps(product_ids),
+                    b',"products":', search_engine.product_cache.encode_products(product_ids), b"}"
+                ))
+            else:
+                body = dumps({"product_ids": product_ids})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Recommendation failed: {str(e)}")
+    finally:
+        tracing.finish(trace, "recommend", query, {"include_products": include_products})
+    return _traced_response(body, trace, debug)
 
 
 @app.post("/rebuild-cache", tags=["Admin"])
 async def rebuild_cache():
     """Rebuild semantic embeddings and BM25 keyword index from scratch"""
-    if not search_engine:
-        raise HTTPException(status_code=503, detail="Search engine not initialized")
+    global search_engine
+    _require_engine(ready=True)
     
     try:
-        # Rebuild semantic embeddings
-        semantic_success = search_engine.semantic_engine.rebuild_cache()
-        # Rebuild keyword index
-        keyword_success = search_engine.rebuild_keyword_cache()
+        # Same lock as the webhooks so none of their updates are lost. The
+        # rebuild fills a fresh engine off the event loop; searches keep
+        # hitting the old one until the swap
+        async with index_lock:
+            rebuilt = await asyncio.to_thread(search_engine.rebuild)
+            search_engine = rebuilt
+            _bind_gauges(rebuilt)
+            if chat_service:
+                chat_service.set_search_engine(rebuilt)
         
-        if semantic_success and keyword_success:
-            stats = search_engine.get_stats()
-            return {
-                "status": "success",
-                "message": "All embeddings and keyword index rebuilt",
-                "semantic_materials": stats["semantic_materials"],
-                "keyword_materials": stats["keyword_materials"]
-            }
-        else:
-            raise HTTPException(status_code=500, detail="Cache rebuild failed")
+        stats = rebuilt.get_stats()
+        return {
+            "status": "success",
+            "message": "All embeddings and keyword index rebuilt",
+            "semantic_materials": stats["semantic_materials"],
+            "keyword_materials": stats["keyword_materials"]
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Rebuild failed: {str(e)}")
 
@@ -246,6 +621,7 @@ async def rebuild_cache():
 # when products are added or updated in their database
 
 @app.post("/webhook/product-added", tags=["Webhooks"], summary="Product Added Webhook")
+@_counted_webhook("product_added")
 async def webhook_product_added(data: WebhookProductAdded):
     """
     ✨ WEBHOOK: Friend's service notifies you when a NEW product is added
@@ -271,25 +647,26 @@ async def webhook_product_added(data: WebhookProductAdded):
     try:
         from bson import ObjectId
         
-        if not search_engine:
-            raise HTTPException(status_code=503, detail="Search engine not initialized")
+        _require_engine(ready=True)
         
         # Validate ObjectId format
         try:
-            object_id = ObjectId(data.product_id)
+            ObjectId(data.product_id)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Invalid product_id format: {str(e)}")
         
-        # Fetch product from database using db_manager
+        # Fetch product from database without blocking the event loop
         try:
-            product = search_engine.semantic_engine.db_manager.collection.find_one({"_id": object_id})
+            product = await search_engine.semantic_engine.db_manager.aio.find_by_id(data.product_id)
             if not product:
                 raise HTTPException(status_code=404, detail=f"Product {data.product_id} not found in database")
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
         
         # Check if already has embedding
-        if "embedding" in product:
+        if has_embedding(product):
             raise HTTPException(status_code=400, detail=f"Product {data.product_id} already indexed")
         
         # Get title from database
@@ -297,22 +674,34 @@ async def webhook_product_added(data: WebhookProductAdded):
         if not title:
             raise HTTPException(status_code=400, detail=f"Product {data.product_id} has no title")
         
-        # CRITICAL FIX: Use add_material() to update both database AND in-memory cache
-        try:
-            success = search_engine.semantic_engine.add_material(data.product_id)
-            if not success:
-                raise HTTPException(status_code=500, detail="Failed to add material to semantic search")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Semantic search update failed: {str(e)}")
-        
-        # Update BM25 keyword index (this now also updates docmap)
-        try:
-            search_engine.keyword_engine.add_document(
-                doc_id=data.product_id,
-                text=title
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"BM25 index update failed: {str(e)}")
+        async with index_lock:
+            # CRITICAL FIX: Use add_material() to update both database AND in-memory cache
+            try:
+                success = await asyncio.to_thread(
+                    search_engine.semantic_engine.add_material,
+                    data.product_id,
+                    dict(product)
+                )
+                if not success:
+                    raise HTTPException(status_code=500, detail="Failed to add material to semantic search")
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Semantic search update failed: {str(e)}")
+            
+            # Update BM25 keyword index (this now also updates docmap)
+            try:
+                await asyncio.to_thread(
+                    search_engine.keyword_engine.add_document,
+                    doc_id=data.product_id,
+                    text=title,
+                    material=dict(product)
+                )
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"BM25 index update failed: {str(e)}")
+            
+            # Keep the product cache and filter columns in step with the indexes
+            search_engine.refresh_product(product)
         
         # Verify the product is now searchable
         stats = search_engine.get_stats()
@@ -339,6 +728,7 @@ async def webhook_product_added(data: WebhookProductAdded):
 
 
 @app.post("/webhook/product-updated", tags=["Webhooks"], summary="Product Updated Webhook")
+@_counted_webhook("product_updated")
 async def webhook_product_updated(data: WebhookProductUpdated):
     """
     🔄 WEBHOOK: Friend's service notifies you when a product is UPDATED
@@ -364,25 +754,26 @@ async def webhook_product_updated(data: WebhookProductUpdated):
     try:
         from bson import ObjectId
         
-        if not search_engine:
-            raise HTTPException(status_code=503, detail="Search engine not initialized")
+        _require_engine(ready=True)
         
         # Validate ObjectId format
         try:
-            object_id = ObjectId(data.product_id)
+            ObjectId(data.product_id)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Invalid product_id format: {str(e)}")
         
-        # Fetch product from database using db_manager
+        # Fetch product from database without blocking the event loop
         try:
-            product = search_engine.semantic_engine.db_manager.collection.find_one({"_id": object_id})
+            product = await search_engine.semantic_engine.db_manager.aio.find_by_id(data.product_id)
             if not product:
                 raise HTTPException(status_code=404, detail=f"Product {data.product_id} not found in database")
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
         
         # Check if product is indexed
-        if "embedding" not in product:
+        if not has_embedding(product):
             raise HTTPException(status_code=400, detail=f"Product {data.product_id} not indexed yet. Call /webhook/product-added first.")
         
         # Get title from database
@@ -390,22 +781,34 @@ async def webhook_product_updated(data: WebhookProductUpdated):
         if not title:
             raise HTTPException(status_code=400, detail=f"Product {data.product_id} has no title")
         
-        # CRITICAL FIX: Use update_material() to update both database AND in-memory cache
-        try:
-            success = search_engine.semantic_engine.update_material(data.product_id)
-            if not success:
-                raise HTTPException(status_code=500, detail="Failed to update material in semantic search")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Semantic search update failed: {str(e)}")
-        
-        # Update BM25 index with new title (this now also updates docmap)
-        try:
-            search_engine.keyword_engine.update_document(
-                doc_id=data.product_id,
-                text=title
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"BM25 index update failed: {str(e)}")
+        async with index_lock:
+            # CRITICAL FIX: Use update_material() to update both database AND in-memory cache
+            try:
+                success = await asyncio.to_thread(
+                    search_engine.semantic_engine.update_material,
+                    data.product_id,
+                    dict(product)
+                )
+                if not success:
+                    raise HTTPException(status_code=500, detail="Failed to update material in semantic search")
+            except HTTPException:
+                raise
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Semantic search update failed: {str(e)}")
+            
+            # Update BM25 index with new title (this now also updates docmap)
+            try:
+                await asyncio.to_thread(
+                    search_engine.keyword_engine.update_document,
+                    doc_id=data.product_id,
+                    text=title,
+                    material=dict(product)
+                )
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"BM25 index update failed: {str(e)}")
+            
+            # Keep the product cache and filter columns in step with the indexes
+            search_engine.refresh_product(product)
         
         # Verify the product is searchable
         stats = search_engine.get_stats()
@@ -430,4 +833,63 @@ async def webhook_product_updated(data: WebhookProductUpdated):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Webhook failed: {str(e)}")
 
+
+@app.post("/webhook/product-deleted", tags=["Webhooks"], summary="Product Deleted Webhook")
+@_counted_webhook("product_deleted")
+async def webhook_product_deleted(data: WebhookProductDeleted):
+    """
+    🗑️ WEBHOOK: Friend's service notifies you when a product is DELETED
+    
+    The product is already gone from the database, so nothing is fetched:
+    it is dropped from both search indexes, the product cache and the
+    filter / geo indexes, and stops appearing in results immediately.
+    
+    FRIEND'S CODE:
+    ```javascript
+    await axios.post('https://your-ngrok-url/webhook/product-deleted', {
+      product_id: product._id.toString()
+    });
+    ```
+    """
+    try:
+        from bson import ObjectId
+        
+        _require_engine(ready=True)
+        
+        # Validate ObjectId format
+        try:
+            ObjectId(data.product_id)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Invalid product_id format: {str(e)}")
+        
+        async with index_lock:
+            try:
+                removed = await asyncio.to_thread(search_engine.remove_product, data.product_id)
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Index removal failed: {str(e)}")
+        
+        if not removed:
+            raise HTTPException(status_code=404, detail=f"Product {data.product_id} is not indexed")
+        
+        stats = search_engine.get_stats()
+        
+        print(f"✅ Webhook SUCCESS: Product {data.product_id} removed from both search engines")
+        
+        return {
+            "status": "success",
+            "product_id": data.product_id,
+            "message": "Product removed from search",
+            "semantic_materials": stats["semantic_materials"],
+            "keyword_materials": stats["keyword_materials"],
+            "timestamp": datetime.now().isoformat()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Webhook ERROR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Webhook failed: {str(e)}")
+
 # ===== END WEBHOOK ENDPOINTS =====
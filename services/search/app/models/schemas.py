@@ -1,5 +1,5 @@
 """Pydantic models for API requests and responses"""
-from typing import List, Optional
+from typing import Dict, List, Literal, Optional
 from pydantic import BaseModel, Field
 
 
@@ -19,6 +19,7 @@ class Material(BaseModel):
     semantic_score: Optional[float] = None
     keyword_score: Optional[float] = None
     combined_score: Optional[float] = None
+    distance_km: Optional[float] = None
     
     class Config:
         populate_by_name = True
@@ -31,6 +32,24 @@ class SearchRequest(BaseModel):
     min_score: float = Field(0.3, ge=0.0, le=1.0, description="Minimum similarity score")
 
 
+class SearchFilters(BaseModel):
+    """Structured pre-filters applied inside both search legs"""
+    categories: Optional[List[str]] = Field(None, description="Only these categories (any match)")
+    min_price: Optional[float] = Field(None, ge=0.0, description="Minimum price (inclusive)")
+    max_price: Optional[float] = Field(None, ge=0.0, description="Maximum price (inclusive)")
+    min_quantity: Optional[int] = Field(None, ge=0, description="Minimum available quantity")
+    in_stock: bool = Field(False, description="Only products with quantity > 0")
+
+
+class GeoQuery(BaseModel):
+    """Location constraint / boost for hybrid search"""
+    lat: float = Field(..., ge=-90.0, le=90.0, description="Latitude of the search center")
+    lng: float = Field(..., ge=-180.0, le=180.0, description="Longitude of the search center")
+    radius_km: Optional[float] = Field(None, gt=0.0, description="Only products within this distance")
+    decay_km: Optional[float] = Field(None, gt=0.0, description="Boost nearer products (score halves roughly every 0.7 x decay_km)")
+    geo_weight: float = Field(0.3, ge=0.0, le=1.0, description="Share of the final score given to proximity when decay_km is set")
+
+
 class HybridSearchRequest(BaseModel):
     """Hybrid search request payload"""
     query: str = Field(..., min_length=1, description="Search query text")
@@ -38,6 +57,11 @@ class HybridSearchRequest(BaseModel):
     min_score: float = Field(0.3, ge=0.0, le=1.0, description="Minimum combined score")
     semantic_weight: float = Field(0.6, ge=0.0, le=1.0, description="Weight for semantic search (0-1)")
     keyword_weight: float = Field(0.4, ge=0.0, le=1.0, description="Weight for keyword search (0-1)")
+    fusion: Literal["minmax", "zscore", "rrf"] = Field("minmax", description="Score fusion method")
+    exact_union: bool = Field(False, description="Score every candidate exactly in both legs before fusing")
+    filters: Optional[SearchFilters] = Field(None, description="Category / price / stock pre-filters")
+    geo: Optional[GeoQuery] = Field(None, description="Radius filter and/or distance-decay boost")
+    debug: bool = Field(False, description="Add a per-stage timing breakdown and Server-Timing header")
 
 
 # ===== WEBHOOK SCHEMAS (Lines 44-65) =====
@@ -67,6 +91,18 @@ class WebhookProductUpdated(BaseModel):
         }
 
 
+class WebhookProductDeleted(BaseModel):
+    """Schema for product-deleted webhook from friend's service"""
+    product_id: str = Field(..., description="MongoDB ObjectId of deleted product")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "product_id": "690f371b09bfc4dc74bea545"
+            }
+        }
+
+
 # ===== END WEBHOOK SCHEMAS =====
 
 class SearchResponse(BaseModel):
@@ -74,6 +110,18 @@ class SearchResponse(BaseModel):
     query: str
     results: List[Material]
     total: int
+    timings: Optional[Dict[str, float]] = Field(None, description="Milliseconds per search stage (debug=true only)")
+
+
+class BatchSearchRequest(BaseModel):
+    """Several hybrid searches answered in one call"""
+    searches: List[HybridSearchRequest] = Field(..., min_length=1, max_length=50, description="Searches to run")
+
+
+class BatchSearchResponse(BaseModel):
+    """One SearchResponse per request, in request order"""
+    results: List[SearchResponse]
+    total: int
 
 
 class HealthResponse(BaseModel):
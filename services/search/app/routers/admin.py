@@ -0,0 +1,143 @@
+"""FastAPI router for slow-query and profiling diagnostics of a running worker."""
+
+import asyncio
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Query, Response
+
+from app.core import tracing
+from app.core.config import settings
+from app.core.profiling import StackSampler, allocations
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+# One CPU profile per worker at a time
+_profile_lock = asyncio.Lock()
+
+
+def _require_profiling() -> None:
+    if not settings.ADMIN_PROFILING:
+        raise HTTPException(
+            status_code=404,
+            detail="Admin diagnostics endpoints are disabled (set ADMIN_PROFILING=true)",
+        )
+
+
+# ── Endpoints ───────────────────────────────────────────────────────────────
+
+
+@router.get(
+    "/slow-queries",
+    summary="Most recent searches slower than SEARCH_SLOW_QUERY_MS",
+)
+async def slow_queries(
+    limit: int = Query(20, ge=1, le=1000, description="Number of records to return"),
+):
+    """
+    Most recent slow searches of this worker, newest first.
+
+    Each record carries the endpoint, query, search parameters and the
+    per-stage timings in milliseconds. Only a sampled fraction of requests
+    is traced (SEARCH_SLOW_QUERY_SAMPLE_RATE); requests sent with
+    `debug=true` are always checked. Kept in memory per worker process.
+    """
+    _require_profiling()
+    return {
+        "threshold_ms": settings.SEARCH_SLOW_QUERY_MS,
+        "sample_rate": settings.SEARCH_SLOW_QUERY_SAMPLE_RATE,
+        "slow_queries": tracing.recent_slow_queries(limit),
+    }
+
+
+@router.post(
+    "/profile",
+    summary="Sample the CPU stacks of this worker for a bounded window",
+)
+async def profile(
+    seconds: float = Query(10.0, gt=0.0, description="Sampling window"),
+    interval_ms: float = Query(10.0, ge=1.0, le=1000.0, description="Time between samples"),
+    format: Literal["collapsed", "json"] = Query("collapsed", description="Folded stacks or a JSON summary"),
+    include_idle: bool = Query(False, description="Keep threads that are blocked waiting for work"),
+):
+    """
+    Profile the worker that receives this request while it keeps serving.
+
+    Every thread (event loop, search and webhook worker threads, chat
+    background tasks) is sampled each `interval_ms` for `seconds`, capped
+    at `PROFILE_MAX_SECONDS`. Trigger it, then replay the traffic that
+    causes the spike (e.g. a webhook storm).
+
+    - **collapsed** – folded stacks as a `.folded` download; render with
+      `flamegraph.pl profile.folded > profile.svg` or drop into speedscope
+    - **json** – sample counts and the hottest frames by self / total time
+
+    With several uvicorn workers each profile covers only one of them.
+    """
+    _require_profiling()
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+
+    seconds = min(seconds, settings.PROFILE_MAX_SECONDS)
+    async with _profile_lock:
+        sampler = StackSampler(interval=interval_ms / 1000, include_idle=include_idle)
+        await asyncio.to_thread(sampler.run, seconds)
+
+    if format == "json":
+        return sampler.summary()
+    filename = f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.folded"
+    return Response(
+        content=sampler.collapsed(),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post(
+    "/tracemalloc/start",
+    summary="Start tracing memory allocations",
+)
+async def tracemalloc_start(
+    frames: int = Query(1, ge=1, le=50, description="Stack frames stored per allocation"),
+):
+    """
+    Turn on `tracemalloc` in this worker. Adds CPU and memory overhead
+    until `/admin/tracemalloc/stop`; more `frames` costs more.
+    """
+    _require_profiling()
+    allocations.start(frames)
+    return {"status": "tracing", "frames": frames}
+
+
+@router.post(
+    "/tracemalloc/snapshot",
+    summary="Allocation growth since the previous snapshot",
+)
+async def tracemalloc_snapshot(
+    group_by: Literal["lineno", "filename", "traceback"] = Query("lineno"),
+    limit: int = Query(25, ge=1, le=500),
+):
+    """
+    Take a snapshot and diff it against the previous one.
+
+    Call once to set a baseline, send traffic, then call again: entries
+    are sorted by growth (`size_diff_kb`), pointing at the source lines
+    that kept memory, e.g. chat session history or index appends.
+    """
+    _require_profiling()
+    try:
+        return await asyncio.to_thread(allocations.snapshot, group_by, limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post(
+    "/tracemalloc/stop",
+    summary="Stop tracing memory allocations",
+)
+async def tracemalloc_stop():
+    """Turn `tracemalloc` off and drop the stored baseline snapshot."""
+    _require_profiling()
+    allocations.stop()
+    return {"status": "stopped"}
@@ -1,6 +1,12 @@
 """FastAPI router for the Gemini-powered conversational product advisor."""
 
+from typing import TYPE_CHECKING
+
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.core.encoding import dumps
+from app.core.metrics import CHAT_TURN_SECONDS
 
 from app.models.schemas import (
     ChatStartResponse,
@@ -8,16 +14,18 @@ from app.models.schemas import (
     ChatMessageResponse,
     ChatHistoryResponse,
 )
-from app.services.gemini_chat import GeminiChatService
+
+if TYPE_CHECKING:
+    from app.services.gemini_chat import GeminiChatService
 
 
 router = APIRouter(prefix="/chat", tags=["Chat Advisor"])
 
 # The service instance is injected from main.py at startup
-chat_service: GeminiChatService = None  # type: ignore
+chat_service: "GeminiChatService" = None  # type: ignore
 
 
-def set_chat_service(service: GeminiChatService) -> None:
+def set_chat_service(service: "GeminiChatService") -> None:
     """Called from main.py lifespan to inject the initialised service."""
     global chat_service
     chat_service = service
@@ -73,9 +81,10 @@ async def send_message(request: ChatMessageRequest):
         )
 
     try:
-        result = await chat_service.send_message(
-            request.session_id, request.message
-        )
+        with CHAT_TURN_SECONDS.labels("message").time():
+            result = await chat_service.send_message(
+                request.session_id, request.message
+            )
         return result
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -85,6 +94,58 @@ async def send_message(request: ChatMessageRequest):
         )
 
 
+@router.post(
+    "/message/stream",
+    summary="Send a message and stream the reply as Server-Sent Events",
+)
+async def stream_message(request: ChatMessageRequest):
+    """
+    Streaming variant of `/chat/message`.
+
+    Tokens are relayed as the model generates them. When the advisor
+    decides to search, the product search starts immediately and the
+    products are sent before the summary text is generated. Events:
+
+    - **token** – `{"text"}` chunk of the assistant's reply
+    - **tool_call** – `{"query", "reasoning"}` the search being run
+    - **products** – `{"products", "query_used", "reasoning"}`
+    - **done** – the same body `/chat/message` would have returned
+    - **error** – `{"detail"}` if the turn fails mid-stream
+    """
+    if not chat_service:
+        raise HTTPException(
+            status_code=503,
+            detail="Chat service not initialised",
+        )
+
+    try:
+        events = await chat_service.stream_message(
+            request.session_id, request.message
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    async def event_stream():
+        try:
+            with CHAT_TURN_SECONDS.labels("stream").time():
+                async for event in events:
+                    yield (
+                        b"event: " + event["event"].encode()
+                        + b"\ndata: " + dumps(event["data"]) + b"\n\n"
+                    )
+        except Exception as e:
+            print(f"❌ Chat stream failed: {e}")
+            yield b"event: error\ndata: " + dumps(
+                {"detail": f"Chat message failed: {e}"}
+            ) + b"\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get(
     "/history/{session_id}",
     response_model=ChatHistoryResponse,
@@ -111,6 +172,65 @@ async def get_history(session_id: str):
         )
 
 
+@router.get(
+    "/stats/speculation",
+    summary="Speculative search hit rate and saved latency",
+)
+async def speculation_stats():
+    """
+    Counters for speculative product search (`CHAT_SPECULATIVE_SEARCH`).
+
+    - **hits** – the model's tool query matched and the early results were reused
+    - **misses** – the tool query differed; a fresh search was run
+    - **unused** – the model replied with a question, speculation discarded
+    - **saved_ms_total / saved_ms_avg** – search time taken off the critical path
+    """
+    if not chat_service:
+        raise HTTPException(
+            status_code=503,
+            detail="Chat service not initialised",
+        )
+
+    return chat_service.get_speculation_stats()
+
+
+@router.get(
+    "/stats/tool-cache",
+    summary="Tool-result cache hit rate",
+)
+async def tool_cache_stats():
+    """
+    How often `search_and_recommend_products` was answered from the
+    tool-result cache (exact or near-duplicate query) instead of a fresh
+    search, overall and per session outcome.
+    """
+    if not chat_service:
+        raise HTTPException(
+            status_code=503,
+            detail="Chat service not initialised",
+        )
+
+    return chat_service.get_tool_cache_stats()
+
+
+@router.get(
+    "/stats/sessions",
+    summary="Chat session store size and churn",
+)
+async def session_stats():
+    """
+    Live session count against the configured cap, plus how many sessions
+    were evicted (LRU) or expired since startup.
+    """
+    if not chat_service:
+        raise HTTPException(
+            status_code=503,
+            detail="Chat service not initialised",
+        )
+
+    return chat_service.sessions.get_stats()
+
+
 @router.delete(
     "/{session_id}",
     summary="Delete a conversation session",
@@ -128,8 +248,7 @@ async def delete_session(session_id: str):
             detail="Chat service not initialised",
         )
 
-    if session_id not in chat_service.sessions:
+    if not await chat_service.sessions.adelete(session_id):
         raise HTTPException(status_code=404, detail=f"Session '{session_id}' not found")
 
-    del chat_service.sessions[session_id]
     return {"status": "deleted", "session_id": session_id}
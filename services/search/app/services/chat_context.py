@@ -0,0 +1,208 @@
+"""Per-turn prompt assembly for the chat advisor.
+
+Keeps what is sent to Gemini on each turn roughly constant in size:
+
+- Older turns beyond a token budget are folded into a short extractive
+  summary instead of being resent verbatim.
+- The static prefix (system prompt + tool schema) can be stored as a
+  provider-side cached content and referenced by name, where the model
+  and prompt size allow it.
+"""
+
+import asyncio
+import json
+import time
+from typing import List, Optional
+
+from google.genai import errors, types
+
+from app.core.config import settings
+
+
+# Rough chars-per-token ratio used for budgeting (no tokenizer round trip)
+CHARS_PER_TOKEN = 4
+
+# Upper bound for the retry delay after transient cache-creation failures
+CACHE_RETRY_MAX_SECONDS = 3600.0
+
+
+def is_user_text(content: types.Content) -> bool:
+    """True for a user turn made of text (not a function response)."""
+    return content.role == "user" and all(
+        part.function_response is None for part in content.parts or []
+    )
+
+
+def _part_chars(part: types.Part) -> int:
+    if part.text:
+        return len(part.text)
+    if part.function_call:
+        return len(json.dumps(part.function_call.args or {})) + 32
+    if part.function_response:
+        return len(json.dumps(part.function_response.response or {})) + 32
+    return 0
+
+
+def estimate_tokens(content: types.Content) -> int:
+    """Cheap token estimate for one Content."""
+    return sum(_part_chars(p) for p in content.parts or []) // CHARS_PER_TOKEN + 4
+
+
+def _cache_unsupported_error(error: Exception) -> bool:
+    """True if cache creation can never succeed for this model and prompt.
+
+    Gemini answers 400 INVALID_ARGUMENT when the prompt is below the
+    model's minimum cacheable size and 404 NOT_FOUND when the model does
+    not support createCachedContent. Rate limits, server errors and
+    network failures are worth retrying.
+    """
+    return isinstance(error, errors.ClientError) and error.code in (400, 404)
+
+
+def _summarize(contents: List[types.Content], max_chars: int) -> str:
+    """Extractive summary of dropped turns, most recent first to survive the cut."""
+    lines: List[str] = []
+    for content in reversed(contents):
+        for part in content.parts or []:
+            if part.text and not part.thought:
+                speaker = "User" if content.role == "user" else "Advisor"
+                lines.append(f"{speaker}: {' '.join(part.text.split())}")
+            elif part.function_call:
+                query = (part.function_call.args or {}).get("query", "")
+                lines.append(f"Advisor searched for: {query}")
+    summary = ""
+    for line in lines:
+        if len(summary) + len(line) + 3 > max_chars:
+            break
+        summary = f"{line} | {summary}" if summary else line
+    return summary
+
+
+class ChatContext:
+    """Builds the contents and config for each generate call."""
+
+    def __init__(self, system_prompt: str, tools: List[types.Tool]):
+        self.system_prompt = system_prompt
+        self.tools = tools
+        self.base_config = types.GenerateContentConfig(
+            system_instruction=system_prompt,
+            tools=tools,
+            automatic_function_calling=types.AutomaticFunctionCallingConfig(
+                disable=True
+            ),
+        )
+        self._cached_config: Optional[types.GenerateContentConfig] = None
+        self._cache_name: Optional[str] = None
+        self._cache_expires: float = 0.0
+        self._cache_lock: Optional[asyncio.Lock] = None
+        self._cache_unsupported = False
+        # Transient cache-creation failures: inline prompt until the retry time
+        self._cache_failures = 0
+        self._cache_retry_at: float = 0.0
+
+    # -- contents ------------------------------------------------------------
+
+    def build_contents(self, contents: List[types.Content]) -> List[types.Content]:
+        """Fit ``contents`` into CHAT_CONTEXT_TOKEN_BUDGET.
+
+        Keeps the newest turns verbatim, starting at a plain user turn so
+        function calls stay paired with their responses. Everything older
+        is folded into a summary prefixed to the first kept user turn.
+        """
+        budget = settings.CHAT_CONTEXT_TOKEN_BUDGET
+        total = 0
+        keep_from: Optional[int] = None
+        for i in range(len(contents) - 1, -1, -1):
+            total += estimate_tokens(contents[i])
+            if total > budget and keep_from is not None:
+                break
+            if is_user_text(contents[i]):
+                keep_from = i
+
+        if not keep_from:
+            # Everything fits, or there is no safe cut point
+            return contents
+
+        summary = _summarize(contents[:keep_from], settings.CHAT_CONTEXT_SUMMARY_CHARS)
+        first = contents[keep_from]
+        if summary:
+            first = types.Content(
+                role="user",
+                parts=[
+                    types.Part(text=f"(Summary of earlier conversation: {summary})"),
+                    *(first.parts or []),
+                ],
+            )
+        return [first] + contents[keep_from + 1:]
+
+    # -- config / provider caching -------------------------------------------
+
+    def _fallback_config(self) -> types.GenerateContentConfig:
+        """The previous cache while the provider still holds it, else the inline prompt."""
+        if self._cached_config is not None and time.time() < self._cache_expires:
+            return self._cached_config
+        return self.base_config
+
+    async def get_config(self, client, model: str) -> types.GenerateContentConfig:
+        """Config for a generate call, referencing cached content if enabled."""
+        if not settings.CHAT_CONTEXT_CACHING or self._cache_unsupported:
+            return self.base_config
+
+        # Renew a little before the provider drops the cache
+        if self._cached_config is not None and time.time() < self._cache_expires - 60:
+            return self._cached_config
+        if time.time() < self._cache_retry_at:
+            return self._fallback_config()
+
+        if self._cache_lock is None:
+            self._cache_lock = asyncio.Lock()
+        async with self._cache_lock:
+            if self._cached_config is not None and time.time() < self._cache_expires - 60:
+                return self._cached_config
+            if time.time() < self._cache_retry_at:
+                return self._fallback_config()
+            try:
+                ttl = settings.CHAT_CONTEXT_CACHE_TTL_SECONDS
+                cache = await client.aio.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=self.system_prompt,
+                        tools=self.tools,
+                        ttl=f"{ttl}s",
+                        display_name="materialmover-chat-prefix",
+                    ),
+                )
+            except Exception as e:
+                if _cache_unsupported_error(e):
+                    print(f"⚠️  Context caching unsupported, sending prompt inline: {e}")
+                    self._cache_unsupported = True
+                    return self.base_config
+                self._cache_failures += 1
+                delay = min(
+                    settings.CHAT_CONTEXT_CACHE_RETRY_SECONDS * 2 ** (self._cache_failures - 1),
+                    CACHE_RETRY_MAX_SECONDS,
+                )
+                self._cache_retry_at = time.time() + delay
+                print(f"⚠️  Context cache creation failed, retrying in {delay:.0f}s: {e}")
+                return self._fallback_config()
+
+            self._cache_failures = 0
+            self._cache_retry_at = 0.0
+
+            old_name = self._cache_name
+            self._cache_name = cache.name
+            self._cache_expires = time.time() + ttl
+            self._cached_config = types.GenerateContentConfig(
+                cached_content=cache.name,
+                automatic_function_calling=types.AutomaticFunctionCallingConfig(
+                    disable=True
+                ),
+            )
+            print(f"✅ Chat prompt prefix cached as {cache.name}")
+
+        if old_name:
+            try:
+                await client.aio.caches.delete(name=old_name)
+            except Exception:
+                pass
+        return self._cached_config
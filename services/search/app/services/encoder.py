@@ -0,0 +1,119 @@
+"""Query / document encoder loading with selectable inference backend
+
+``torch`` runs the SentenceTransformer in PyTorch eager mode. ``onnx``
+exports the model once to ONNX (optionally int8 dynamically quantized
+for the CPU's instruction set), caches the export on disk and runs it
+with ONNX Runtime using a fixed number of intra-op threads. Both return
+a SentenceTransformer, so ``encode`` calls are unchanged.
+
+sentence_transformers (and with it torch) is only imported when a model
+is loaded, keeping ``import app.main`` fast.
+"""
+import os
+from typing import TYPE_CHECKING, Optional
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+
+ENCODER_BACKENDS = ("torch", "onnx")
+
+# Dynamic int8 quantization targets understood by sentence-transformers
+ONNX_QUANTIZATION_CONFIGS = ("arm64", "avx2", "avx512", "avx512_vnni")
+
+
+def _onnx_session_options(threads: int):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if threads > 0:
+        options.intra_op_num_threads = threads
+        # One request encodes one small batch; parallelism is within ops
+        options.inter_op_num_threads = 1
+    return options
+
+
+def _onnx_file_name(quantization: Optional[str]) -> str:
+    return f"onnx/model_qint8_{quantization}.onnx" if quantization else "onnx/model.onnx"
+
+
+def export_onnx(model_name: str, export_dir: str, quantization: Optional[str] = None) -> str:
+    """
+    Export ``model_name`` to ONNX under ``export_dir`` (no-op if present)
+
+    Returns the ONNX file path relative to ``export_dir``.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    file_name = _onnx_file_name(quantization)
+    if os.path.exists(os.path.join(export_dir, file_name)):
+        return file_name
+
+    print(f"🔄 Exporting {model_name} to ONNX ({quantization or 'float32'})...")
+    model = SentenceTransformer(model_name, backend="onnx")
+    if not os.path.exists(os.path.join(export_dir, "onnx", "model.onnx")):
+        model.save_pretrained(export_dir)
+    if quantization:
+        export_dynamic_quantized_onnx_model(model, quantization, export_dir)
+    print(f"✅ ONNX model saved to {os.path.join(export_dir, file_name)}")
+    return file_name
+
+
+def load_encoder(
+    model_name: str,
+    backend: Optional[str] = None,
+    quantization: Optional[str] = None,
+    threads: Optional[int] = None,
+    strict: bool = False
+) -> "SentenceTransformer":
+    """
+    Load the sentence encoder on the configured (or given) backend
+
+    Args:
+        model_name: Hugging Face model ID, e.g. all-MiniLM-L6-v2
+        backend: "torch" or "onnx" (default settings.ENCODER_BACKEND)
+        quantization: ONNX dynamic int8 target, e.g. "avx512_vnni"
+            (default settings.ENCODER_ONNX_QUANTIZATION; empty = float32)
+        threads: Intra-op threads, 0 = runtime default
+            (default settings.ENCODER_THREADS)
+        strict: Raise instead of falling back to PyTorch when the ONNX
+            dependencies are missing
+    """
+    from sentence_transformers import SentenceTransformer
+
+    backend = backend or settings.ENCODER_BACKEND
+    quantization = settings.ENCODER_ONNX_QUANTIZATION if quantization is None else quantization
+    threads = settings.ENCODER_THREADS if threads is None else threads
+
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}'")
+    if quantization and quantization not in ONNX_QUANTIZATION_CONFIGS:
+        raise ValueError(f"Unknown ONNX quantization '{quantization}'")
+
+    if backend == "onnx":
+        try:
+            export_dir = os.path.join(settings.ENCODER_ONNX_DIR, model_name.replace("/", "__"))
+            file_name = export_onnx(model_name, export_dir, quantization or None)
+            model = SentenceTransformer(
+                export_dir,
+                backend="onnx",
+                model_kwargs={
+                    "file_name": file_name,
+                    "provider": "CPUExecutionProvider",
+                    "session_options": _onnx_session_options(threads),
+                },
+            )
+            print(f"✅ Encoder running on ONNX Runtime ({file_name}, threads={threads or 'auto'})")
+            return model
+        except ImportError as e:
+            if strict:
+                raise
+            print(f"⚠️  ONNX backend unavailable ({e}); install sentence-transformers[onnx]. Using PyTorch")
+
+    if threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+    return SentenceTransformer(model_name)
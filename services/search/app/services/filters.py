@@ -0,0 +1,142 @@
+"""Columnar filter index for structured search pre-filters"""
+from typing import Dict, List, Optional
+import numpy as np
+
+
+def _category_key(category: Optional[str]) -> str:
+    return (category or "").strip().lower()
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class _FilterColumns:
+    """One immutable generation of filter columns, published by reference swap"""
+
+    __slots__ = ("prices", "quantities", "category_bitmaps", "size")
+
+    def __init__(self, prices: np.ndarray, quantities: np.ndarray, category_bitmaps: Dict[str, np.ndarray]):
+        self.prices = prices
+        self.quantities = quantities
+        self.category_bitmaps = category_bitmaps
+        self.size = len(prices)
+
+
+class FilterIndex:
+    """
+    Per-product filter columns aligned to the semantic engine's dense doc IDs
+
+    Holds one boolean bitmap per category plus numpy price and quantity
+    columns, so category / price / stock filters become vectorized masks
+    that both search legs apply before scoring.
+
+    Webhooks update rows from worker threads while searches read, so
+    columns are never written in place: every change builds new columns
+    and swaps them in together.
+    """
+
+    def __init__(self):
+        self._columns = _FilterColumns(np.zeros(0), np.zeros(0), {})
+
+    @property
+    def size(self) -> int:
+        return self._columns.size
+
+    def build(self, materials: List[Dict]) -> None:
+        """Rebuild all columns from materials in dense doc ID order"""
+        size = len(materials)
+        prices = np.array([_as_float(m.get('price')) for m in materials], dtype=np.float64)
+        quantities = np.array([_as_float(m.get('quantity', 0)) for m in materials], dtype=np.float64)
+        bitmaps: Dict[str, np.ndarray] = {}
+        for idx, material in enumerate(materials):
+            key = _category_key(material.get('category'))
+            if key not in bitmaps:
+                bitmaps[key] = np.zeros(size, dtype=bool)
+            bitmaps[key][idx] = True
+        self._columns = _FilterColumns(prices, quantities, bitmaps)
+
+    def _replace_row(self, idx: int, price: float, quantity: float, category: Optional[str]) -> None:
+        """Publish copies of the columns with row ``idx`` replaced (grown if needed)"""
+        current = self._columns
+        grow = max(0, idx + 1 - current.size)
+        prices = np.concatenate([current.prices, np.full(grow, np.nan)])
+        quantities = np.concatenate([current.quantities, np.full(grow, np.nan)])
+        prices[idx], quantities[idx] = price, quantity
+
+        bitmaps: Dict[str, np.ndarray] = {}
+        for key, bitmap in current.category_bitmaps.items():
+            if grow or bitmap[idx] or key == category:
+                bitmap = np.concatenate([bitmap, np.zeros(grow, dtype=bool)])
+                bitmap[idx] = False
+            bitmaps[key] = bitmap
+        if category is not None:
+            if category not in bitmaps:
+                bitmaps[category] = np.zeros(len(prices), dtype=bool)
+            bitmaps[category][idx] = True
+        self._columns = _FilterColumns(prices, quantities, bitmaps)
+
+    def set(self, idx: int, material: Dict) -> None:
+        """Insert or overwrite the row for one material (appending grows every column)"""
+        self._replace_row(
+            idx,
+            _as_float(material.get('price')),
+            _as_float(material.get('quantity', 0)),
+            _category_key(material.get('category'))
+        )
+
+    def remove(self, idx: int) -> None:
+        """Blank the row of a deleted material so no filter matches it"""
+        if idx < self.size:
+            self._replace_row(idx, np.nan, np.nan, None)
+
+    @staticmethod
+    def is_empty(filters) -> bool:
+        """True when no filter field is set"""
+        return filters is None or (
+            not filters.categories
+            and filters.min_price is None
+            and filters.max_price is None
+            and filters.min_quantity is None
+            and not filters.in_stock
+        )
+
+    def mask(self, filters, size: int) -> Optional[np.ndarray]:
+        """
+        Boolean mask of documents passing ``filters``, or None for no filtering
+
+        Args:
+            filters: Object with categories, min_price, max_price,
+                min_quantity and in_stock attributes (see SearchFilters)
+            size: Number of documents in the dense ID space
+        """
+        if self.is_empty(filters):
+            return None
+
+        columns = self._columns
+        n = min(size, columns.size)
+        mask = np.ones(n, dtype=bool)
+
+        if filters.categories:
+            category_mask = np.zeros(n, dtype=bool)
+            for category in filters.categories:
+                bitmap = columns.category_bitmaps.get(_category_key(category))
+                if bitmap is not None:
+                    category_mask |= bitmap[:n]
+            mask &= category_mask
+        if filters.min_price is not None:
+            mask &= columns.prices[:n] >= filters.min_price
+        if filters.max_price is not None:
+            mask &= columns.prices[:n] <= filters.max_price
+        if filters.min_quantity is not None:
+            mask &= columns.quantities[:n] >= filters.min_quantity
+        if filters.in_stock:
+            mask &= columns.quantities[:n] > 0
+
+        # Documents the index hasn't seen yet never pass a filter
+        if n < size:
+            mask = np.concatenate([mask, np.zeros(size - n, dtype=bool)])
+        return mask
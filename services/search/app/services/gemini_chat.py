@@ -6,16 +6,28 @@ Uses the google-genai SDK (Gemini 2.0 Flash) with function calling to:
 3. When ready, call a tool to search products and return recommendations
 """
 
+import re
+import time
 import uuid
+import random
 import json
 import asyncio
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Any
+from datetime import datetime, timedelta, timezone
 
 from google import genai
 from google.genai import types
 
 from app.core.config import settings
+from app.core.metrics import CHAT_LLM_SECONDS, CHAT_TOOL_CACHE, CHAT_TOOL_SECONDS
+from app.services.chat_context import ChatContext, is_user_text
+from app.services.product_cache import serialize_product
+from app.services.tool_cache import ToolResultCache
+from app.services.session_store import (
+    DiskSessionBackend,
+    MemorySessionBackend,
+    SessionStore,
+)
 
 
 # ── System prompt that guides Gemini's behaviour ────────────────────────────
@@ -61,6 +73,37 @@ Plumbing Materials, Electrical Materials, Hardware/Fasteners, Other
 """
 
 
+# Opening messages for /chat/start; used as-is offline and replaced by
+# model-written variants when CHAT_GREETING_REFRESH_SECONDS is set
+DEFAULT_GREETINGS = (
+    "Hi there! 👋 I'm your MaterialMover advisor. What are you building, "
+    "or which construction materials can I help you find today?",
+    "Hello! Tell me about your project — a wall, roof, floor or something "
+    "else — and I'll find the right materials for you.",
+    "Welcome to MaterialMover! Which construction materials do you need? "
+    "Share the project and any budget or brand preferences.",
+    "Hi! Looking for cement, steel, tiles, paint or something else? Let me "
+    "know what you're working on and I'll recommend the best options.",
+)
+
+GREETING_PROMPT = (
+    "The user just opened the construction materials advisor chat. "
+    "Greet them briefly and ask what construction materials or "
+    "project they need help with."
+)
+
+
+# Internal / large fields the React carousel never needs
+PRODUCT_PROJECTION = {
+    "embedding": 0,
+    "embedding_int8": 0,
+    "embedding_scale": 0,
+    "embedding_generated_at": 0,
+    "embedding_model": 0,
+    "__v": 0,
+}
+
+
 # ── Tool declaration for Gemini function calling ────────────────────────────
 
 SEARCH_TOOL = types.Tool(
@@ -98,6 +141,51 @@ SEARCH_TOOL = types.Tool(
 )
 
 
+def _merge_stream_parts(parts: List[types.Part]) -> List[types.Part]:
+    """Collapse streamed text deltas into whole parts for the session history.
+
+    Function-call parts and parts carrying a thought signature are kept
+    as-is so the history replays exactly what the model produced.
+    """
+    merged: List[types.Part] = []
+    for part in parts:
+        mergeable = part.text is not None and not part.thought_signature
+        if (
+            mergeable
+            and merged
+            and merged[-1].text is not None
+            and not merged[-1].thought_signature
+            and bool(merged[-1].thought) == bool(part.thought)
+        ):
+            merged[-1] = types.Part(
+                text=merged[-1].text + part.text, thought=part.thought
+            )
+        else:
+            merged.append(part)
+    return merged
+
+
+def _chunk_parts(chunk: types.GenerateContentResponse) -> List[types.Part]:
+    """Parts of the first candidate in a streamed chunk (empty if none)."""
+    if not chunk.candidates or not chunk.candidates[0].content:
+        return []
+    return chunk.candidates[0].content.parts or []
+
+
+def _normalize_query(query: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace for query comparison."""
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+
+class SpeculativeSearch:
+    """A product search started on the user's own words before Gemini replies."""
+
+    def __init__(self, query: str, task: asyncio.Task):
+        self.query = query
+        self.task = task
+        self.duration: float = 0.0  # seconds the search took, once finished
+
+
 # ── Session management ──────────────────────────────────────────────────────
 
 class ConversationSession:
@@ -111,12 +199,86 @@ class ConversationSession:
         self.recommendations: Optional[List[Dict]] = None
         self.query_used: Optional[str] = None
         self.reasoning: Optional[str] = None
+        # How the tool search was answered: hit | semantic_hit | miss
+        self.tool_cache: Optional[str] = None
         # Stores the content history for multi-turn (list[types.Content])
         self.history: List[types.Content] = []
 
+    @property
+    def expires_at(self) -> float:
+        """Unix timestamp after which the session is discarded."""
+        ttl = timedelta(minutes=settings.CHAT_SESSION_TTL_MINUTES)
+        return (self.created_at + ttl).replace(tzinfo=timezone.utc).timestamp()
+
     @property
     def is_expired(self) -> bool:
-        return datetime.utcnow() - self.created_at > timedelta(hours=1)
+        return time.time() >= self.expires_at
+
+    def trim(self, max_history: int, max_messages: int) -> None:
+        """Drop the oldest history and messages beyond the configured caps.
+
+        The model history is only cut at a plain user turn, so a function
+        call is never separated from its function response.
+        """
+        if len(self.history) > max_history:
+            cut = len(self.history) - max_history
+            while cut < len(self.history) and not is_user_text(self.history[cut]):
+                cut += 1
+            del self.history[:cut]
+        if len(self.messages) > max_messages:
+            del self.messages[: len(self.messages) - max_messages]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-safe form used by persistent session backends."""
+        return {
+            "id": self.id,
+            "created_at": self.created_at.isoformat(),
+            "messages": self.messages,
+            "status": self.status,
+            "recommendations": self.recommendations,
+            "query_used": self.query_used,
+            "reasoning": self.reasoning,
+            "tool_cache": self.tool_cache,
+            "history": [
+                content.model_dump(mode="json", exclude_none=True)
+                for content in self.history
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ConversationSession":
+        session = cls.__new__(cls)
+        session.id = data["id"]
+        session.created_at = datetime.fromisoformat(data["created_at"])
+        session.messages = data.get("messages", [])
+        session.status = data.get("status", "active")
+        session.recommendations = data.get("recommendations")
+        session.query_used = data.get("query_used")
+        session.reasoning = data.get("reasoning")
+        session.tool_cache = data.get("tool_cache")
+        session.history = [
+            types.Content.model_validate(content)
+            for content in data.get("history", [])
+        ]
+        return session
+
+
+def _build_session_store() -> SessionStore:
+    """Create the session store selected by CHAT_SESSION_BACKEND."""
+    if settings.CHAT_SESSION_BACKEND == "disk":
+        backend = DiskSessionBackend(
+            settings.CHAT_SESSION_DIR,
+            ConversationSession.from_dict,
+            ttl_seconds=settings.CHAT_SESSION_TTL_MINUTES * 60,
+        )
+    else:
+        backend = MemorySessionBackend()
+    return SessionStore(
+        max_sessions=settings.CHAT_MAX_SESSIONS,
+        shards=settings.CHAT_SESSION_SHARDS,
+        backend=backend,
+        sweep_interval=settings.CHAT_SESSION_SWEEP_SECONDS,
+    )
 
 
 # ── Main service ────────────────────────────────────────────────────────────
@@ -125,9 +287,29 @@ class GeminiChatService:
     """Manages Gemini chat sessions with tool-calling for product search."""
 
     def __init__(self):
-        self.sessions: Dict[str, ConversationSession] = {}
+        self.sessions: SessionStore = _build_session_store()
         self.client: Optional[genai.Client] = None
         self.search_engine = None  # Set via set_search_engine()
+        self.context = ChatContext(SYSTEM_PROMPT, [SEARCH_TOOL])
+        self.greetings: List[str] = list(DEFAULT_GREETINGS)
+        self.tool_cache = ToolResultCache(
+            max_entries=settings.CHAT_TOOL_CACHE_SIZE,
+            min_similarity=settings.CHAT_TOOL_CACHE_SIMILARITY,
+        )
+        self.tool_cache_stats: Dict[str, Any] = {
+            "hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "by_outcome": {},
+        }
+        self._greeting_task: Optional[asyncio.Task] = None
+        self.speculation_stats: Dict[str, float] = {
+            "started": 0,
+            "hits": 0,
+            "misses": 0,
+            "unused": 0,
+            "saved_ms": 0.0,
+        }
 
     # -- lifecycle -----------------------------------------------------------
 
@@ -143,6 +325,25 @@ class GeminiChatService:
         self.model_name = settings.GEMINI_MODEL
         print(f"✅ Gemini chat service initialised ({self.model_name})")
 
+    def start(self) -> None:
+        """Start background tasks (session expiry, greeting refresh)."""
+        self.sessions.start()
+        if settings.CHAT_GREETING_REFRESH_SECONDS > 0 and self._greeting_task is None:
+            self._greeting_task = asyncio.get_running_loop().create_task(
+                self._refresh_greetings()
+            )
+
+    async def stop(self) -> None:
+        """Cancel background tasks."""
+        if self._greeting_task is not None:
+            self._greeting_task.cancel()
+            try:
+                await self._greeting_task
+            except asyncio.CancelledError:
+                pass
+            self._greeting_task = None
+        await self.sessions.stop()
+
     def set_search_engine(self, engine) -> None:
         """Inject the HybridSearchEngine from main.py."""
         self.search_engine = engine
@@ -151,39 +352,12 @@ class GeminiChatService:
 
     async def create_session(self) -> Dict[str, Any]:
         """Start a new conversation and return the assistant's greeting."""
-        self._cleanup_expired_sessions()
-
         session = ConversationSession()
-
-        # Ask the model to greet the user
-        greeting_prompt = (
-            "The user just opened the construction materials advisor chat. "
-            "Greet them briefly and ask what construction materials or "
-            "project they need help with."
-        )
-
-        response = await self.client.aio.models.generate_content(
-            model=self.model_name,
-            contents=greeting_prompt,
-            config=types.GenerateContentConfig(
-                system_instruction=SYSTEM_PROMPT,
-                tools=[SEARCH_TOOL],
-                automatic_function_calling=types.AutomaticFunctionCallingConfig(
-                    disable=True
-                ),
-            ),
-        )
-
-        greeting = response.text or "Hello! How can I help you find construction materials today?"
-
-        # Save greeting exchange to history
-        session.history.append(
-            types.Content(role="user", parts=[types.Part.from_text(text=greeting_prompt)])
-        )
-        session.history.append(response.candidates[0].content)
-
+        # Picked from the in-memory pool: no model call, no LLM quota. It
+        # is kept out of the model history and never resent on later turns
+        greeting = random.choice(self.greetings)
         session.messages.append({"role": "assistant", "content": greeting})
-        self.sessions[session.id] = session
+        await self._save_session(session)
 
         return {
             "session_id": session.id,
@@ -191,6 +365,28 @@ class GeminiChatService:
             "status": "active",
         }
 
+    async def _refresh_greetings(self) -> None:
+        """Regenerate the greeting pool with the model in the background."""
+        while True:
+            greetings: List[str] = []
+            for _ in range(settings.CHAT_GREETING_POOL_SIZE):
+                try:
+                    response = await self.client.aio.models.generate_content(
+                        model=self.model_name,
+                        contents=GREETING_PROMPT,
+                        config=await self.context.get_config(self.client, self.model_name),
+                    )
+                except Exception as e:
+                    print(f"⚠️  Greeting refresh failed, keeping current pool: {e}")
+                    break
+                if response.text and response.text.strip():
+                    greetings.append(response.text.strip())
+            if greetings:
+                # Swap the whole list so readers never see a partial pool
+                self.greetings = greetings
+                print(f"✅ Refreshed chat greeting pool ({len(greetings)} greetings)")
+            await asyncio.sleep(settings.CHAT_GREETING_REFRESH_SECONDS)
+
     async def send_message(
         self, session_id: str, user_message: str
     ) -> Dict[str, Any]:
@@ -200,7 +396,7 @@ class GeminiChatService:
         search_and_recommend_products tool, and we execute the search,
         feed the results back, and return the final recommendation.
         """
-        session = self._get_session(session_id)
+        session = await self._get_session(session_id)
 
         if session.status == "completed":
             return {
@@ -215,23 +411,25 @@ class GeminiChatService:
 
         session.messages.append({"role": "user", "content": user_message})
 
-        # Build contents from history + new user message
+        # Build contents from history + new user message, compacted to budget
         user_content = types.Content(
             role="user", parts=[types.Part.from_text(text=user_message)]
         )
-        contents = session.history + [user_content]
-
-        response = await self.client.aio.models.generate_content(
-            model=self.model_name,
-            contents=contents,
-            config=types.GenerateContentConfig(
-                system_instruction=SYSTEM_PROMPT,
-                tools=[SEARCH_TOOL],
-                automatic_function_calling=types.AutomaticFunctionCallingConfig(
-                    disable=True
-                ),
-            ),
-        )
+        contents = self.context.build_contents(session.history + [user_content])
+
+        # Optionally start searching on the user's words while Gemini thinks
+        speculation = self._start_speculative_search(session)
+
+        try:
+            with CHAT_LLM_SECONDS.labels("reply").time():
+                response = await self.client.aio.models.generate_content(
+                    model=self.model_name,
+                    contents=contents,
+                    config=await self.context.get_config(self.client, self.model_name),
+                )
+        except BaseException:
+            self._discard_speculation(speculation)
+            raise
 
         # Persist turn in history
         session.history.append(user_content)
@@ -240,13 +438,17 @@ class GeminiChatService:
 
         # ── Check for a function-call ───────────────────────────────────
         if response.function_calls:
-            return await self._handle_tool_call(session, response.function_calls[0])
+            return await self._handle_tool_call(
+                session, response.function_calls[0], speculation
+            )
 
         # ── Regular text reply (follow-up question) ─────────────────────
+        self._discard_speculation(speculation)
         assistant_message = response.text or ""
         session.messages.append(
             {"role": "assistant", "content": assistant_message}
         )
+        await self._save_session(session)
 
         return {
             "session_id": session_id,
@@ -256,7 +458,7 @@ class GeminiChatService:
 
     async def get_session_history(self, session_id: str) -> Dict[str, Any]:
         """Return the full message history plus current status."""
-        session = self._get_session(session_id)
+        session = await self._get_session(session_id)
         return {
             "session_id": session.id,
             "status": session.status,
@@ -265,30 +467,201 @@ class GeminiChatService:
             "products": session.recommendations,
         }
 
+    async def stream_message(
+        self, session_id: str, user_message: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming variant of send_message.
+
+        Validates the session up front (raising ValueError like
+        send_message) and returns an async iterator of events:
+
+        - ``token`` – ``{"text"}`` delta of the assistant's reply
+        - ``tool_call`` – ``{"query", "reasoning"}`` as soon as Gemini asks
+          for a search; the search starts immediately
+        - ``products`` – ``{"products", "query_used", "reasoning"}`` sent
+          before the summary text starts generating
+        - ``done`` – the same payload send_message would have returned
+        """
+        session = await self._get_session(session_id)
+        return self._stream_turn(session, user_message)
+
+    async def _stream_turn(
+        self, session: ConversationSession, user_message: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        if session.status == "completed":
+            yield {
+                "event": "done",
+                "data": {
+                    "session_id": session.id,
+                    "message": (
+                        "This conversation already completed with recommendations. "
+                        "Start a new session via POST /chat/start."
+                    ),
+                    "status": "completed",
+                    "products": session.recommendations,
+                },
+            }
+            return
+
+        session.messages.append({"role": "user", "content": user_message})
+        user_content = types.Content(
+            role="user", parts=[types.Part.from_text(text=user_message)]
+        )
+
+        parts: List[types.Part] = []
+        function_call: Optional[types.FunctionCall] = None
+        search_task: Optional[asyncio.Task] = None
+        speculation = self._start_speculative_search(session)
+
+        try:
+            llm_started = time.perf_counter()
+            stream = await self.client.aio.models.generate_content_stream(
+                model=self.model_name,
+                contents=self.context.build_contents(session.history + [user_content]),
+                config=await self.context.get_config(self.client, self.model_name),
+            )
+            async for chunk in stream:
+                for part in _chunk_parts(chunk):
+                    parts.append(part)
+                    if part.function_call and function_call is None:
+                        # Kick off the search while the stream drains
+                        function_call = part.function_call
+                        args = dict(function_call.args) if function_call.args else {}
+                        search_task = asyncio.create_task(
+                            self._resolve_search(
+                                args.get("query", ""), speculation, session
+                            )
+                        )
+                        yield {
+                            "event": "tool_call",
+                            "data": {
+                                "query": args.get("query", ""),
+                                "reasoning": args.get("reasoning", ""),
+                            },
+                        }
+                    elif part.text and not part.thought:
+                        yield {"event": "token", "data": {"text": part.text}}
+            CHAT_LLM_SECONDS.labels("reply").observe(time.perf_counter() - llm_started)
+
+            session.history.append(user_content)
+            session.history.append(
+                types.Content(role="model", parts=_merge_stream_parts(parts))
+            )
+
+            if function_call is None:
+                self._discard_speculation(speculation)
+                speculation = None
+                assistant_message = "".join(
+                    p.text for p in parts if p.text and not p.thought
+                )
+                session.messages.append(
+                    {"role": "assistant", "content": assistant_message}
+                )
+                await self._save_session(session)
+                yield {
+                    "event": "done",
+                    "data": {
+                        "session_id": session.id,
+                        "message": assistant_message,
+                        "status": "active",
+                    },
+                }
+                return
+
+            args = dict(function_call.args) if function_call.args else {}
+            query = args.get("query", "")
+            reasoning = args.get("reasoning", "")
+            products = await search_task
+            yield {
+                "event": "products",
+                "data": {
+                    "products": products,
+                    "query_used": query,
+                    "reasoning": reasoning,
+                },
+            }
+
+            # Stream the natural-language summary of the results
+            session.history.append(self._function_response_content(products))
+            summary_parts: List[types.Part] = []
+            llm_started = time.perf_counter()
+            stream = await self.client.aio.models.generate_content_stream(
+                model=self.model_name,
+                contents=self.context.build_contents(session.history),
+                config=await self.context.get_config(self.client, self.model_name),
+            )
+            async for chunk in stream:
+                for part in _chunk_parts(chunk):
+                    summary_parts.append(part)
+                    if part.text and not part.thought:
+                        yield {"event": "token", "data": {"text": part.text}}
+            CHAT_LLM_SECONDS.labels("summary").observe(time.perf_counter() - llm_started)
+
+            session.history.append(
+                types.Content(role="model", parts=_merge_stream_parts(summary_parts))
+            )
+            summary = "".join(
+                p.text for p in summary_parts if p.text and not p.thought
+            ) or "Here are the products I found for you."
+
+            yield {
+                "event": "done",
+                "data": await self._complete_session(
+                    session, summary, products, query, reasoning
+                ),
+            }
+        finally:
+            if search_task is not None and not search_task.done():
+                search_task.cancel()
+            if search_task is None and speculation is not None:
+                self._discard_speculation(speculation)
+
     # -- internal helpers ----------------------------------------------------
 
-    def _get_session(self, session_id: str) -> ConversationSession:
-        session = self.sessions.get(session_id)
+    async def _get_session(self, session_id: str) -> ConversationSession:
+        session = await self.sessions.aget(session_id)
         if not session:
-            raise ValueError(f"Session '{session_id}' not found")
-        if session.is_expired:
-            del self.sessions[session_id]
-            raise ValueError(f"Session '{session_id}' has expired")
+            raise ValueError(f"Session '{session_id}' not found or expired")
         return session
 
+    async def _save_session(self, session: ConversationSession) -> None:
+        """Apply the history caps and write the session back to the store."""
+        session.trim(settings.CHAT_MAX_HISTORY_CONTENTS, settings.CHAT_MAX_MESSAGES)
+        await self.sessions.asave(session)
+
     async def _handle_tool_call(
         self,
         session: ConversationSession,
         function_call: types.FunctionCall,
+        speculation: Optional[SpeculativeSearch] = None,
     ) -> Dict[str, Any]:
         """Execute the search tool and feed results back to Gemini."""
         args = dict(function_call.args) if function_call.args else {}
         query = args.get("query", "")
         reasoning = args.get("reasoning", "")
 
-        # Run the actual product search
-        products = await self._execute_search(query)
+        # Run the actual product search (or reuse the speculative one)
+        products = await self._resolve_search(query, speculation, session)
+
+        session.history.append(self._function_response_content(products))
+
+        # Send function result back to Gemini for a natural-language summary
+        contents = self.context.build_contents(session.history)
+
+        with CHAT_LLM_SECONDS.labels("summary").time():
+            summary_response = await self.client.aio.models.generate_content(
+                model=self.model_name,
+                contents=contents,
+                config=await self.context.get_config(self.client, self.model_name),
+            )
+
+        summary = summary_response.text or "Here are the products I found for you."
+        session.history.append(summary_response.candidates[0].content)
 
+        return await self._complete_session(session, summary, products, query, reasoning)
+
+    def _function_response_content(self, products: List[Dict]) -> types.Content:
+        """Build the tool-role content reporting search results to Gemini."""
         # Build a concise summary to send back as the function response
         products_summary = [
             {
@@ -313,35 +686,30 @@ class GeminiChatService:
             name="search_and_recommend_products",
             response={"result": json.dumps(tool_result)},
         )
-        function_response_content = types.Content(
-            role="tool", parts=[function_response_part]
-        )
-        session.history.append(function_response_content)
-
-        # Send function result back to Gemini for a natural-language summary
-        contents = session.history[:]
-
-        summary_response = await self.client.aio.models.generate_content(
-            model=self.model_name,
-            contents=contents,
-            config=types.GenerateContentConfig(
-                system_instruction=SYSTEM_PROMPT,
-                tools=[SEARCH_TOOL],
-                automatic_function_calling=types.AutomaticFunctionCallingConfig(
-                    disable=True
-                ),
-            ),
-        )
-
-        summary = summary_response.text or "Here are the products I found for you."
-        session.history.append(summary_response.candidates[0].content)
+        return types.Content(role="tool", parts=[function_response_part])
 
-        # Finalise session
+    async def _complete_session(
+        self,
+        session: ConversationSession,
+        summary: str,
+        products: List[Dict],
+        query: str,
+        reasoning: str,
+    ) -> Dict[str, Any]:
+        """Record the final recommendation and return the response payload."""
         session.messages.append({"role": "assistant", "content": summary})
         session.status = "completed"
         session.recommendations = products
         session.query_used = query
         session.reasoning = reasoning
+        await self._save_session(session)
+
+        if session.tool_cache:
+            outcome = "with_products" if products else "no_products"
+            counts = self.tool_cache_stats["by_outcome"].setdefault(
+                outcome, {"hit": 0, "semantic_hit": 0, "miss": 0}
+            )
+            counts[session.tool_cache] += 1
 
         return {
             "session_id": session.id,
@@ -352,12 +720,186 @@ class GeminiChatService:
             "products": products,
         }
 
+    # -- speculative search --------------------------------------------------
+
+    def _start_speculative_search(
+        self, session: ConversationSession
+    ) -> Optional[SpeculativeSearch]:
+        """Search on the recent user messages concurrently with the LLM call.
+
+        Only runs when CHAT_SPECULATIVE_SEARCH is enabled. The user's latest
+        message must already be in ``session.messages``.
+        """
+        if not settings.CHAT_SPECULATIVE_SEARCH or not self.search_engine:
+            return None
+
+        recent = [m["content"] for m in session.messages if m["role"] == "user"]
+        query = " ".join(recent[-settings.CHAT_SPECULATIVE_HISTORY:]).strip()
+        if not query:
+            return None
+
+        async def timed_search() -> List[Dict]:
+            started = time.perf_counter()
+            products = await self._execute_search(query)
+            speculation.duration = time.perf_counter() - started
+            return products
+
+        speculation = SpeculativeSearch(query, asyncio.ensure_future(timed_search()))
+        # A speculation nobody awaits must not log "exception never retrieved"
+        speculation.task.add_done_callback(
+            lambda t: t.cancelled() or t.exception()
+        )
+        self.speculation_stats["started"] += 1
+        return speculation
+
+    def _discard_speculation(self, speculation: Optional[SpeculativeSearch]) -> None:
+        """Drop a speculative search the model never asked for."""
+        if speculation is None:
+            return
+        speculation.task.cancel()
+        self.speculation_stats["unused"] += 1
+
+    async def _resolve_search(
+        self,
+        query: str,
+        speculation: Optional[SpeculativeSearch],
+        session: Optional[ConversationSession] = None,
+    ) -> List[Dict]:
+        """Return products for the tool query.
+
+        Served from the tool-result cache when possible; otherwise reuses a
+        matching speculation or runs the search, then caches the result.
+        """
+        with CHAT_TOOL_SECONDS.time():
+            if not self.search_engine or settings.CHAT_TOOL_CACHE_SIZE <= 0:
+                return await self._search_or_speculate(query, speculation)
+
+            key = _normalize_query(query)
+            version = self.search_engine.index_version
+            products = self.tool_cache.get(key, version)
+            status = "hit"
+            embedding = None
+            if products is None and self.tool_cache.semantic and self.search_engine.semantic_ready:
+                embedding = (await asyncio.to_thread(
+                    self.search_engine.semantic_engine.model.encode,
+                    [key],
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                ))[0]
+                match = self.tool_cache.get_similar(embedding, version)
+                if match is not None:
+                    products = match[1]
+                    status = "semantic_hit"
+
+            if products is not None:
+                self._discard_speculation(speculation)
+            else:
+                status = "miss"
+                products = await self._search_or_speculate(query, speculation)
+                # Not cached if the index changed while the search ran
+                if self.search_engine.index_version == version:
+                    self.tool_cache.put(key, version, products, embedding)
+
+            self.tool_cache_stats[
+                {"hit": "hits", "semantic_hit": "semantic_hits", "miss": "misses"}[status]
+            ] += 1
+            CHAT_TOOL_CACHE.labels(status).inc()
+            if session is not None:
+                session.tool_cache = status
+            # Cached lists are shared between sessions
+            return list(products)
+
+    async def _search_or_speculate(
+        self, query: str, speculation: Optional[SpeculativeSearch]
+    ) -> List[Dict]:
+        """Run the search for the tool query, reusing a matching speculation."""
+        if speculation is None:
+            return await self._execute_search(query)
+
+        if await self._queries_match(speculation.query, query):
+            waited_from = time.perf_counter()
+            try:
+                products = await speculation.task
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Speculative search failed, searching again: {e}")
+            else:
+                waited = time.perf_counter() - waited_from
+                saved_ms = max(speculation.duration - waited, 0.0) * 1000
+                self.speculation_stats["hits"] += 1
+                self.speculation_stats["saved_ms"] += saved_ms
+                print(
+                    f"⚡ Speculative search hit for '{query}' "
+                    f"(saved {saved_ms:.0f} ms)"
+                )
+                return products
+        else:
+            speculation.task.cancel()
+
+        self.speculation_stats["misses"] += 1
+        return await self._execute_search(query)
+
+    def get_tool_cache_stats(self) -> Dict[str, Any]:
+        """Tool-result cache size, hit rate and hits/misses per session outcome."""
+        stats = self.tool_cache_stats
+        hits = stats["hits"] + stats["semantic_hits"]
+        lookups = hits + stats["misses"]
+        return {
+            "enabled": settings.CHAT_TOOL_CACHE_SIZE > 0,
+            "semantic": self.tool_cache.semantic,
+            "entries": len(self.tool_cache),
+            "hits": stats["hits"],
+            "semantic_hits": stats["semantic_hits"],
+            "misses": stats["misses"],
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.tool_cache.invalidations,
+            "by_outcome": stats["by_outcome"],
+        }
+
+    async def _queries_match(self, speculative_query: str, tool_query: str) -> bool:
+        """True when the tool query is identical or semantically close enough."""
+        if _normalize_query(speculative_query) == _normalize_query(tool_query):
+            return True
+
+        threshold = settings.CHAT_SPECULATIVE_MIN_SIMILARITY
+        if threshold >= 1.0 or not self.search_engine.semantic_ready:
+            return False
+
+        model = self.search_engine.semantic_engine.model
+        embeddings = await asyncio.to_thread(
+            model.encode,
+            [speculative_query, tool_query],
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        )
+        return float(embeddings[0] @ embeddings[1]) >= threshold
+
+    def get_speculation_stats(self) -> Dict[str, Any]:
+        """Speculative search counters with hit rate and average saved latency."""
+        stats = self.speculation_stats
+        decided = stats["hits"] + stats["misses"]
+        return {
+            "enabled": settings.CHAT_SPECULATIVE_SEARCH,
+            "started": int(stats["started"]),
+            "hits": int(stats["hits"]),
+            "misses": int(stats["misses"]),
+            "unused": int(stats["unused"]),
+            "hit_rate": round(stats["hits"] / decided, 4) if decided else 0.0,
+            "saved_ms_total": round(stats["saved_ms"], 1),
+            "saved_ms_avg": round(stats["saved_ms"] / stats["hits"], 1)
+            if stats["hits"]
+            else 0.0,
+        }
+
     async def _execute_search(self, query: str) -> List[Dict]:
         """Run hybrid search and return full product documents.
 
         Uses the same logic as the /recommend endpoint (hybrid search
-        to get product IDs) then enriches each ID from MongoDB so the
-        response has every field the React carousel will need.
+        to get product IDs) then hydrates each ID from the in-memory
+        product cache so the response has every field the React
+        carousel will need. Cache misses fall back to one batched
+        MongoDB query.
         """
         if not self.search_engine:
             print("⚠️  Search engine not available for chat service")
@@ -373,52 +915,29 @@ class GeminiChatService:
             keyword_weight=0.3,
         )
 
-        products: List[Dict] = []
-        for result in results:
-            product_id = result.get("_id")
-            if not product_id:
-                continue
+        ranked = [(r["_id"], r.get("combined_score", 0)) for r in results if r.get("_id")]
+        if not ranked:
+            return []
 
-            # Fetch full document from MongoDB
-            full = self.search_engine.semantic_engine.db_manager.find_by_id(
-                product_id
-            )
-            if not full:
-                continue
+        # Hydrate from the in-memory product cache (already JSON-safe)
+        cache = self.search_engine.product_cache
+        docs = {doc["_id"]: doc for doc in cache.get_many(pid for pid, _ in ranked)}
 
-            # Strip internal / large fields not needed by the frontend
-            for key in (
-                "embedding",
-                "embedding_generated_at",
-                "embedding_model",
-                "__v",
-            ):
-                full.pop(key, None)
-
-            # Convert MongoDB-native types to JSON-safe strings
-            for key, val in full.items():
-                if hasattr(val, 'isoformat'):        # datetime
-                    full[key] = val.isoformat()
-                elif type(val).__name__ == 'ObjectId':  # bson ObjectId
-                    full[key] = str(val)
-
-            full["relevance_score"] = round(
-                result.get("combined_score", 0), 4
+        # Anything the cache hasn't seen yet: one $in round trip (off the
+        # event loop), with large / internal fields excluded server-side
+        missing = [pid for pid, _ in ranked if pid not in docs]
+        if missing:
+            fetched = await self.search_engine.semantic_engine.db_manager.aio.find_many_by_ids(
+                missing, projection=PRODUCT_PROJECTION
             )
-            products.append(full)
-
-        return products
+            for doc in fetched:
+                docs[doc["_id"]] = serialize_product(doc)
 
-    # -- housekeeping --------------------------------------------------------
+        products: List[Dict] = []
+        for product_id, score in ranked:
+            doc = docs.get(product_id)
+            if doc is None:
+                continue
+            products.append({**doc, "relevance_score": round(score, 4)})
 
-    def _cleanup_expired_sessions(self) -> None:
-        """Remove sessions older than 1 hour."""
-        expired = [
-            sid
-            for sid, s in self.sessions.items()
-            if s.is_expired
-        ]
-        for sid in expired:
-            del self.sessions[sid]
-        if expired:
-            print(f"🧹 Cleaned up {len(expired)} expired chat sessions")
+        return products
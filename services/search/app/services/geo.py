@@ -0,0 +1,156 @@
+"""In-memory spatial index over product coordinates"""
+import math
+from collections import defaultdict
+from typing import Dict, List, Tuple
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# Grid cell size in degrees (~55 km at the equator)
+GEO_CELL_DEGREES = 0.5
+
+
+def _coordinates(material: Dict) -> Tuple[float, float]:
+    """Return (lat, lng) from a GeoJSON Point location, or NaNs if absent"""
+    location = material.get('location') or {}
+    coordinates = location.get('coordinates') if isinstance(location, dict) else None
+    try:
+        lng, lat = float(coordinates[0]), float(coordinates[1])
+    except (TypeError, ValueError, IndexError):
+        return np.nan, np.nan
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0):
+        return np.nan, np.nan
+    return lat, lng
+
+
+def _cell(lat: float, lng: float) -> Tuple[int, int]:
+    return int(math.floor(lat / GEO_CELL_DEGREES)), int(math.floor(lng / GEO_CELL_DEGREES))
+
+
+class _GeoColumns:
+    """One immutable generation of coordinates and grid cells, published by reference swap"""
+
+    __slots__ = ("lats", "lngs", "cells", "size")
+
+    def __init__(self, lats: np.ndarray, lngs: np.ndarray, cells: Dict[Tuple[int, int], List[int]]):
+        self.lats = lats
+        self.lngs = lngs
+        self.cells = cells
+        self.size = len(lats)
+
+
+class GeoIndex:
+    """
+    Grid bucket index over product coordinates, aligned to dense doc IDs
+
+    Products are bucketed into fixed-size lat/lng cells. A radius query
+    only visits the cells overlapping the query's bounding box and then
+    checks exact haversine distance on those candidates.
+
+    Like FilterIndex, updates build new columns (and new lists for the
+    cells they touch) and swap them in together instead of writing in place.
+    """
+
+    def __init__(self):
+        self._columns = _GeoColumns(np.zeros(0), np.zeros(0), {})
+
+    @property
+    def size(self) -> int:
+        return self._columns.size
+
+    def build(self, materials: List[Dict]) -> None:
+        """Rebuild coordinates and grid from materials in dense doc ID order"""
+        coordinates = [_coordinates(m) for m in materials]
+        lats = np.array([c[0] for c in coordinates], dtype=np.float64)
+        lngs = np.array([c[1] for c in coordinates], dtype=np.float64)
+        cells: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        for idx, (lat, lng) in enumerate(coordinates):
+            if not math.isnan(lat):
+                cells[_cell(lat, lng)].append(idx)
+        self._columns = _GeoColumns(lats, lngs, dict(cells))
+
+    def set(self, idx: int, material: Dict) -> None:
+        """Insert or overwrite the coordinates for one material"""
+        current = self._columns
+        grow = max(0, idx + 1 - current.size)
+        lats = np.concatenate([current.lats, np.full(grow, np.nan)])
+        lngs = np.concatenate([current.lngs, np.full(grow, np.nan)])
+        cells = dict(current.cells)
+
+        if not grow and not math.isnan(lats[idx]):
+            old_key = _cell(lats[idx], lngs[idx])
+            if idx in cells.get(old_key, ()):
+                cells[old_key] = [row for row in cells[old_key] if row != idx]
+
+        lat, lng = _coordinates(material)
+        lats[idx], lngs[idx] = lat, lng
+        if not math.isnan(lat):
+            key = _cell(lat, lng)
+            cells[key] = cells.get(key, []) + [idx]
+        self._columns = _GeoColumns(lats, lngs, cells)
+
+    def remove(self, idx: int) -> None:
+        """Forget the coordinates of a deleted material"""
+        if idx < self.size:
+            self.set(idx, {})
+
+    def distances_km(self, lat: float, lng: float, rows: np.ndarray) -> np.ndarray:
+        """Haversine distance from (lat, lng) to each row (all < size); NaN where unknown"""
+        return self._distances_km(self._columns, lat, lng, rows)
+
+    @staticmethod
+    def _distances_km(columns: _GeoColumns, lat: float, lng: float, rows: np.ndarray) -> np.ndarray:
+        phi1, phi2 = math.radians(lat), np.radians(columns.lats[rows])
+        dphi = phi2 - phi1
+        dlambda = np.radians(columns.lngs[rows] - lng)
+        a = np.sin(dphi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    def radius_mask(self, lat: float, lng: float, radius_km: float, size: int) -> np.ndarray:
+        """Boolean mask over ``size`` dense IDs of products within ``radius_km``"""
+        columns = self._columns
+        mask = np.zeros(size, dtype=bool)
+
+        lat_span = radius_km / KM_PER_DEGREE_LAT
+        min_lat, max_lat = max(lat - lat_span, -90.0), min(lat + lat_span, 90.0)
+        # Widest longitude span is at the bounding box edge nearest a pole
+        cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+        lng_span = 180.0 if cos_lat < 1e-6 else min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 180.0)
+
+        cell_lat_lo, cell_lng_lo = _cell(min_lat, lng - lng_span)
+        cell_lat_hi, cell_lng_hi = _cell(max_lat, lng + lng_span)
+        cells_per_turn = int(round(360 / GEO_CELL_DEGREES))
+        lng_cells = range(cell_lng_lo, cell_lng_hi + 1)
+        if len(lng_cells) >= cells_per_turn:
+            lng_cells = range(-cells_per_turn // 2, cells_per_turn // 2)
+
+        candidates: List[int] = []
+        for cell_lat in range(cell_lat_lo, cell_lat_hi + 1):
+            for cell_lng in lng_cells:
+                # Wrap across the antimeridian
+                wrapped = (cell_lng + cells_per_turn // 2) % cells_per_turn - cells_per_turn // 2
+                candidates.extend(columns.cells.get((cell_lat, wrapped), ()))
+
+        if not candidates:
+            return mask
+
+        rows = np.array(sorted(set(candidates)), dtype=np.intp)
+        rows = rows[(rows < size) & (rows < columns.size)]
+        within = self._distances_km(columns, lat, lng, rows) <= radius_km
+        mask[rows[within]] = True
+        return mask
+
+    def proximity(self, lat: float, lng: float, rows: np.ndarray, decay_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Exponential distance-decay score in [0, 1] for each row
+
+        Returns (proximity, distance_km); rows without coordinates get
+        proximity 0 and distance NaN.
+        """
+        columns = self._columns
+        distances = np.full(len(rows), np.nan)
+        known = rows < columns.size
+        distances[known] = self._distances_km(columns, lat, lng, rows[known])
+        proximity = np.where(np.isnan(distances), 0.0, np.exp(-np.nan_to_num(distances) / decay_km))
+        return proximity, distances
@@ -1,9 +1,102 @@
 """Hybrid search combining semantic search and BM25 keyword search"""
-from typing import List, Dict, Any
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional, Tuple
 import numpy as np
 
+from app.core.config import settings
+from app.core.tracing import Stage
+
 from app.services.search import SemanticSearchEngine
 from app.services.keyword_search import KeywordSearchEngine
+from app.services.product_cache import ProductCache, serialize_product
+from app.services.filters import FilterIndex
+from app.services.geo import GeoIndex
+from app.services.quantization import EmbeddingIndex
+from app.services.results import FusedDoc
+
+# Reciprocal-rank fusion smoothing constant
+RRF_K = 60
+
+_PREFILTER_STAGE = Stage("prefilter")
+_BM25_STAGE = Stage("bm25")
+_FUSION_STAGE = Stage("fusion")
+
+
+def _top_indices(
+    scores: np.ndarray,
+    k: int,
+    min_score: Optional[float] = None,
+    rows: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Indices of the k highest scores (optionally only those >= min_score)
+    
+    ``rows`` restricts selection to those (sorted) indices. Ties at the
+    cut-off go to the lowest doc IDs so results are deterministic.
+    """
+    eligible = np.arange(len(scores)) if rows is None else rows
+    if min_score is not None:
+        eligible = eligible[scores[eligible] >= min_score]
+    if k < len(eligible):
+        values = scores[eligible]
+        kth_value = np.partition(values, len(values) - k)[len(values) - k]
+        above = eligible[values > kth_value]
+        ties = eligible[values == kth_value][:k - len(above)]
+        eligible = np.concatenate([above, ties])
+    return eligible
+
+
+def _normalize_min_max(scores: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Min-max normalize the masked scores into [0, 1]; unmasked -> 0"""
+    if not mask.any():
+        return np.zeros(len(scores))
+    low, high = scores[mask].min(), scores[mask].max()
+    if high - low <= 0:
+        return np.zeros(len(scores))
+    return np.where(mask, (scores - low) / (high - low), 0.0)
+
+
+def _erf(x: np.ndarray) -> np.ndarray:
+    """Vectorized erf (Abramowitz & Stegun 7.1.26, max abs error 1.5e-7)"""
+    sign = np.sign(x)
+    x = np.abs(x)
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return sign * (1.0 - poly * np.exp(-x * x))
+
+
+def _normalize_z_score(scores: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Standardize the masked scores and map them through the normal CDF into [0, 1]"""
+    if not mask.any():
+        return np.zeros(len(scores))
+    std = scores[mask].std()
+    if std <= 0:
+        return np.zeros(len(scores))
+    z = (scores - scores[mask].mean()) / std
+    cdf = 0.5 * (1.0 + _erf(z / math.sqrt(2.0)))
+    return np.where(mask, cdf, 0.0)
+
+
+def _normalize_rrf(scores: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Reciprocal-rank scores within the mask, scaled so rank 1 -> 1.0"""
+    normalized = np.zeros(len(scores))
+    masked = np.flatnonzero(mask)
+    if len(masked) == 0:
+        return normalized
+    ranked = masked[np.argsort(-scores[masked], kind="stable")]
+    ranks = np.arange(1, len(ranked) + 1)
+    normalized[ranked] = (RRF_K + 1) / (RRF_K + ranks)
+    return normalized
+
+
+FUSION_METHODS = {
+    "minmax": _normalize_min_max,
+    "zscore": _normalize_z_score,
+    "rrf": _normalize_rrf,
+}
 
 
 class HybridSearchEngine:
@@ -16,13 +109,84 @@ class HybridSearchEngine:
     def __init__(self):
         self.semantic_engine = SemanticSearchEngine()
         self.keyword_engine = KeywordSearchEngine()
+        self.product_cache = ProductCache()
+        self.filter_index = FilterIndex()
+        self.geo_index = GeoIndex()
+        # Bumped whenever indexed products change; lets callers cache results
+        self.index_version = 0
+        # starting -> warming (BM25 ready, encoder loading) -> ready | failed
+        self.state = "starting"
+        self.startup_error: Optional[str] = None
+        self.startup_timings: Dict[str, float] = {}
+    
+    @property
+    def semantic_ready(self) -> bool:
+        """Whether queries can be encoded (model loaded and warmed up)"""
+        return self.state == "ready"
+    
+    @property
+    def accepting_queries(self) -> bool:
+        """Whether search requests can be answered (possibly BM25-only)"""
+        return self.state == "ready" or (
+            self.state == "warming" and settings.SEARCH_KEYWORD_ONLY_WHILE_WARMING
+        )
+    
+    def _timed(self, stage: str, func: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        result = func()
+        self.startup_timings[stage] = round(time.perf_counter() - started, 3)
+        return result
     
     def initialize(self) -> None:
-        """Initialize both search engines"""
+        """
+        Initialize both search engines, overlapping the slow steps
+        
+        The encoder loads and warms up in one thread while the semantic
+        catalog and the BM25 index load from MongoDB in others. Once the
+        keyword side and product cache are up the engine is ``warming``
+        (BM25-only results); it becomes ``ready`` when the encoder is loaded
+        and any materials without a stored embedding have been encoded.
+        """
         print("Initializing hybrid search engine...")
-        self.semantic_engine.initialize()
-        self.keyword_engine.initialize()
-        print("✅ Hybrid search engine ready!")
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="startup") as pool:
+                model_future = pool.submit(self._timed, "model", self.semantic_engine.load_model)
+                keyword_future = pool.submit(self._timed, "keyword_index", self.keyword_engine.initialize)
+                self._timed("catalog", self.semantic_engine.load_catalog)
+                keyword_future.result()
+                self.refresh_product_cache()
+                self.refresh_filter_index()
+                self.state = "warming"
+                print("🔥 Keyword search available, encoder still loading...")
+                model_future.result()
+            
+            if self.semantic_engine.pending_materials:
+                self._timed("pending_embeddings", self.semantic_engine.index_pending)
+                self.refresh_filter_index()
+        except Exception as e:
+            self.state = "failed"
+            self.startup_error = str(e)
+            raise
+        
+        self.startup_timings["total"] = round(time.perf_counter() - started, 3)
+        # Results cached while BM25-only (e.g. chat tool cache) are now stale
+        self.index_version += 1
+        self.state = "ready"
+        print(f"✅ Hybrid search engine ready in {self.startup_timings['total']:.1f}s ({self.startup_timings})")
+    
+    def refresh_product_cache(self) -> None:
+        """Reload the product cache from the documents both engines already hold"""
+        # Keyword docmap first so semantic materials (fresher, same IDs) win
+        materials = {**self.keyword_engine.docmap}
+        id_to_index = self.semantic_engine.id_to_index
+        for material in self.semantic_engine.materials:
+            # Skip tombstones of deleted products
+            if material['_id'] in id_to_index:
+                materials[material['_id']] = material
+        self.product_cache.load(materials.values())
+        self.index_version += 1
+        print(f"✅ Product cache ready with {len(self.product_cache)} products")
     
     def shutdown(self) -> None:
         """Clean up resources"""
@@ -34,7 +198,11 @@ class HybridSearchEngine:
         top_k: int = 5,
         min_score: float = 0.3,
         semantic_weight: float = 0.6,
-        keyword_weight: float = 0.4
+        keyword_weight: float = 0.4,
+        fusion: str = "minmax",
+        exact_union: bool = False,
+        filters=None,
+        geo=None
     ) -> List[Dict[str, Any]]:
         """
         Perform hybrid search combining semantic and keyword ranking
@@ -45,112 +213,378 @@ class HybridSearchEngine:
             min_score: Minimum combined score threshold
             semantic_weight: Weight for semantic scores (default: 0.6)
             keyword_weight: Weight for keyword scores (default: 0.4)
+            fusion: Score normalization - "minmax", "zscore" or "rrf"
+            exact_union: Score every candidate in both legs and normalize
+                over the whole candidate union, instead of treating documents
+                outside a leg's top list as 0 for that leg
+            filters: Optional SearchFilters (category / price / stock),
+                applied inside both legs before top-k selection
+            geo: Optional GeoQuery; radius_km restricts both legs to nearby
+                products, decay_km blends proximity into the combined score
         
         Returns:
             List of materials with combined scores
         """
-        # Get results from both engines (fetch more to ensure good coverage)
-        fetch_count = min(top_k * 3, 50)
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method '{fusion}'")
         
-        semantic_results = self.semantic_engine.search(query, top_k=fetch_count, min_score=0.0)
-        keyword_results = self.keyword_engine.search(query, top_k=fetch_count, min_score=0.0)
+        doc_count = self._doc_count()
+        if doc_count == 0:
+            return []
         
-        # Normalize scores and combine
-        combined_scores = self._combine_results(
-            semantic_results,
-            keyword_results,
-            semantic_weight,
-            keyword_weight
-        )
+        mask, rows = self._prefilter(filters, geo, doc_count)
+        if rows is not None and len(rows) == 0:
+            return []
         
-        # Filter by minimum score and sort
-        filtered_results = [
-            item for item in combined_scores.values()
-            if item['combined_score'] >= min_score
-        ]
+        # Both legs score into arrays aligned by dense doc ID; with filters
+        # only the passing rows are scored. BM25 only while the encoder warms up
+        semantic_scores = self._semantic_scores(query, rows, doc_count) if self.semantic_ready else None
+        keyword_scores = self._keyword_scores(query, doc_count, mask)
         
-        sorted_results = sorted(
-            filtered_results,
-            key=lambda x: x['combined_score'],
-            reverse=True
-        )[:top_k]
+        with _FUSION_STAGE.time():
+            return self._fuse(
+                semantic_scores, keyword_scores, rows, top_k, min_score,
+                semantic_weight, keyword_weight, fusion, exact_union, geo
+            )
+    
+    async def search_stages(
+        self,
+        query: str,
+        top_k: int = 5,
+        min_score: float = 0.3,
+        semantic_weight: float = 0.6,
+        keyword_weight: float = 0.4,
+        fusion: str = "minmax",
+        exact_union: bool = False,
+        filters=None,
+        geo=None
+    ) -> AsyncIterator[Tuple[str, List[Dict[str, Any]]]]:
+        """
+        Progressive hybrid search for streaming responses
+        
+        Both legs start concurrently in worker threads. Yields
+        ("keyword", results) with a BM25-only preview as soon as the cheap
+        keyword leg finishes, then ("final", results) with the fused ranking
+        once the semantic leg completes. Arguments match search().
+        """
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method '{fusion}'")
+        
+        doc_count = self._doc_count()
+        if doc_count == 0:
+            yield "final", []
+            return
+        
+        mask, rows = self._prefilter(filters, geo, doc_count)
+        if rows is not None and len(rows) == 0:
+            yield "final", []
+            return
         
-        return sorted_results
+        semantic_task = None
+        if self.semantic_ready:
+            semantic_task = asyncio.ensure_future(
+                asyncio.to_thread(self._semantic_scores, query, rows, doc_count)
+            )
+        try:
+            keyword_scores = await asyncio.to_thread(self._keyword_scores, query, doc_count, mask)
+            yield "keyword", self._keyword_preview(keyword_scores, rows, top_k)
+            
+            semantic_scores = await semantic_task if semantic_task is not None else None
+            with _FUSION_STAGE.time():
+                final = self._fuse(
+                    semantic_scores, keyword_scores, rows, top_k, min_score,
+                    semantic_weight, keyword_weight, fusion, exact_union, geo
+                )
+            yield "final", final
+        finally:
+            if semantic_task is not None:
+                semantic_task.cancel()
+    
+    def _semantic_scores(self, query: str, rows: Optional[np.ndarray], doc_count: int) -> np.ndarray:
+        """Semantic leg over the dense ID space (-inf for filtered-out rows)"""
+        if rows is None:
+            semantic_scores = self.semantic_engine.score_all(query)[:doc_count]
+        else:
+            semantic_scores = np.full(doc_count, -np.inf)
+            semantic_scores[rows] = self.semantic_engine.score_all(query, rows)
+        return self._drop_removed(semantic_scores)
+    
+    def _drop_removed(self, semantic_scores: np.ndarray) -> np.ndarray:
+        """Score deleted products' tombstone rows -inf so no leg selects them"""
+        removed = self.semantic_engine.removed_rows
+        if len(removed):
+            semantic_scores[..., removed[removed < semantic_scores.shape[-1]]] = -np.inf
+        return semantic_scores
+    
+    def _keyword_scores(self, query: str, doc_count: int, mask: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """BM25 leg over the dense ID space (None if the query has no terms)"""
+        with _BM25_STAGE.time():
+            return self.keyword_engine.score_vector(
+                query, self.semantic_engine.id_to_index, doc_count, mask
+            )
     
-    def _combine_results(
+    def _keyword_preview(
         self,
-        semantic_results: List[Dict],
-        keyword_results: List[Dict],
-        semantic_weight: float,
-        keyword_weight: float
-    ) -> Dict[str, Dict[str, Any]]:
+        keyword_scores: Optional[np.ndarray],
+        rows: Optional[np.ndarray],
+        top_k: int
+    ) -> List[Dict[str, Any]]:
+        """Materialize the BM25 leg's top_k matches (semantic / combined scores unknown yet)"""
+        if keyword_scores is None:
+            return []
+        top = _top_indices(keyword_scores, top_k, rows=rows)
+        top = top[keyword_scores[top] > 0]
+        top = top[np.argsort(-keyword_scores[top], kind="stable")]
+        
+        materials = self.semantic_engine.materials
+        results = []
+        for idx in top:
+            hit = FusedDoc(materials[idx]['_id'], None, round(float(keyword_scores[idx]), 4), None)
+            material = self._materialize(hit)
+            if material is not None:
+                results.append(material)
+        return results
+    
+    def search_batch(self, requests: List[Any]) -> List[List[Dict[str, Any]]]:
         """
-        Combine and normalize scores from both search methods
+        Run several hybrid searches in one pass
+        
+        All queries are encoded in a single model batch and scored with one
+        matrix-matrix product; the BM25 leg computes each distinct query
+        term once for the whole batch. Fusion then runs per query.
+        
+        Args:
+            requests: Objects with the HybridSearchRequest fields (query,
+                top_k, min_score, weights, fusion, exact_union, filters, geo)
         
-        Uses min-max normalization to bring scores to [0, 1] range
+        Returns:
+            One result list per request, in request order
         """
-        # Extract scores
-        semantic_scores = {r['_id']: r.get('score', 0.0) for r in semantic_results}
-        keyword_scores = {r['_id']: r.get('bm25_score', 0.0) for r in keyword_results}
+        for request in requests:
+            if request.fusion not in FUSION_METHODS:
+                raise ValueError(f"Unknown fusion method '{request.fusion}'")
         
-        # Normalize semantic scores (already in 0-1 range for cosine similarity)
-        semantic_max = max(semantic_scores.values()) if semantic_scores else 1.0
-        semantic_min = min(semantic_scores.values()) if semantic_scores else 0.0
+        semantic_engine = self.semantic_engine
+        doc_count = self._doc_count()
+        if doc_count == 0 or not requests:
+            return [[] for _ in requests]
         
-        if semantic_max - semantic_min > 0:
-            normalized_semantic = {
-                doc_id: (score - semantic_min) / (semantic_max - semantic_min)
-                for doc_id, score in semantic_scores.items()
-            }
+        queries = [request.query for request in requests]
+        if self.semantic_ready:
+            semantic_matrix = self._drop_removed(semantic_engine.score_batch(queries)[:, :doc_count])
         else:
-            normalized_semantic = {doc_id: 0.0 for doc_id in semantic_scores}
+            semantic_matrix = [None] * len(queries)
+        with _BM25_STAGE.time():
+            keyword_vectors = self.keyword_engine.score_vectors(
+                queries, semantic_engine.id_to_index, doc_count
+            )
         
-        # Normalize keyword scores
-        keyword_max = max(keyword_scores.values()) if keyword_scores else 1.0
-        keyword_min = min(keyword_scores.values()) if keyword_scores else 0.0
+        batch_results = []
+        for request, semantic_scores, keyword_scores in zip(requests, semantic_matrix, keyword_vectors):
+            _, rows = self._prefilter(request.filters, request.geo, doc_count)
+            if rows is not None and len(rows) == 0:
+                batch_results.append([])
+                continue
+            with _FUSION_STAGE.time():
+                batch_results.append(self._fuse(
+                    semantic_scores, keyword_scores, rows, request.top_k, request.min_score,
+                    request.semantic_weight, request.keyword_weight,
+                    request.fusion, request.exact_union, request.geo
+                ))
+        return batch_results
+    
+    def _doc_count(self) -> int:
+        """Size of the dense doc ID space both legs agree on"""
+        return min(len(self.semantic_engine.materials), len(self.semantic_engine.index))
+    
+    def _prefilter(self, filters, geo, doc_count: int):
+        """
+        Turn structured filters and a geo radius into a mask over dense doc IDs
         
-        if keyword_max - keyword_min > 0:
-            normalized_keyword = {
-                doc_id: (score - keyword_min) / (keyword_max - keyword_min)
-                for doc_id, score in keyword_scores.items()
-            }
+        Returns (mask, rows) - both None when nothing is filtered.
+        """
+        with _PREFILTER_STAGE.time():
+            mask = self.filter_index.mask(filters, doc_count)
+            if geo is not None and geo.radius_km:
+                geo_mask = self.geo_index.radius_mask(geo.lat, geo.lng, geo.radius_km, doc_count)
+                mask = geo_mask if mask is None else mask & geo_mask
+            if mask is None:
+                return None, None
+            return mask, np.flatnonzero(mask)
+    
+    def _fuse(
+        self,
+        semantic_scores: Optional[np.ndarray],
+        keyword_scores: Optional[np.ndarray],
+        rows: Optional[np.ndarray],
+        top_k: int,
+        min_score: float,
+        semantic_weight: float,
+        keyword_weight: float,
+        fusion: str,
+        exact_union: bool,
+        geo
+    ) -> List[Dict[str, Any]]:
+        """
+        Select candidates from both legs, fuse their scores and materialize the top_k
+        
+        ``semantic_scores`` is None while the encoder is warming up; the
+        keyword leg then carries the full weight.
+        """
+        # Candidates: each leg's top list (fetch more to ensure good coverage)
+        fetch_count = min(top_k * 3, 50)
+        keyword_only = semantic_scores is None
+        if keyword_only:
+            semantic_scores = np.zeros(len(keyword_scores) if keyword_scores is not None else self._doc_count())
+            semantic_top = np.zeros(0, dtype=np.intp)
+            semantic_weight, keyword_weight = 0.0, 1.0
+        else:
+            semantic_top = _top_indices(semantic_scores, fetch_count, min_score=0.0, rows=rows)
+        if keyword_scores is not None:
+            keyword_top = _top_indices(keyword_scores, fetch_count, rows=rows)
         else:
-            normalized_keyword = {doc_id: 0.0 for doc_id in keyword_scores}
+            keyword_top = np.zeros(0, dtype=np.intp)
+            keyword_scores = np.zeros(len(semantic_scores))
+        candidates = np.union1d(semantic_top, keyword_top)
+        # BM25 top lists can pad with zero-score rows, tombstones included
+        removed = self.semantic_engine.removed_rows
+        if len(removed):
+            candidates = candidates[~np.isin(candidates, removed)]
         
-        # Combine scores
-        all_doc_ids = set(semantic_scores.keys()) | set(keyword_scores.keys())
-        combined = {}
+        if exact_union:
+            in_semantic = np.ones(len(candidates), dtype=bool)
+            in_keyword = np.full(len(candidates), len(keyword_top) > 0)
+        else:
+            in_semantic = np.isin(candidates, semantic_top)
+            in_keyword = np.isin(candidates, keyword_top)
         
-        # Create a lookup dictionary for materials
-        materials_lookup = {}
-        for result in semantic_results + keyword_results:
-            materials_lookup[result['_id']] = result
+        # Raw leg scores over the candidates (0 outside a leg's top list)
+        semantic_raw = np.where(in_semantic, semantic_scores[candidates], 0.0)
+        keyword_raw = np.where(in_keyword, keyword_scores[candidates], 0.0)
         
-        for doc_id in all_doc_ids:
-            sem_score = normalized_semantic.get(doc_id, 0.0)
-            kw_score = normalized_keyword.get(doc_id, 0.0)
-            
-            combined_score = (semantic_weight * sem_score) + (keyword_weight * kw_score)
-            
-            material = materials_lookup[doc_id].copy()
-            material['semantic_score'] = round(semantic_scores.get(doc_id, 0.0), 4)
-            material['keyword_score'] = round(keyword_scores.get(doc_id, 0.0), 4)
-            material['combined_score'] = round(combined_score, 4)
-            
-            # Remove unnecessary fields
-            material.pop('score', None)
-            material.pop('bm25_score', None)
-            material.pop('embedding', None)
-            material.pop('embedding_generated_at', None)
-            material.pop('embedding_model', None)
-            
-            combined[doc_id] = material
+        normalize = FUSION_METHODS[fusion]
+        combined = semantic_weight * normalize(semantic_raw, in_semantic) \
+            + keyword_weight * normalize(keyword_raw, in_keyword)
+        
+        # Distance-decay boost: blend proximity into the relevance score
+        distances = None
+        if geo is not None:
+            proximity, distances = self.geo_index.proximity(
+                geo.lat, geo.lng, candidates, geo.decay_km or 1.0
+            )
+            if geo.decay_km:
+                combined = (1.0 - geo.geo_weight) * combined + geo.geo_weight * proximity
+        combined = np.round(combined, 4)
+        
+        # Filter by minimum score and keep the best top_k
+        passing = np.flatnonzero(combined >= min_score)
+        order = passing[np.argsort(-combined[passing], kind="stable")][:top_k]
+        
+        # Only the final results are materialized as product dicts
+        materials = self.semantic_engine.materials
+        results = []
+        for pos in order:
+            distance = None
+            if distances is not None and not np.isnan(distances[pos]):
+                distance = round(float(distances[pos]), 2)
+            hit = FusedDoc(
+                materials[candidates[pos]]['_id'],
+                None if keyword_only else round(float(semantic_raw[pos]), 4),
+                round(float(keyword_raw[pos]), 4),
+                float(combined[pos]),
+                distance
+            )
+            material = self._materialize(hit)
+            if material is not None:
+                results.append(material)
+        return results
+    
+    def _materialize(self, hit: FusedDoc) -> Optional[Dict[str, Any]]:
+        """Build the response dict for a fused hit from the product cache"""
+        product = self.product_cache.get(hit.doc_id)
+        if product is None:
+            # Indexed by a webhook but not cached yet
+            material = self.keyword_engine.docmap.get(hit.doc_id)
+            if material is None:
+                return None
+            product = serialize_product(material)
+        
+        result = product.copy()
+        result['semantic_score'] = hit.semantic_score
+        result['keyword_score'] = hit.keyword_score
+        result['combined_score'] = hit.combined_score
+        if hit.distance_km is not None:
+            result['distance_km'] = hit.distance_km
+        return result
+    
+    def refresh_filter_index(self) -> None:
+        """Rebuild the category / price / stock filter columns and the geo index"""
+        self.filter_index.build(self.semantic_engine.materials)
+        self.geo_index.build(self.semantic_engine.materials)
+    
+    def refresh_product(self, material: Dict) -> None:
+        """
+        Bring derived per-product views up to date after a webhook
         
-        return combined
+        Call once both engines have indexed ``material``.
+        """
+        self.product_cache.upsert(material)
+        idx = self.semantic_engine.id_to_index.get(material['_id'])
+        if idx is not None:
+            self.filter_index.set(idx, material)
+            self.geo_index.set(idx, material)
+        self.index_version += 1
     
-    def rebuild_keyword_cache(self) -> bool:
-        """Rebuild BM25 keyword search index"""
-        return self.keyword_engine.rebuild()
+    def remove_product(self, product_id: str) -> bool:
+        """
+        Remove a deleted product from both indexes and every derived view
+        
+        Returns:
+            False if neither index knew the product
+        """
+        idx = self.semantic_engine.remove_material(product_id)
+        in_keyword = self.keyword_engine.remove_document(product_id)
+        self.product_cache.remove(product_id)
+        if idx is not None:
+            self.filter_index.remove(idx)
+            self.geo_index.remove(idx)
+        self.index_version += 1
+        return idx is not None or in_keyword
+    
+    def rebuild(self) -> "HybridSearchEngine":
+        """
+        Re-embed and re-index the whole catalog into a fresh engine
+        
+        The live engine keeps serving untouched while this runs; the caller
+        swaps the returned engine in. Database connections and the loaded
+        encoder are shared rather than reopened.
+        
+        Raises:
+            RuntimeError: If either index could not be rebuilt
+        """
+        fresh = HybridSearchEngine()
+        semantic, keyword = fresh.semantic_engine, fresh.keyword_engine
+        semantic.db_manager = self.semantic_engine.db_manager
+        semantic.model = self.semantic_engine.model
+        semantic.index = EmbeddingIndex(self.semantic_engine.index.mode, self.semantic_engine.index.rerank_candidates)
+        keyword.db_manager = self.keyword_engine.db_manager
+        keyword.index_path = self.keyword_engine.index_path
+        keyword.docmap_path = self.keyword_engine.docmap_path
+        keyword.term_frequency_path = self.keyword_engine.term_frequency_path
+        keyword.doc_lengths_path = self.keyword_engine.doc_lengths_path
+        
+        if not semantic.rebuild_cache():
+            raise RuntimeError("Semantic embeddings rebuild failed")
+        keyword.build()
+        keyword.save()
+        keyword._save_to_mongodb()
+        
+        fresh.refresh_product_cache()
+        fresh.refresh_filter_index()
+        fresh.startup_timings = self.startup_timings
+        fresh.index_version = self.index_version + 1
+        fresh.state = "ready"
+        return fresh
     
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics from both search engines"""
@@ -158,6 +592,9 @@ class HybridSearchEngine:
         return {
             "semantic_materials": semantic_stats["materials_loaded"],
             "keyword_materials": len(self.keyword_engine.docmap),
+            "cached_products": len(self.product_cache),
             "model": semantic_stats["model"],
-            "search_type": "hybrid"
+            "search_type": "hybrid" if self.semantic_ready else "keyword",
+            "state": self.state,
+            "startup_timings": self.startup_timings
         }
@@ -3,13 +3,15 @@ import os
 import pickle
 import string
 import math
+import heapq
 from collections import defaultdict, Counter
-from typing import List, Dict, Any
-from nltk.stem import PorterStemmer
-import nltk
+from typing import List, Dict, Any, Optional, Tuple
+from functools import lru_cache
+import numpy as np
 
 from app.core.config import settings
 from app.core.database import DatabaseManager
+from app.services.product_cache import INTERNAL_FIELDS
 
 # BM25 Parameters
 BM25_K1 = 1.5
@@ -32,6 +34,13 @@ def preprocess_text(text: str) -> str:
     return text
 
 
+@lru_cache(maxsize=1)
+def _stemmer():
+    """Shared Porter stemmer; nltk is imported on first use (~0.3 s)"""
+    from nltk.stem import PorterStemmer
+    return PorterStemmer()
+
+
 def tokenize_text(text: str) -> List[str]:
     """Tokenize, remove stopwords, and stem text"""
     text = preprocess_text(text)
@@ -41,12 +50,44 @@ def tokenize_text(text: str) -> List[str]:
     filtered_tokens = [token for token in tokens if token and token not in STOPWORDS]
     
     # Stem the tokens
-    stemmer = PorterStemmer()
+    stemmer = _stemmer()
     stemmed_tokens = [stemmer.stem(token) for token in filtered_tokens]
     
     return stemmed_tokens
 
 
+class _DensePostings:
+    """
+    One term's posting list mapped to dense doc IDs, with its tf and doc lengths
+    
+    Filtered BM25 intersects ``positions`` with the pre-filter mask without
+    touching doc ID strings. Dense IDs are append-only within one
+    id_to_index mapping, so an entry stays valid until the term's postings
+    change, the mapping is replaced, or (only if some postings were not
+    mapped yet) the mapping grows.
+    """
+    
+    __slots__ = ("version", "id_to_index", "mapped", "unmapped", "doc_freq", "positions", "tf", "doc_lengths")
+    
+    def __init__(self, version: Tuple[int, int], id_to_index: Dict[str, int], doc_freq: int,
+                 positions: np.ndarray, tf: np.ndarray, doc_lengths: np.ndarray):
+        self.version = version
+        self.id_to_index = id_to_index
+        self.mapped = len(id_to_index)
+        self.unmapped = doc_freq - len(positions)
+        self.doc_freq = doc_freq
+        self.positions = positions
+        self.tf = tf
+        self.doc_lengths = doc_lengths
+    
+    def valid_for(self, version: Tuple[int, int], id_to_index: Dict[str, int]) -> bool:
+        return (
+            self.version == version
+            and self.id_to_index is id_to_index
+            and (self.unmapped == 0 or self.mapped == len(id_to_index))
+        )
+
+
 class KeywordSearchEngine:
     """BM25-based keyword search engine for construction materials"""
     
@@ -56,6 +97,12 @@ class KeywordSearchEngine:
         self.term_frequencies: Dict[str, Counter] = {}
         self.doc_lengths: Dict[str, int] = {}
         self.db_manager = DatabaseManager()
+        # Per-term dense postings built on first use. Changing a term's
+        # postings bumps its version (reloads bump the epoch for all terms),
+        # so stale entries are rebuilt lazily
+        self._postings_epoch = 0
+        self._term_versions: Dict[str, int] = defaultdict(int)
+        self._dense_postings: Dict[str, _DensePostings] = {}
         
         # Cache file paths
         self.index_path = os.path.join(CACHE_DIR, "bm25_index.pkl")
@@ -114,6 +161,7 @@ class KeywordSearchEngine:
             self.docmap.clear()
             self.term_frequencies.clear()
             self.doc_lengths.clear()
+            self._postings_epoch += 1
             
             self.build()
             self.save()
@@ -145,6 +193,7 @@ class KeywordSearchEngine:
             self.term_frequencies = pickle.load(f)
         with open(self.doc_lengths_path, "rb") as f:
             self.doc_lengths = pickle.load(f)
+        self._postings_epoch += 1
     
     def _add_document(self, doc_id: str, text: str) -> None:
         """Add a document to the inverted index"""
@@ -162,8 +211,12 @@ class KeywordSearchEngine:
         
         for token in tokens:
             self.term_frequencies[doc_id][token] += 1
+        
+        # After the update, so a concurrent reader can't cache the old postings
+        for token in set(tokens):
+            self._term_versions[token] += 1
     
-    def add_document(self, doc_id: str, text: str) -> None:
+    def add_document(self, doc_id: str, text: str, material: Optional[Dict] = None) -> None:
         """
         PUBLIC METHOD: Add a new document to BM25 index
         Called when friend's service adds a new product via webhook
@@ -171,21 +224,13 @@ class KeywordSearchEngine:
         Args:
             doc_id: Document ID (as string)
             text: Text to index (usually product title)
+            material: Already-fetched product document (skips the DB lookup)
         """
         try:
             # CRITICAL FIX: Fetch the actual material document from MongoDB
             # We need to populate docmap so search can return results
-            if self.db_manager.collection is None:
-                self.db_manager.connect()
-            
-            from bson import ObjectId
-            material = self.db_manager.collection.find_one({"_id": ObjectId(doc_id)})
-            
-            if not material:
-                raise ValueError(f"Material {doc_id} not found in database")
-            
-            # Convert ObjectId to string for consistency
-            material['_id'] = str(material['_id'])
+            if material is None:
+                material = self._fetch_material(doc_id)
             
             # Add to docmap
             self.docmap[doc_id] = material
@@ -204,7 +249,7 @@ class KeywordSearchEngine:
             print(f"❌ BM25: Error adding document: {e}")
             raise
     
-    def update_document(self, doc_id: str, text: str) -> None:
+    def update_document(self, doc_id: str, text: str, material: Optional[Dict] = None) -> None:
         """
         PUBLIC METHOD: Update an existing document in BM25 index
         Called when friend's service updates a product via webhook
@@ -212,20 +257,12 @@ class KeywordSearchEngine:
         Args:
             doc_id: Document ID (as string)
             text: Updated text to index (usually updated product title)
+            material: Already-fetched product document (skips the DB lookup)
         """
         try:
             # CRITICAL FIX: Fetch the updated material document from MongoDB
-            if self.db_manager.collection is None:
-                self.db_manager.connect()
-            
-            from bson import ObjectId
-            material = self.db_manager.collection.find_one({"_id": ObjectId(doc_id)})
-            
-            if not material:
-                raise ValueError(f"Material {doc_id} not found in database")
-            
-            # Convert ObjectId to string for consistency
-            material['_id'] = str(material['_id'])
+            if material is None:
+                material = self._fetch_material(doc_id)
             
             # Update docmap with fresh data
             self.docmap[doc_id] = material
@@ -247,6 +284,41 @@ class KeywordSearchEngine:
             print(f"❌ BM25: Error updating document: {e}")
             raise
     
+    def remove_document(self, doc_id: str) -> bool:
+        """
+        PUBLIC METHOD: Remove a document from BM25 index
+        Called when friend's service deletes a product via webhook
+        
+        Args:
+            doc_id: Document ID (as string)
+        
+        Returns:
+            False if the document was not indexed
+        """
+        try:
+            if self.docmap.pop(doc_id, None) is None:
+                return False
+            
+            self._remove_document(doc_id)
+            self.save()
+            self._save_to_mongodb()
+            
+            print(f"✅ BM25: Removed document {doc_id} from index and docmap")
+            return True
+        except Exception as e:
+            print(f"❌ BM25: Error removing document: {e}")
+            raise
+    
+    def _fetch_material(self, doc_id: str) -> Dict:
+        """Fetch a material document from MongoDB (with string _id)"""
+        if self.db_manager.collection is None:
+            self.db_manager.connect()
+        
+        material = self.db_manager.find_by_id(doc_id)
+        if not material:
+            raise ValueError(f"Material {doc_id} not found in database")
+        return material
+    
     def _remove_document(self, doc_id: str) -> None:
         """Remove a document from the inverted index"""
         # Remove from inverted index
@@ -258,8 +330,10 @@ class KeywordSearchEngine:
                     del self.index[token]
         
         # Remove from term frequencies and doc lengths
-        self.term_frequencies.pop(doc_id, None)
+        tokens = self.term_frequencies.pop(doc_id, None) or ()
         self.doc_lengths.pop(doc_id, None)
+        for token in tokens:
+            self._term_versions[token] += 1
     
     def get_bm25_idf(self, term: str) -> float:
         """Calculate BM25 IDF for a term"""
@@ -296,6 +370,10 @@ class KeywordSearchEngine:
         bm25_tf = (tf * (K1 + 1)) / (tf + K1 * length_norm)
         return bm25_tf
     
+    def postings_count(self) -> int:
+        """Total (term, document) pairs across all posting lists"""
+        return sum(len(postings) for postings in list(self.index.values()))
+    
     def _get_avg_doc_length(self) -> float:
         """Calculate average document length"""
         if not self.doc_lengths:
@@ -358,6 +436,7 @@ class KeywordSearchEngine:
                 self.term_frequencies[doc_id] = Counter(freq_dict)
             
             self.doc_lengths = index_doc.get("doc_lengths", {})
+            self._postings_epoch += 1
             
             # CRITICAL FIX: Load actual material documents into docmap
             # The index structures are useless without the actual documents!
@@ -388,39 +467,204 @@ class KeywordSearchEngine:
         Returns:
             List of materials with BM25 scores
         """
+        results = []
+        for doc_id, score in self._rank(query, top_k, min_score):
+            material = {k: v for k, v in self.docmap[doc_id].items() if k not in INTERNAL_FIELDS}
+            material['bm25_score'] = round(score, 4)
+            results.append(material)
+        
+        return results
+    
+    def score_vector(
+        self,
+        query: str,
+        id_to_index: Dict[str, int],
+        size: int,
+        mask: Optional[np.ndarray] = None
+    ) -> Optional[np.ndarray]:
+        """
+        BM25 scores for every document, aligned to a dense doc ID space
+        
+        Args:
+            query: Search query text
+            id_to_index: Mapping from doc_id to dense position
+            size: Length of the returned array
+            mask: Optional boolean pre-filter over dense positions; posting
+                lists are intersected with it before any scoring
+        
+        Returns:
+            Array of scores (0 for non-matching documents), or None when the
+            query has no indexable terms or the index is empty
+        """
         if len(self.docmap) == 0:
-            return []
+            return None
         
         query_tokens = tokenize_text(query)
-        
         if not query_tokens:
-            return []
+            return None
+        
+        doc_count = len(self.docmap)
+        avg_doc_length = self._get_avg_doc_length()
+        scores = np.zeros(size)
+        for token in query_tokens:
+            scores += self._term_vector(token, id_to_index, size, doc_count, avg_doc_length, mask)
+        return scores
+    
+    def score_vectors(
+        self,
+        queries: List[str],
+        id_to_index: Dict[str, int],
+        size: int
+    ) -> List[Optional[np.ndarray]]:
+        """
+        BM25 score arrays for a batch of queries (see score_vector)
+        
+        Each distinct query term is scored once for the whole batch and the
+        per-term arrays are summed per query.
+        """
+        if len(self.docmap) == 0:
+            return [None for _ in queries]
         
-        # Calculate BM25 scores for all documents
-        scores: Dict[str, float] = {}
+        doc_count = len(self.docmap)
+        avg_doc_length = self._get_avg_doc_length()
+        term_vectors: Dict[str, np.ndarray] = {}
         
-        for doc_id in self.docmap.keys():
-            total_score = 0.0
+        results: List[Optional[np.ndarray]] = []
+        for query in queries:
+            query_tokens = tokenize_text(query)
+            if not query_tokens:
+                results.append(None)
+                continue
             
-            for query_token in query_tokens:
-                bm25_score = self.bm25_score(doc_id, query_token)
-                total_score += bm25_score
+            scores = np.zeros(size)
+            for token in query_tokens:
+                if token not in term_vectors:
+                    term_vectors[token] = self._term_vector(
+                        token, id_to_index, size, doc_count, avg_doc_length
+                    )
+                scores += term_vectors[token]
+            results.append(scores)
+        return results
+    
+    def _term_vector(
+        self,
+        token: str,
+        id_to_index: Dict[str, int],
+        size: int,
+        doc_count: int,
+        avg_doc_length: float,
+        mask: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        BM25 contribution of one (already tokenized) term for every document
+        
+        Computed over the term's posting list with array ops. ``mask``
+        intersects the postings with a pre-filter before scoring; IDF always
+        uses the full document frequency.
+        """
+        vector = np.zeros(size)
+        postings = self._dense_postings_for(token, id_to_index)
+        if postings is None:
+            return vector
+        
+        term_doc_count = postings.doc_freq
+        idf = math.log((doc_count - term_doc_count + 0.5) / (term_doc_count + 0.5) + 1)
+        
+        positions, tf, doc_lengths = postings.positions, postings.tf, postings.doc_lengths
+        keep = positions < size
+        if mask is not None:
+            keep[keep] = mask[positions[keep]]
+        if not keep.all():
+            positions, tf, doc_lengths = positions[keep], tf[keep], doc_lengths[keep]
+        if len(positions) == 0:
+            return vector
+        
+        if avg_doc_length == 0:
+            length_norm = 1.0
+        else:
+            length_norm = 1 - BM25_B + BM25_B * (doc_lengths / avg_doc_length)
+        
+        vector[positions] = idf * (tf * (BM25_K1 + 1)) / (tf + BM25_K1 * length_norm)
+        return vector
+    
+    def _dense_postings_for(self, token: str, id_to_index: Dict[str, int]) -> Optional[_DensePostings]:
+        """Cached dense postings of ``token`` (None if no document contains it)"""
+        version = (self._postings_epoch, self._term_versions.get(token, 0))
+        cached = self._dense_postings.get(token)
+        if cached is not None and cached.valid_for(version, id_to_index):
+            return cached
+        
+        # Snapshot: webhooks may mutate postings from the I/O pool
+        postings = list(self.index.get(token, ()))
+        if not postings:
+            return None
+        
+        positions = np.fromiter(
+            (id_to_index.get(doc_id, -1) for doc_id in postings), dtype=np.intp, count=len(postings)
+        )
+        mapped = [doc_id for doc_id, position in zip(postings, positions) if position >= 0]
+        tf = np.fromiter(
+            (self.term_frequencies.get(doc_id, {}).get(token, 0) for doc_id in mapped),
+            dtype=np.float64, count=len(mapped)
+        )
+        doc_lengths = np.fromiter(
+            (self.doc_lengths.get(doc_id, 0) for doc_id in mapped), dtype=np.float64, count=len(mapped)
+        )
+        dense = _DensePostings(version, id_to_index, len(postings), positions[positions >= 0], tf, doc_lengths)
+        self._dense_postings[token] = dense
+        return dense
+    
+    def _score_postings(self, query_tokens: List[str]) -> Dict[str, float]:
+        """
+        BM25 scores for documents containing at least one query token
+        
+        Walks the posting lists instead of every document; documents
+        missing from the result score 0.
+        """
+        scores: Dict[str, float] = defaultdict(float)
+        doc_count = len(self.docmap)
+        avg_doc_length = self._get_avg_doc_length()
+        
+        for token in query_tokens:
+            # Snapshot: webhooks may mutate postings from the I/O pool
+            postings = list(self.index.get(token, ()))
+            if not postings:
+                continue
             
-            if total_score >= min_score:
-                scores[doc_id] = total_score
+            idf = math.log((doc_count - len(postings) + 0.5) / (len(postings) + 0.5) + 1)
+            for doc_id in postings:
+                tf = self.term_frequencies.get(doc_id, Counter()).get(token, 0)
+                if avg_doc_length == 0:
+                    length_norm = 1.0
+                else:
+                    length_norm = 1 - BM25_B + BM25_B * (self.doc_lengths.get(doc_id, 0) / avg_doc_length)
+                scores[doc_id] += idf * (tf * (BM25_K1 + 1)) / (tf + BM25_K1 * length_norm)
         
-        # Sort by score and get top k
-        sorted_docs = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+        return scores
+    
+    def _rank(self, query: str, top_k: int, min_score: float) -> List[Tuple[str, float]]:
+        """Return (doc_id, BM25 score) pairs, best first"""
+        if len(self.docmap) == 0:
+            return []
         
-        # Build results
-        results = []
-        for doc_id, score in sorted_docs:
-            material = self.docmap[doc_id].copy()
-            material['bm25_score'] = round(score, 4)
-            # Remove embedding from response
-            material.pop('embedding', None)
-            material.pop('embedding_generated_at', None)
-            material.pop('embedding_model', None)
-            results.append(material)
+        query_tokens = tokenize_text(query)
         
-        return results
+        if not query_tokens:
+            return []
+        
+        scores = self._score_postings(query_tokens)
+        ranked = heapq.nlargest(
+            top_k,
+            ((doc_id, score) for doc_id, score in scores.items() if score >= min_score),
+            key=lambda x: x[1]
+        )
+        
+        # Non-matching documents score 0 and still qualify when min_score allows it
+        if len(ranked) < top_k and min_score <= 0.0:
+            for doc_id in list(self.docmap.keys()):
+                if doc_id not in scores:
+                    ranked.append((doc_id, 0.0))
+                    if len(ranked) == top_k:
+                        break
+        
+        return ranked
@@ -0,0 +1,159 @@
+"""In-process cache of API-ready product documents"""
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+
+from app.core.encoding import dumps
+
+
+# Fields that only matter to the search engines and never leave the service
+INTERNAL_FIELDS = (
+    "embedding", "embedding_int8", "embedding_scale",
+    "embedding_generated_at", "embedding_model", "__v",
+)
+
+# Response fields of app.models.schemas.Material (minus scores) and their defaults
+MATERIAL_FIELDS = (
+    ("_id", None),
+    ("title", None),
+    ("description", None),
+    ("category", None),
+    ("price", None),
+    ("quantity", 0),
+    ("brand", ""),
+    ("image", ""),
+    ("phone_number", ""),
+    ("address", ""),
+)
+MATERIAL_SCORE_FIELDS = ("score", "semantic_score", "keyword_score", "combined_score", "distance_km")
+
+
+def _to_json_safe(value: Any) -> Any:
+    """Convert MongoDB-native values (recursively) into JSON-safe ones"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        # Match the ISO format Mongoose emits so JS clients parse it as UTC
+        if value.tzinfo is None:
+            return value.isoformat(timespec="milliseconds") + "Z"
+        return value.isoformat(timespec="milliseconds")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {k: _to_json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json_safe(v) for v in value]
+    return value
+
+
+def serialize_product(material: Dict) -> Dict[str, Any]:
+    """Strip internal fields and convert a raw product document to JSON-safe types"""
+    return {
+        key: _to_json_safe(value)
+        for key, value in material.items()
+        if key not in INTERNAL_FIELDS
+    }
+
+
+def encode_material_fragment(product: Dict[str, Any]) -> bytes:
+    """
+    Encode the Material-shaped part of a search result, left open
+
+    The fragment lacks its closing brace so per-request score fields can be
+    appended without re-encoding the product.
+    """
+    material = {key: product.get(key, default) for key, default in MATERIAL_FIELDS}
+    if isinstance(material["price"], int) and not isinstance(material["price"], bool):
+        material["price"] = float(material["price"])
+    return dumps(material)[:-1]
+
+
+class ProductCache:
+    """
+    Authoritative in-memory copy of every indexed product
+
+    Entries are stored already serialized (no embeddings, ObjectIds and
+    datetimes converted) so search, recommend and chat responses can be
+    hydrated without a MongoDB round trip. The ingestion path (startup load,
+    webhooks, cache rebuilds) keeps it fresh.
+
+    Alongside each payload the cache keeps pre-encoded JSON: the full
+    product document and a Material-shaped fragment for /search. Both are
+    rebuilt whenever the product is upserted.
+
+    Cached dicts are shared: callers must copy before adding per-request
+    fields such as scores.
+    """
+
+    def __init__(self):
+        self._products: Dict[str, Dict[str, Any]] = {}
+        self._encoded: Dict[str, bytes] = {}
+        self._fragments: Dict[str, bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self._products
+
+    def load(self, materials: Iterable[Dict]) -> None:
+        """Replace the cache contents with the given raw product documents"""
+        products, encoded, fragments = {}, {}, {}
+        for material in materials:
+            product = serialize_product(material)
+            product_id = product["_id"]
+            products[product_id] = product
+            encoded[product_id] = dumps(product)
+            fragments[product_id] = encode_material_fragment(product)
+        # Swap in whole dicts so readers never see a half-built cache
+        self._products, self._encoded, self._fragments = products, encoded, fragments
+
+    def upsert(self, material: Dict) -> Dict[str, Any]:
+        """Insert or replace a single product from its raw document"""
+        product = serialize_product(material)
+        product_id = product["_id"]
+        self._encoded[product_id] = dumps(product)
+        self._fragments[product_id] = encode_material_fragment(product)
+        self._products[product_id] = product
+        return product
+
+    def remove(self, product_id: str) -> None:
+        """Drop a product from the cache"""
+        self._products.pop(product_id, None)
+        self._encoded.pop(product_id, None)
+        self._fragments.pop(product_id, None)
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """Return the cached product payload, if present"""
+        return self._products.get(product_id)
+
+    def get_many(self, product_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Return cached payloads in the given order, skipping unknown IDs"""
+        products = self._products
+        return [products[pid] for pid in product_ids if pid in products]
+
+    def get_encoded(self, product_id: str) -> Optional[bytes]:
+        """Return the product payload as pre-encoded JSON, if present"""
+        return self._encoded.get(product_id)
+
+    def encode_products(self, product_ids: Iterable[str]) -> bytes:
+        """Encode cached products as a JSON array, in the given order"""
+        encoded = self._encoded
+        return b"[" + b",".join(encoded[pid] for pid in product_ids if pid in encoded) + b"]"
+
+    def encode_search_result(self, result: Dict[str, Any]) -> bytes:
+        """Encode one search result as a Material object using the cached fragment"""
+        fragment = self._fragments.get(result["_id"])
+        if fragment is None:
+            fragment = encode_material_fragment(serialize_product(result))
+        scores = dumps({field: result.get(field) for field in MATERIAL_SCORE_FIELDS})
+        return fragment + b"," + scores[1:]
+
+    def encode_search_response(self, query: str, results: List[Dict[str, Any]]) -> bytes:
+        """Assemble a complete SearchResponse body without per-field encoding"""
+        return b"".join((
+            b'{"query":', dumps(query),
+            b',"results":[', b",".join(self.encode_search_result(r) for r in results),
+            b'],"total":', str(len(results)).encode(), b"}",
+        ))
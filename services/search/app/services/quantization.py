@@ -0,0 +1,294 @@
+"""Quantized embedding storage and scoring for semantic search
+
+Embeddings are L2-normalized once at build time so cosine similarity is
+a plain dot product. Three in-memory representations are supported:
+
+- ``none``: float32 matrix (exact)
+- ``int8``: symmetric per-vector int8 codes + float32 scale for the
+  first pass, plus a second int8 code of the quantization residual so the
+  top candidates are re-ranked against a near-exact reconstruction
+  (~2x smaller than float32)
+- ``binary``: packed sign bits for a fast Hamming first pass; the int8
+  codes and residuals are kept as well for the same re-rank
+
+Stored in MongoDB as int8 (``embedding_int8`` + ``embedding_scale``) a
+vector takes 384 bytes instead of a ~3 KB BSON double array.
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from bson.binary import Binary
+
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+# Rows scored per block when dequantizing int8 codes (bounds temp memory)
+SCORE_CHUNK_ROWS = 16384
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Return float32 rows scaled to unit length (zero rows stay zero)"""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def _quantize_rows(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    scales = np.abs(values).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(values / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-vector int8 quantization of unit vectors -> (codes, scales)"""
+    return _quantize_rows(normalize(vectors))
+
+
+def quantize_residual(vectors: np.ndarray, codes: np.ndarray, scales: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """int8 codes of the error ``codes * scales`` leaves on each unit vector"""
+    return _quantize_rows(normalize(vectors) - codes.astype(np.float32) * scales[:, None])
+
+
+def pack_signs(vectors: np.ndarray) -> np.ndarray:
+    """Sign bits of each row packed into uint64 words (for Hamming distance)"""
+    packed = np.packbits(np.atleast_2d(vectors) > 0, axis=1)
+    pad = -packed.shape[1] % 8
+    if pad:
+        packed = np.pad(packed, ((0, 0), (0, pad)))
+    return np.ascontiguousarray(packed).view(np.uint64)
+
+
+def has_embedding(material: Dict) -> bool:
+    """True if a product document carries a stored embedding in any format"""
+    return bool(material.get("embedding")) or bool(material.get("embedding_int8"))
+
+
+def stored_vector(material: Dict) -> Optional[np.ndarray]:
+    """Float32 embedding from a product document (float array or int8 + scale)"""
+    if material.get("embedding_int8"):
+        codes = np.frombuffer(bytes(material["embedding_int8"]), dtype=np.int8)
+        return codes.astype(np.float32) * np.float32(material.get("embedding_scale", 1.0))
+    if material.get("embedding"):
+        return np.asarray(material["embedding"], dtype=np.float32)
+    return None
+
+
+def int8_storage_fields(embedding) -> Dict:
+    """MongoDB fields storing an embedding as int8 codes (384 B instead of ~3 KB)"""
+    codes, scales = quantize_int8(embedding)
+    return {"embedding_int8": Binary(codes[0].tobytes()), "embedding_scale": float(scales[0])}
+
+
+class _IndexArrays:
+    """One immutable generation of index arrays; replaced whole, never resized in place"""
+
+    __slots__ = ("vectors", "codes", "scales", "residuals", "residual_scales", "bits", "size")
+
+    def __init__(self, vectors=None, codes=None, scales=None, residuals=None, residual_scales=None,
+                 bits=None, size: int = 0):
+        self.vectors = np.zeros((0, 0), dtype=np.float32) if vectors is None else vectors
+        self.codes = np.zeros((0, 0), dtype=np.int8) if codes is None else codes
+        self.scales = np.zeros(0, dtype=np.float32) if scales is None else scales
+        self.residuals = np.zeros((0, 0), dtype=np.int8) if residuals is None else residuals
+        self.residual_scales = np.zeros(0, dtype=np.float32) if residual_scales is None else residual_scales
+        self.bits = np.zeros((0, 0), dtype=np.uint64) if bits is None else bits
+        self.size = size
+
+
+_ARRAY_NAMES = ("vectors", "codes", "scales", "residuals", "residual_scales", "bits")
+
+
+class EmbeddingIndex:
+    """
+    Document embeddings aligned to dense doc IDs, stored per ``mode``
+
+    ``score`` always returns one cosine estimate per row so the hybrid
+    fusion stage sees a full score vector whatever the representation.
+    Quantized modes score every row from the first-pass codes, then
+    re-score the top ``rerank_candidates`` from codes + residuals.
+
+    Webhooks grow the index from worker threads while searches read it,
+    so build() and append() assemble complete new arrays and publish them
+    with their size in a single reference swap; scoring works on the
+    generation it read first. set() overwrites one row in place.
+    """
+
+    def __init__(self, mode: str = "none", rerank_candidates: int = 200):
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown embedding quantization '{mode}'")
+        self.mode = mode
+        self.rerank_candidates = rerank_candidates
+        self.dim = 0
+        self._arrays = _IndexArrays()
+
+    def __len__(self) -> int:
+        return self._arrays.size
+
+    @property
+    def size(self) -> int:
+        return self._arrays.size
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._arrays.vectors
+
+    @property
+    def codes(self) -> np.ndarray:
+        return self._arrays.codes
+
+    @property
+    def scales(self) -> np.ndarray:
+        return self._arrays.scales
+
+    @property
+    def residuals(self) -> np.ndarray:
+        return self._arrays.residuals
+
+    @property
+    def residual_scales(self) -> np.ndarray:
+        return self._arrays.residual_scales
+
+    @property
+    def bits(self) -> np.ndarray:
+        return self._arrays.bits
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the index arrays"""
+        return sum(getattr(self._arrays, name).nbytes for name in _ARRAY_NAMES)
+
+    # -- building ------------------------------------------------------------
+
+    def _encode(self, vectors: np.ndarray) -> Dict[str, np.ndarray]:
+        vectors = normalize(vectors)
+        if self.mode == "none":
+            return {"vectors": vectors}
+        codes, scales = quantize_int8(vectors)
+        residuals, residual_scales = quantize_residual(vectors, codes, scales)
+        parts = {"codes": codes, "scales": scales, "residuals": residuals, "residual_scales": residual_scales}
+        if self.mode == "binary":
+            parts["bits"] = pack_signs(vectors)
+        return parts
+
+    def build(self, vectors: np.ndarray) -> None:
+        """Replace the index contents with ``vectors`` (n, dim)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.size == 0:
+            self.dim = 0
+            self._arrays = _IndexArrays()
+            return
+        self.dim = vectors.shape[1]
+        self._arrays = _IndexArrays(size=len(vectors), **self._encode(vectors))
+
+    def append(self, vectors) -> None:
+        """Add one embedding, or a (n, dim) batch, as the next dense doc IDs"""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        current = self._arrays
+        if current.size == 0:
+            self.build(vectors)
+            return
+        parts = {
+            name: np.concatenate([getattr(current, name), value])
+            for name, value in self._encode(vectors).items()
+        }
+        # Arrays this mode doesn't use stay as they were
+        self._arrays = _IndexArrays(**{
+            name: parts.get(name, getattr(current, name)) for name in _ARRAY_NAMES
+        }, size=current.size + len(vectors))
+
+    def set(self, idx: int, vector) -> None:
+        """Overwrite the embedding for one dense doc ID"""
+        arrays = self._arrays
+        for name, value in self._encode(vector).items():
+            getattr(arrays, name)[idx] = value[0]
+
+    # -- scoring -------------------------------------------------------------
+
+    def score(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Cosine similarity of ``query`` against every row (or the given rows)
+
+        Result is aligned to ``rows`` when given. In quantized modes, rows
+        outside the re-ranked top candidates carry the first-pass estimate.
+        """
+        arrays = self._arrays
+        query = normalize(query)[0]
+        if self.mode == "none":
+            vectors = arrays.vectors if rows is None else arrays.vectors[rows]
+            return vectors @ query
+        if self.mode == "int8":
+            scores = self._int8_scores(arrays, query, rows)
+        else:
+            scores = self._binary_scores(arrays, query, rows)
+        return self._rerank(arrays, query, scores, rows)
+
+    def score_batch(self, queries: np.ndarray) -> np.ndarray:
+        """(len(queries), size) cosine similarities"""
+        arrays = self._arrays
+        queries = normalize(queries)
+        if self.mode == "none":
+            return queries @ arrays.vectors.T
+        if self.mode == "int8":
+            out = np.empty((len(queries), arrays.size), dtype=np.float32)
+            for start in range(0, arrays.size, SCORE_CHUNK_ROWS):
+                block = arrays.codes[start:start + SCORE_CHUNK_ROWS].astype(np.float32)
+                out[:, start:start + len(block)] = queries @ block.T
+            out *= arrays.scales
+        else:
+            out = np.stack([self._binary_scores(arrays, q, None) for q in queries])
+        for query, scores in zip(queries, out):
+            self._rerank(arrays, query, scores, None)
+        return out
+
+    @staticmethod
+    def _int8_scores(arrays: _IndexArrays, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        codes = arrays.codes if rows is None else arrays.codes[rows]
+        scales = arrays.scales if rows is None else arrays.scales[rows]
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_CHUNK_ROWS):
+            block = codes[start:start + SCORE_CHUNK_ROWS]
+            out[start:start + len(block)] = block.astype(np.float32) @ query
+        return out * scales
+
+    def _binary_scores(self, arrays: _IndexArrays, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        bits = arrays.bits if rows is None else arrays.bits[rows]
+        query_bits = pack_signs(query)[0]
+        hamming = np.bitwise_count(np.bitwise_xor(bits, query_bits)).sum(axis=1, dtype=np.int32)
+        # Angle estimate from the fraction of disagreeing signs
+        return np.cos(np.pi * hamming / self.dim).astype(np.float32)
+
+    def _rerank(self, arrays: _IndexArrays, query: np.ndarray, scores: np.ndarray,
+                rows: Optional[np.ndarray]) -> np.ndarray:
+        """Re-score the top candidates in place: float32 query x (codes + residuals)"""
+        candidates = min(self.rerank_candidates, len(scores))
+        if candidates > 0:
+            top = np.argpartition(-scores, candidates - 1)[:candidates]
+            doc_rows = top if rows is None else np.asarray(rows)[top]
+            scores[top] = (
+                (arrays.codes[doc_rows].astype(np.float32) @ query) * arrays.scales[doc_rows]
+                + (arrays.residuals[doc_rows].astype(np.float32) @ query) * arrays.residual_scales[doc_rows]
+            )
+        return scores
+
+
+def recall_at_k(exact: np.ndarray, index: EmbeddingIndex, k: int = 10, sample: int = 200, seed: int = 0) -> float:
+    """
+    Recall@k of ``index`` against exact float32 search
+
+    Uses a sample of the document vectors themselves as queries.
+    """
+    exact = normalize(exact)
+    n = len(exact)
+    if n == 0 or len(index) != n:
+        return 1.0
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+    queries = exact[rng.choice(n, size=min(sample, n), replace=False)]
+
+    found = 0
+    for query in queries:
+        truth = np.argpartition(-(exact @ query), k - 1)[:k]
+        approx = np.argpartition(-index.score(query), k - 1)[:k]
+        found += len(np.intersect1d(truth, approx))
+    return found / (k * len(queries))
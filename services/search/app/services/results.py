@@ -0,0 +1,30 @@
+"""Lightweight result records produced by the search pipeline
+
+Engine legs hand the fusion stage dense score arrays; fused hits are
+carried as these records and products are only materialized for the
+final top-k.
+"""
+from typing import Optional
+
+
+class FusedDoc:
+    """A candidate after hybrid score fusion"""
+
+    __slots__ = ("doc_id", "semantic_score", "keyword_score", "combined_score", "distance_km")
+
+    def __init__(
+        self,
+        doc_id: str,
+        semantic_score: float,
+        keyword_score: float,
+        combined_score: float,
+        distance_km: Optional[float] = None
+    ):
+        self.doc_id = doc_id
+        self.semantic_score = semantic_score
+        self.keyword_score = keyword_score
+        self.combined_score = combined_score
+        self.distance_km = distance_km
+
+    def __repr__(self) -> str:
+        return f"FusedDoc({self.doc_id!r}, {self.combined_score:.4f})"
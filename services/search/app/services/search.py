@@ -1,12 +1,35 @@
 """Semantic search service for construction materials"""
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from bson.objectid import ObjectId
 
 from app.core.config import settings
 from app.core.database import DatabaseManager
+from app.core.tracing import Stage
+from app.services.encoder import load_encoder
+from app.services.product_cache import INTERNAL_FIELDS
+from app.services.quantization import (
+    EmbeddingIndex, has_embedding, int8_storage_fields, recall_at_k, stored_vector
+)
+
+# sentence_transformers (and torch) load with the model, see encoder.py
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+# Raw embedding fields dropped from in-memory materials once indexed
+EMBEDDING_FIELDS = ("embedding", "embedding_int8", "embedding_scale")
+
+_ENCODE_STAGE = Stage("encode")
+_SEMANTIC_STAGE = Stage("semantic")
+
+# Encoded once at startup so the first real query runs on a warm model
+WARMUP_QUERIES = [
+    "cement for foundation work",
+    "steel rods for reinforcement",
+    "waterproofing material for roof",
+    "paint for exterior walls",
+]
 
 
 class SemanticSearchEngine:
@@ -14,16 +37,46 @@ class SemanticSearchEngine:
     
     def __init__(self):
         self.model_name = settings.MODEL_NAME
-        self.model: SentenceTransformer = None
+        self.model: Optional["SentenceTransformer"] = None
         self.db_manager = DatabaseManager()
         self.materials: List[Dict] = []
-        self.embeddings: np.ndarray = np.array([])
+        # Embeddings by dense doc ID, float32 or quantized (see quantization.py)
+        self.index = EmbeddingIndex(settings.EMBEDDING_QUANTIZATION, settings.EMBEDDING_RERANK_CANDIDATES)
+        # Recall@10 of the quantized index vs exact search, measured at load
+        self.quantization_recall: Optional[float] = None
+        # Dense doc ID: material _id -> row in materials / embeddings
+        self.id_to_index: Dict[str, int] = {}
+        # Loaded materials still waiting for an embedding (needs the model)
+        self.pending_materials: List[Dict] = []
+        # Dense doc IDs of deleted materials; their rows stay as tombstones
+        # so IDs never shift under concurrent readers (replaced, not mutated)
+        self.removed_rows = np.zeros(0, dtype=np.intp)
     
     def initialize(self) -> None:
         """Initialize model, database connection, and load materials"""
-        print(f"Loading model: {self.model_name}...")
-        self.model = SentenceTransformer(self.model_name)
+        self.load_model()
+        self.load_catalog()
+    
+    def load_model(self) -> None:
+        """Load the encoder and run a warm-up batch"""
+        print(f"Loading model: {self.model_name} ({settings.ENCODER_BACKEND} backend)...")
+        model = load_encoder(self.model_name)
+        if settings.ENCODER_WARMUP:
+            # First calls pay for lazy init, allocator growth and kernel
+            # selection; do that here instead of on the first real query
+            model.encode(WARMUP_QUERIES[0], convert_to_numpy=True)
+            model.encode(WARMUP_QUERIES, convert_to_numpy=True)
+            print("✅ Encoder warmed up")
+        self.model = model
+    
+    def load_catalog(self) -> None:
+        """
+        Connect to MongoDB and index every material with a stored embedding
         
+        Does not need the model. Materials without an embedding are kept in
+        ``pending_materials`` until index_pending() runs (immediately if the
+        model is already loaded).
+        """
         print("Connecting to MongoDB...")
         self.db_manager.connect()
         
@@ -48,57 +101,78 @@ class SemanticSearchEngine:
         embeddings_list = []
         materials_without_embeddings = []
         
-        # Separate materials with and without embeddings
+        # Separate materials with and without embeddings (float or int8 stored)
         for material in all_materials:
-            if 'embedding' in material and material['embedding']:
+            vector = stored_vector(material)
+            if vector is not None:
                 materials_with_embeddings.append(material)
-                embeddings_list.append(material['embedding'])
+                embeddings_list.append(vector)
             else:
                 materials_without_embeddings.append(material)
         
         print(f"✅ Loaded {len(materials_with_embeddings)} materials with embeddings")
         
-        # Generate embeddings for materials that don't have them
-        if materials_without_embeddings:
-            print(f"🔄 Generating embeddings for {len(materials_without_embeddings)} materials...")
-            self._generate_embeddings_batch(materials_without_embeddings, materials_with_embeddings, embeddings_list)
+        vectors = np.array(embeddings_list, dtype=np.float32)
+        del embeddings_list
+        for material in materials_with_embeddings:
+            self._strip_embedding(material)
         
+        self.index.build(vectors)
         self.materials = materials_with_embeddings
-        self.embeddings = np.array(embeddings_list)
+        self.id_to_index = {m['_id']: idx for idx, m in enumerate(self.materials)}
+        self.removed_rows = np.zeros(0, dtype=np.intp)
+        self.pending_materials = materials_without_embeddings
+        
+        if self.index.mode != "none" and len(vectors):
+            self.quantization_recall = recall_at_k(vectors, self.index, k=10)
+            print(
+                f"✅ {self.index.mode} embedding index: {self.index.nbytes / 1e6:.1f} MB "
+                f"(float32 {vectors.nbytes / 1e6:.1f} MB), recall@10 {self.quantization_recall:.3f}"
+            )
+        
+        # Generate embeddings for materials that don't have them
+        if self.pending_materials and self.model is not None:
+            self.index_pending()
         
         print(f"✅ Ready! {len(self.materials)} materials indexed for semantic search")
     
-    def _generate_embeddings_batch(
-        self, 
-        materials_to_process: List[Dict],
-        existing_materials: List[Dict],
-        existing_embeddings: List
-    ) -> None:
-        """Generate embeddings for a batch of materials"""
-        for i, material in enumerate(materials_to_process):
-            # Create searchable text
-            text = f"{material.get('title', '')} {material.get('category', '')} {material.get('description', '')}"
-            
-            # Generate embedding
-            embedding = self.model.encode(text, convert_to_numpy=True).tolist()
-            
-            # Save to database
-            self.db_manager.update_embedding(material['_id'], embedding)
-            
-            # Update material object
-            material['embedding'] = embedding
-            material['embedding_generated_at'] = datetime.utcnow()
-            material['embedding_model'] = self.model_name
-            
-            # Add to results
-            existing_materials.append(material)
-            existing_embeddings.append(embedding)
-            
-            # Progress indicator
-            if (i + 1) % 10 == 0 or (i + 1) == len(materials_to_process):
-                print(f"  Generated {i + 1}/{len(materials_to_process)} embeddings")
+    def index_pending(self, batch_size: int = 64) -> int:
+        """
+        Generate, store and index embeddings for ``pending_materials``
         
-        print(f"✅ Generated and saved {len(materials_to_process)} embeddings")
+        Returns:
+            Number of materials added to the index
+        """
+        pending = self.pending_materials
+        if not pending:
+            return 0
+        
+        print(f"🔄 Generating embeddings for {len(pending)} materials...")
+        embeddings = []
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            texts = [
+                f"{m.get('title', '')} {m.get('category', '')} {m.get('description', '')}"
+                for m in batch
+            ]
+            batch_embeddings = self.model.encode(texts, convert_to_numpy=True)
+            for material, embedding in zip(batch, batch_embeddings):
+                # Save to database
+                self._store_embedding(material['_id'], embedding.tolist())
+                material['embedding_generated_at'] = datetime.utcnow()
+                material['embedding_model'] = self.model_name
+            embeddings.append(batch_embeddings)
+            print(f"  Generated {start + len(batch)}/{len(pending)} embeddings")
+        
+        # Index first so readers bounded by len(index) never see a row early
+        self.index.append(np.concatenate(embeddings))
+        for material in pending:
+            self.id_to_index[material['_id']] = len(self.materials)
+            self.materials.append(material)
+        self.pending_materials = []
+        
+        print(f"✅ Generated and saved {len(pending)} embeddings")
+        return len(pending)
     
     def search(
         self,
@@ -117,63 +191,131 @@ class SemanticSearchEngine:
         Returns:
             List of materials with similarity scores
         """
+        materials = self.materials
+        results = []
+        for idx, score in self._rank(query, top_k, min_score):
+            material = {k: v for k, v in materials[idx].items() if k not in INTERNAL_FIELDS}
+            material['score'] = round(score, 4)
+            results.append(material)
+        
+        return results
+    
+    def score_all(self, query: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Cosine similarity of the query against materials, indexed by dense doc ID
+        
+        Args:
+            query: Search query text
+            rows: Optional dense doc IDs to score (pre-filter); only these
+                rows are touched and the result is aligned to ``rows``
+        """
         if len(self.materials) == 0:
-            return []
+            return np.zeros(0)
+        if self.model is None:
+            raise RuntimeError("Encoder is still loading")
         
-        # Encode query
-        query_embedding = self.model.encode(query, convert_to_numpy=True)
+        with _ENCODE_STAGE.time():
+            query_embedding = self.model.encode(query, convert_to_numpy=True)
+        with _SEMANTIC_STAGE.time():
+            return self.index.score(query_embedding, rows)
+    
+    def score_batch(self, queries: List[str]) -> np.ndarray:
+        """
+        Cosine similarity for several queries at once
         
-        # Calculate cosine similarity
-        similarities = self._cosine_similarity(query_embedding)
+        Encodes all queries in one model batch and scores them with a single
+        matrix-matrix product. Returns a (len(queries), materials) array.
+        """
+        if len(self.materials) == 0:
+            return np.zeros((len(queries), 0))
+        if self.model is None:
+            raise RuntimeError("Encoder is still loading")
         
-        # Get top k indices
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        with _ENCODE_STAGE.time():
+            query_embeddings = np.atleast_2d(self.model.encode(queries, convert_to_numpy=True))
+        with _SEMANTIC_STAGE.time():
+            return self.index.score_batch(query_embeddings)
+    
+    def _rank(self, query: str, top_k: int, min_score: float) -> List[Tuple[int, float]]:
+        """Return (material index, similarity) pairs, best first"""
+        materials = self.materials
+        if len(materials) == 0:
+            return []
         
-        # Build results
-        results = []
-        for idx in top_indices:
-            score = float(similarities[idx])
-            if score >= min_score:
-                material = self.materials[idx].copy()
-                material['score'] = round(score, 4)
-                # Remove embedding from response
-                material.pop('embedding', None)
-                material.pop('embedding_generated_at', None)
-                material.pop('embedding_model', None)
-                results.append(material)
+        # Encode query and calculate cosine similarity (the index may
+        # already hold rows a concurrent webhook hasn't added to materials)
+        similarities = self.score_all(query)[:len(materials)]
+        removed = self.removed_rows
+        if len(removed):
+            similarities[removed[removed < len(similarities)]] = -np.inf
         
-        return results
+        # Get top k indices (partial selection, then sort only the winners)
+        if top_k < len(similarities):
+            top_indices = np.argpartition(-similarities, top_k)[:top_k]
+            top_indices = top_indices[np.argsort(-similarities[top_indices])]
+        else:
+            top_indices = np.argsort(-similarities)
+        
+        return [
+            (int(idx), float(similarities[idx]))
+            for idx in top_indices
+            if similarities[idx] >= min_score
+        ]
     
-    def _cosine_similarity(self, query_embedding: np.ndarray) -> np.ndarray:
-        """Calculate cosine similarity between query and all material embeddings"""
-        return np.dot(self.embeddings, query_embedding) / (
-            np.linalg.norm(self.embeddings, axis=1) * np.linalg.norm(query_embedding)
-        )
+    def _store_embedding(self, product_id: str, embedding: List[float]) -> None:
+        """Write an embedding to MongoDB in the configured storage format"""
+        if settings.EMBEDDING_STORAGE == "int8":
+            self.db_manager.update_embedding_fields(
+                product_id, int8_storage_fields(embedding), unset=("embedding",)
+            )
+        else:
+            self.db_manager.update_embedding_fields(
+                product_id, {"embedding": embedding}, unset=("embedding_int8", "embedding_scale")
+            )
     
-    def add_material(self, product_id: str) -> bool:
+    @staticmethod
+    def _strip_embedding(material: Dict) -> None:
+        """Drop raw vectors from an indexed material; the index holds them"""
+        for field in EMBEDDING_FIELDS:
+            material.pop(field, None)
+    
+    def _index_material(self, product_id: str, material: Dict, vector) -> None:
+        """Insert or replace a material and its embedding by dense doc ID"""
+        self._strip_embedding(material)
+        material_index = self.id_to_index.get(product_id)
+        if material_index is not None:
+            self.materials[material_index] = material
+            self.index.set(material_index, vector)
+        else:
+            self.materials.append(material)
+            self.index.append(vector)
+            self.id_to_index[product_id] = len(self.materials) - 1
+    
+    def add_material(self, product_id: str, material: Optional[Dict] = None) -> bool:
         """
         Generate and store embedding for a newly added material
         ALSO adds it to in-memory cache for immediate searchability
         
         Args:
             product_id: MongoDB ObjectId as string
+            material: Already-fetched product document (skips the DB lookup)
         
         Returns:
             Success status
         """
         try:
-            material = self.db_manager.find_by_id(product_id)
+            if material is None:
+                material = self.db_manager.find_by_id(product_id)
             if not material:
                 print(f"❌ Material {product_id} not found")
                 return False
             
             # Check if embedding already exists in database
-            if 'embedding' in material and material['embedding']:
+            if has_embedding(material):
                 print(f"⚠️  Material {product_id} already has an embedding in database")
                 # Still add to in-memory cache if not present
-                if not any(m['_id'] == product_id for m in self.materials):
-                    self.materials.append(material)
-                    self.embeddings = np.vstack([self.embeddings, np.array(material['embedding'])])
+                if product_id not in self.id_to_index:
+                    self._index_material(product_id, material, stored_vector(material))
                     print(f"✅ Added existing material to in-memory cache: {material.get('title', 'Unknown')}")
                 return True
             
@@ -182,20 +324,12 @@ class SemanticSearchEngine:
             embedding = self.model.encode(text, convert_to_numpy=True).tolist()
             
             # Save to database
-            self.db_manager.update_embedding(product_id, embedding)
+            self._store_embedding(product_id, embedding)
             
             # Add to in-memory cache
-            material['embedding'] = embedding
             material['embedding_generated_at'] = datetime.utcnow()
             material['embedding_model'] = self.model_name
-            
-            self.materials.append(material)
-            
-            # Handle empty embeddings array
-            if len(self.embeddings) == 0:
-                self.embeddings = np.array([embedding])
-            else:
-                self.embeddings = np.vstack([self.embeddings, np.array(embedding)])
+            self._index_material(product_id, material, embedding)
             
             print(f"✅ Added material to search index: {material.get('title', 'Unknown')}")
             return True
@@ -206,20 +340,22 @@ class SemanticSearchEngine:
             traceback.print_exc()
             return False
     
-    def update_material(self, product_id: str) -> bool:
+    def update_material(self, product_id: str, material: Optional[Dict] = None) -> bool:
         """
         Regenerate embedding for an updated material
         Updates both database and in-memory cache
         
         Args:
             product_id: MongoDB ObjectId as string
+            material: Already-fetched product document (skips the DB lookup)
         
         Returns:
             Success status
         """
         try:
             # Fetch updated material from database
-            material = self.db_manager.find_by_id(product_id)
+            if material is None:
+                material = self.db_manager.find_by_id(product_id)
             if not material:
                 print(f"❌ Material {product_id} not found")
                 return False
@@ -229,32 +365,16 @@ class SemanticSearchEngine:
             embedding = self.model.encode(text, convert_to_numpy=True).tolist()
             
             # Save to database
-            self.db_manager.update_embedding(product_id, embedding)
-            material['embedding'] = embedding
+            self._store_embedding(product_id, embedding)
             material['embedding_generated_at'] = datetime.utcnow()
             material['embedding_model'] = self.model_name
             
-            # Update in-memory cache
-            # Find and remove old version
-            material_index = None
-            for idx, m in enumerate(self.materials):
-                if m['_id'] == product_id:
-                    material_index = idx
-                    break
-            
-            if material_index is not None:
-                # Replace in materials list
-                self.materials[material_index] = material
-                # Replace in embeddings array
-                self.embeddings[material_index] = np.array(embedding)
+            # Update in-memory cache (replaces the old version if indexed)
+            already_indexed = product_id in self.id_to_index
+            self._index_material(product_id, material, embedding)
+            if already_indexed:
                 print(f"✅ Updated material in search index: {material.get('title', 'Unknown')}")
             else:
-                # Material not in cache, add it
-                self.materials.append(material)
-                if len(self.embeddings) == 0:
-                    self.embeddings = np.array([embedding])
-                else:
-                    self.embeddings = np.vstack([self.embeddings, np.array(embedding)])
                 print(f"✅ Added updated material to search index: {material.get('title', 'Unknown')}")
             
             return True
@@ -280,7 +400,10 @@ class SemanticSearchEngine:
             for material in all_materials:
                 self.db_manager.collection.update_one(
                     {'_id': ObjectId(material['_id'])},
-                    {'$unset': {'embedding': '', 'embedding_generated_at': '', 'embedding_model': ''}}
+                    {'$unset': {
+                        'embedding': '', 'embedding_int8': '', 'embedding_scale': '',
+                        'embedding_generated_at': '', 'embedding_model': ''
+                    }}
                 )
             
             # Reload and regenerate
@@ -293,10 +416,41 @@ class SemanticSearchEngine:
             print(f"❌ Error rebuilding cache: {e}")
             return False
     
+    def remove_material(self, product_id: str) -> Optional[int]:
+        """
+        Drop a deleted material from search results
+        
+        Its row is kept as a tombstone (dense doc IDs are shared with the
+        keyword, filter and geo indexes) and reclaimed on the next reload.
+        
+        Args:
+            product_id: MongoDB ObjectId as string
+        
+        Returns:
+            The material's dense doc ID, or None if it was not indexed
+        """
+        material_index = self.id_to_index.pop(product_id, None)
+        if material_index is None:
+            # Never embedded: just make sure a later index_pending skips it
+            self.pending_materials = [m for m in self.pending_materials if m['_id'] != product_id]
+            return None
+        self.removed_rows = np.union1d(self.removed_rows, [material_index]).astype(np.intp)
+        print(f"✅ Removed material from search index: {product_id}")
+        return material_index
+    
+    @property
+    def material_count(self) -> int:
+        """Number of searchable (not deleted) materials"""
+        return len(self.materials) - len(self.removed_rows)
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get search engine statistics"""
         return {
-            "materials_loaded": len(self.materials),
+            "materials_loaded": self.material_count,
             "model": self.model_name,
-            "embedding_dimension": settings.EMBEDDING_DIMENSION
+            "encoder_backend": settings.ENCODER_BACKEND,
+            "embedding_dimension": settings.EMBEDDING_DIMENSION,
+            "embedding_quantization": self.index.mode,
+            "embedding_index_bytes": self.index.nbytes,
+            "quantization_recall_at_10": self.quantization_recall
         }
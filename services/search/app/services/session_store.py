@@ -0,0 +1,370 @@
+"""Bounded, sharded store for chat sessions
+
+Sessions live in a fixed number of LRU shards with a global size cap.
+Expiry is tracked in a min-heap keyed by each session's ``expires_at``
+and swept by a background task, so request handlers never walk the whole
+store. A pluggable backend decides whether sessions also persist outside
+the process (local disk, shared by every uvicorn worker on the host).
+"""
+import asyncio
+import heapq
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Protocol, Tuple
+
+
+class StoredSession(Protocol):
+    """What the store needs from a session object"""
+
+    id: str
+
+    @property
+    def expires_at(self) -> float: ...
+
+    def to_dict(self) -> Dict[str, Any]: ...
+
+
+class MemorySessionBackend:
+    """Process-local sessions only; nothing survives a restart"""
+
+    persistent = False
+
+    def load(self, session_id: str) -> Optional[StoredSession]:
+        return None
+
+    def version(self, session_id: str) -> Optional[int]:
+        return None
+
+    def save(self, session: StoredSession) -> Optional[int]:
+        return None
+
+    def delete(self, session_id: str) -> None:
+        pass
+
+    def purge_expired(self, now: float) -> int:
+        return 0
+
+
+class DiskSessionBackend:
+    """
+    One JSON file per session in a local directory
+
+    Writes go through a temp file and ``os.replace`` so concurrent workers
+    never read a half-written session. The file's mtime doubles as a
+    version stamp, letting each worker notice when another one changed a
+    session it has cached.
+    """
+
+    persistent = True
+
+    def __init__(
+        self,
+        directory: str,
+        factory: Callable[[Dict[str, Any]], StoredSession],
+        ttl_seconds: float
+    ):
+        """
+        Args:
+            directory: Where session files are kept (created if missing)
+            factory: Rebuilds a session object from its ``to_dict()`` form
+            ttl_seconds: Session lifetime, used to purge stale files cheaply
+        """
+        self.directory = directory
+        self.factory = factory
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        # Session IDs are UUIDs; reject anything that could escape the directory
+        if not session_id or os.sep in session_id or session_id.startswith("."):
+            raise KeyError(session_id)
+        return os.path.join(self.directory, f"{session_id}.json")
+
+    def load(self, session_id: str) -> Optional[StoredSession]:
+        try:
+            with open(self._path(session_id), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (KeyError, FileNotFoundError):
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Unreadable session file for {session_id}: {e}")
+            return None
+        return self.factory(data)
+
+    def version(self, session_id: str) -> Optional[int]:
+        try:
+            return os.stat(self._path(session_id)).st_mtime_ns
+        except (KeyError, FileNotFoundError):
+            return None
+
+    def save(self, session: StoredSession) -> Optional[int]:
+        path = self._path(session.id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(session.to_dict(), f, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return os.stat(path).st_mtime_ns
+
+    def delete(self, session_id: str) -> None:
+        try:
+            os.unlink(self._path(session_id))
+        except (KeyError, FileNotFoundError):
+            pass
+
+    def purge_expired(self, now: float) -> int:
+        """
+        Remove session files no worker has touched for a whole TTL
+
+        A session is never written before it is created, so such files are
+        certainly expired; this only needs a stat per file. Sessions that
+        expired more recently are dropped lazily when next accessed.
+        """
+        removed = 0
+        cutoff = now - self.ttl_seconds
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".json") or entry.name.startswith("."):
+                continue
+            try:
+                if entry.stat().st_mtime > cutoff:
+                    continue
+                os.unlink(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+class _Shard:
+    """One LRU partition of the store"""
+
+    __slots__ = ("lock", "entries")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # session_id -> (session, backend version it was loaded/saved at)
+        self.entries: "OrderedDict[str, Tuple[StoredSession, Optional[int]]]" = OrderedDict()
+
+
+class SessionStore:
+    """
+    Size-capped LRU session store with heap-driven background expiry
+
+    The cap is split evenly across shards; inserting into a full shard
+    evicts its least recently used session. With a persistent backend the
+    in-memory shards act as a cache: evicted sessions can be reloaded and
+    a session changed by another worker is re-read on its next access.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 10000,
+        shards: int = 16,
+        backend=None,
+        sweep_interval: float = 30.0
+    ):
+        self.shards = [_Shard() for _ in range(max(1, shards))]
+        self.shard_capacity = max(1, max_sessions // len(self.shards))
+        self.backend = backend or MemorySessionBackend()
+        self.sweep_interval = sweep_interval
+
+        # (expires_at, session_id) for every session added in this process
+        self._expiry: List[Tuple[float, str]] = []
+        self._expiry_lock = threading.Lock()
+        self._sweeper: Optional[asyncio.Task] = None
+        self.evictions = 0
+        self.expirations = 0
+
+    # -- mapping access --------------------------------------------------------
+
+    def _shard(self, session_id: str) -> _Shard:
+        return self.shards[zlib.crc32(session_id.encode()) % len(self.shards)]
+
+    def __len__(self) -> int:
+        return sum(len(shard.entries) for shard in self.shards)
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for shard in self.shards:
+            with shard.lock:
+                keys = list(shard.entries)
+            yield from keys
+
+    def get(self, session_id: str) -> Optional[StoredSession]:
+        """Return a live session (refreshing its LRU position), or None"""
+        shard = self._shard(session_id)
+        with shard.lock:
+            entry = shard.entries.get(session_id)
+            if entry is not None:
+                shard.entries.move_to_end(session_id)
+
+        if self.backend.persistent:
+            current = self.backend.version(session_id)
+            if current is None:
+                # Deleted or expired by another worker
+                if entry is not None:
+                    self._drop_local(session_id)
+                return None
+            if entry is None or entry[1] != current:
+                session = self.backend.load(session_id)
+                if session is None:
+                    return None
+                self._insert(session, current)
+                self._track_expiry(session)
+                entry = (session, current)
+
+        if entry is None:
+            return None
+        session = entry[0]
+        if session.expires_at <= time.time():
+            self.delete(session_id)
+            self.expirations += 1
+            return None
+        return session
+
+    def save(self, session: StoredSession) -> None:
+        """Insert or write back a session after it was created or changed"""
+        shard = self._shard(session.id)
+        with shard.lock:
+            is_new = session.id not in shard.entries
+        version = self.backend.save(session)
+        self._insert(session, version)
+        if is_new:
+            self._track_expiry(session)
+
+    def delete(self, session_id: str) -> bool:
+        """Remove a session everywhere; True if it existed"""
+        existed = self.get_local(session_id) is not None or (
+            self.backend.persistent and self.backend.version(session_id) is not None
+        )
+        self._drop_local(session_id)
+        self.backend.delete(session_id)
+        return existed
+
+    # Async handlers use these so a persistent backend's file I/O runs in a
+    # worker thread; the memory backend stays on the calling thread
+
+    async def aget(self, session_id: str) -> Optional[StoredSession]:
+        """get() without blocking the event loop on backend I/O"""
+        if self.backend.persistent:
+            return await asyncio.to_thread(self.get, session_id)
+        return self.get(session_id)
+
+    async def asave(self, session: StoredSession) -> None:
+        """save() without blocking the event loop on backend I/O"""
+        if self.backend.persistent:
+            await asyncio.to_thread(self.save, session)
+        else:
+            self.save(session)
+
+    async def adelete(self, session_id: str) -> bool:
+        """delete() without blocking the event loop on backend I/O"""
+        if self.backend.persistent:
+            return await asyncio.to_thread(self.delete, session_id)
+        return self.delete(session_id)
+
+    def get_local(self, session_id: str) -> Optional[StoredSession]:
+        """Cached session without LRU, expiry or backend checks"""
+        shard = self._shard(session_id)
+        with shard.lock:
+            entry = shard.entries.get(session_id)
+        return entry[0] if entry else None
+
+    def _insert(self, session: StoredSession, version: Optional[int]) -> None:
+        shard = self._shard(session.id)
+        with shard.lock:
+            shard.entries[session.id] = (session, version)
+            shard.entries.move_to_end(session.id)
+            while len(shard.entries) > self.shard_capacity:
+                # Persistent backends keep the evicted copy on disk
+                shard.entries.popitem(last=False)
+                self.evictions += 1
+
+    def _drop_local(self, session_id: str) -> None:
+        shard = self._shard(session_id)
+        with shard.lock:
+            shard.entries.pop(session_id, None)
+
+    # -- expiry ----------------------------------------------------------------
+
+    def _track_expiry(self, session: StoredSession) -> None:
+        with self._expiry_lock:
+            heapq.heappush(self._expiry, (session.expires_at, session.id))
+            # Evicted / deleted sessions leave stale heap entries behind;
+            # compact once they clearly outnumber the live ones
+            if len(self._expiry) > 2 * len(self.shards) * self.shard_capacity:
+                live = {sid for shard in self.shards for sid in list(shard.entries)}
+                self._expiry = [item for item in self._expiry if item[1] in live]
+                heapq.heapify(self._expiry)
+
+    def sweep_expired(self, now: Optional[float] = None) -> int:
+        """Drop every session whose expiry has passed; returns how many"""
+        now = time.time() if now is None else now
+        due: List[str] = []
+        with self._expiry_lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                due.append(heapq.heappop(self._expiry)[1])
+
+        removed = 0
+        for session_id in due:
+            session = self.get_local(session_id)
+            if session is not None and session.expires_at > now:
+                # Expiry moved since this heap entry was pushed
+                self._track_expiry(session)
+                continue
+            if session is not None:
+                removed += 1
+            self._drop_local(session_id)
+            self.backend.delete(session_id)
+
+        removed += self.backend.purge_expired(now)
+        self.expirations += removed
+        return removed
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                removed = await asyncio.to_thread(self.sweep_expired)
+                if removed:
+                    print(f"🧹 Cleaned up {removed} expired chat sessions")
+            except Exception as e:
+                print(f"⚠️  Chat session sweep failed: {e}")
+
+    def start(self) -> None:
+        """Start the background expiry task on the running event loop"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_forever())
+
+    async def stop(self) -> None:
+        """Cancel the background expiry task"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Store size and churn counters"""
+        return {
+            "sessions": len(self),
+            "max_sessions": self.shard_capacity * len(self.shards),
+            "shards": len(self.shards),
+            "backend": type(self.backend).__name__,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "pending_expiry_entries": len(self._expiry),
+        }
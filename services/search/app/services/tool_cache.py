@@ -0,0 +1,91 @@
+"""Cache of chat advisor tool results (search query -> enriched products)"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class ToolResultCache:
+    """
+    LRU map from normalized tool query to the product list it produced
+
+    Entries belong to one search index version: the first lookup after
+    the index changes (webhook, cache rebuild) drops everything. Index
+    versions only increase, so a caller still holding an older version
+    (it read the version before a concurrent update) gets a miss and its
+    result is not stored, instead of wiping the newer entries. When
+    ``min_similarity`` is below 1, a miss on the exact key can still be
+    served by a cached query whose embedding is close enough.
+    """
+
+    def __init__(self, max_entries: int = 512, min_similarity: float = 1.0):
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        self._entries: "OrderedDict[str, List[Dict]]" = OrderedDict()
+        self._embeddings: Dict[str, np.ndarray] = {}
+        self._matrix: Optional[Tuple[List[str], np.ndarray]] = None
+        self._version: Optional[int] = None
+        self.invalidations = 0
+
+    @property
+    def semantic(self) -> bool:
+        """Whether near-duplicate matching on query embeddings is enabled"""
+        return self.min_similarity < 1.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_version(self, version: int) -> bool:
+        """Adopt a newer index version (dropping entries); False if ``version`` is stale"""
+        if self._version is not None and version < self._version:
+            return False
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self.clear()
+            self._version = version
+        return True
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._embeddings.clear()
+        self._matrix = None
+
+    def get(self, key: str, version: int) -> Optional[List[Dict]]:
+        """Products cached for exactly ``key``, or None"""
+        if not self._check_version(version):
+            return None
+        products = self._entries.get(key)
+        if products is not None:
+            self._entries.move_to_end(key)
+        return products
+
+    def get_similar(self, embedding: np.ndarray, version: int) -> Optional[Tuple[str, List[Dict]]]:
+        """(key, products) of the closest cached query above ``min_similarity``"""
+        if not self._check_version(version) or not self._embeddings:
+            return None
+        if self._matrix is None:
+            keys = list(self._embeddings)
+            self._matrix = (keys, np.stack([self._embeddings[k] for k in keys]))
+        keys, matrix = self._matrix
+        similarities = matrix @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.min_similarity:
+            return None
+        key = keys[best]
+        self._entries.move_to_end(key)
+        return key, self._entries[key]
+
+    def put(self, key: str, version: int, products: List[Dict], embedding: Optional[np.ndarray] = None) -> None:
+        """Store products for ``key`` (embedding must be L2-normalized)"""
+        if not self._check_version(version):
+            return
+        self._entries[key] = products
+        self._entries.move_to_end(key)
+        if embedding is not None:
+            self._embeddings[key] = embedding
+            self._matrix = None
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            if self._embeddings.pop(evicted, None) is not None:
+                self._matrix = None
@@ -0,0 +1,137 @@
+"""Compare query-encoder inference backends (PyTorch vs ONNX Runtime)
+
+Checks that every backend's embeddings match PyTorch within tolerance and
+measures single-query latency and batched throughput.
+
+Usage (from services/search):
+    python -m benchmarks.encoder_backends --quantization avx512_vnni --threads 4
+
+Prints a JSON report on stdout; exits non-zero if a backend is outside
+the parity tolerance.
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.encoder import ONNX_QUANTIZATION_CONFIGS, load_encoder
+
+
+QUERIES = [
+    "cement for foundation work",
+    "steel rods for reinforcement",
+    "waterproofing material for roof terrace",
+    "paint for exterior walls",
+    "tiles for bathroom flooring",
+    "red clay bricks",
+    "pvc pipes for plumbing",
+    "copper electrical wire 2.5 sq mm",
+    "plywood sheets for furniture",
+    "river sand for plastering",
+    "tmt bar fe 500d",
+    "tile adhesive for wall tiles",
+    "roofing sheets for shed",
+    "glass wool insulation",
+    "m sand for concrete",
+    "wood polish and varnish",
+]
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    return float(np.percentile(samples, pct)) if samples else 0.0
+
+
+def benchmark(model, queries: List[str], iterations: int, batch_size: int) -> Dict[str, float]:
+    """Single-query latency percentiles (ms) and batched throughput (queries/s)"""
+    for query in queries[:4]:
+        model.encode(query, convert_to_numpy=True)  # warm-up
+
+    latencies = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        model.encode(queries[i % len(queries)], convert_to_numpy=True)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    batch = (queries * (batch_size // len(queries) + 1))[:batch_size]
+    rounds = max(1, iterations // batch_size)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        model.encode(batch, batch_size=batch_size, convert_to_numpy=True)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "latency_ms_p50": round(_percentile(latencies, 50), 3),
+        "latency_ms_p95": round(_percentile(latencies, 95), 3),
+        "latency_ms_mean": round(float(np.mean(latencies)), 3),
+        "throughput_qps": round(rounds * batch_size / elapsed, 1),
+    }
+
+
+def parity(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """Cosine agreement between two embedding matrices for the same inputs"""
+    ref = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    cand = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    cosines = np.sum(ref * cand, axis=1)
+    return {
+        "min_cosine": round(float(cosines.min()), 6),
+        "mean_cosine": round(float(cosines.mean()), 6),
+        "max_abs_diff": round(float(np.abs(reference - candidate).max()), 6),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=settings.MODEL_NAME)
+    parser.add_argument("--threads", type=int, default=settings.ENCODER_THREADS,
+                        help="Intra-op threads for every backend (0 = runtime default)")
+    parser.add_argument("--quantization", choices=ONNX_QUANTIZATION_CONFIGS,
+                        help="Also benchmark a dynamically quantized int8 ONNX model")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--fp32-tolerance", type=float, default=0.9999,
+                        help="Minimum cosine vs PyTorch for float32 ONNX")
+    parser.add_argument("--int8-tolerance", type=float, default=0.98,
+                        help="Minimum cosine vs PyTorch for quantized ONNX")
+    args = parser.parse_args(argv)
+
+    variants = [("torch", "torch", ""), ("onnx", "onnx", "")]
+    if args.quantization:
+        variants.append((f"onnx-int8-{args.quantization}", "onnx", args.quantization))
+
+    report = {"model": args.model, "threads": args.threads, "backends": {}}
+    reference = None
+    ok = True
+    for name, backend, quantization in variants:
+        print(f"▶ {name}", file=sys.stderr)
+        started = time.perf_counter()
+        model = load_encoder(args.model, backend=backend, quantization=quantization, threads=args.threads, strict=True)
+        result = {"load_s": round(time.perf_counter() - started, 2)}
+
+        embeddings = model.encode(QUERIES, convert_to_numpy=True)
+        if reference is None:
+            reference = embeddings
+        else:
+            result["parity"] = parity(reference, embeddings)
+            tolerance = args.int8_tolerance if quantization else args.fp32_tolerance
+            result["parity"]["tolerance"] = tolerance
+            result["parity"]["ok"] = result["parity"]["min_cosine"] >= tolerance
+            ok = ok and result["parity"]["ok"]
+
+        result.update(benchmark(model, QUERIES, args.iterations, args.batch_size))
+        report["backends"][name] = result
+        print(f"  {json.dumps(result)}", file=sys.stderr)
+
+    torch_p50 = report["backends"]["torch"]["latency_ms_p50"]
+    for result in report["backends"].values():
+        result["speedup_p50"] = round(torch_p50 / result["latency_ms_p50"], 2) if result["latency_ms_p50"] else None
+
+    print(json.dumps(report, indent=2))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""In-process stand-ins for external services, for offline benchmarks
+
+``InMemoryDatabase`` is a DatabaseManager whose collection lives in a
+dict, so the engines run their real load / webhook / persistence code
+paths without MongoDB. Only the query shapes the service issues are
+supported (match on ``_id`` by value, ``$ne`` or ``$in``; ``$set`` /
+``$unset`` updates with upsert). ``create_engine`` wires a
+HybridSearchEngine to it, with BM25 cache files in a scratch directory.
+
+``FakeGenaiClient`` answers ``client.aio.models.generate_content`` and
+``generate_content_stream`` like Gemini would for the chat advisor
+(follow-up questions, then a search tool call, then a summary) after a
+configurable delay, so chat load can be generated without an API key.
+"""
+import asyncio
+import os
+import random
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional
+
+from app.core.config import settings
+from app.core.database import DatabaseManager
+from app.services import search as search_module
+from app.services.hybrid_search import HybridSearchEngine
+from app.services.quantization import EmbeddingIndex
+
+
+def _matches(doc_id: Any, condition: Any) -> bool:
+    if isinstance(condition, dict):
+        if "$ne" in condition:
+            return doc_id != condition["$ne"]
+        if "$in" in condition:
+            return doc_id in condition["$in"]
+        raise NotImplementedError(f"Unsupported _id condition {condition}")
+    return doc_id == condition
+
+
+class InMemoryCollection:
+    """The subset of the PyMongo Collection API used by the search service"""
+
+    def __init__(self, documents: Iterable[Dict] = ()):
+        # Keyed by _id as stored (ObjectId for products, str for bm25_index)
+        self.documents: Dict[Any, Dict] = {doc["_id"]: doc for doc in documents}
+
+    def _select(self, filter: Optional[Dict]) -> Iterator[Dict]:
+        condition = (filter or {}).get("_id")
+        if condition is not None and not isinstance(condition, dict):
+            doc = self.documents.get(condition)
+            if doc is not None:
+                yield doc
+            return
+        for doc_id, doc in list(self.documents.items()):
+            if condition is None or _matches(doc_id, condition):
+                yield doc
+
+    def find(self, filter: Optional[Dict] = None, projection: Optional[Dict] = None) -> Iterator[Dict]:
+        for doc in self._select(filter):
+            if projection:
+                keep = {field for field, include in projection.items() if include}
+                yield {key: value for key, value in doc.items() if key in keep or key == "_id"}
+            else:
+                # Fresh dict per read, like documents decoded from BSON
+                yield dict(doc)
+
+    def find_one(self, filter: Optional[Dict] = None, projection: Optional[Dict] = None) -> Optional[Dict]:
+        return next(self.find(filter, projection), None)
+
+    def update_one(self, filter: Dict, update: Dict, upsert: bool = False) -> None:
+        doc = next(self._select(filter), None)
+        if doc is None:
+            if not upsert:
+                return
+            doc = {"_id": filter["_id"]}
+            self.documents[doc["_id"]] = doc
+        doc.update(update.get("$set", {}))
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+
+    def insert_one(self, document: Dict) -> None:
+        self.documents[document["_id"]] = dict(document)
+
+    def count_documents(self, filter: Optional[Dict] = None) -> int:
+        return sum(1 for _ in self._select(filter))
+
+
+class InMemoryDatabase(DatabaseManager):
+    """
+    DatabaseManager backed by an InMemoryCollection instead of MongoDB
+
+    Args:
+        documents: Catalog loaded by the engines at startup
+        late_documents: Products that exist in the database but are left
+            out of get_all_materials(), as if created after the service
+            loaded its catalog (targets for the product-added webhook)
+    """
+
+    def __init__(self, documents: Iterable[Dict] = (), late_documents: Iterable[Dict] = ()):
+        super().__init__()
+        self.collection = InMemoryCollection(documents)
+        self.db = {"products": self.collection}
+        self._late_ids = set()
+        for document in late_documents:
+            self.collection.insert_one(document)
+            self._late_ids.add(str(document["_id"]))
+
+    def get_all_materials(self, max_retries: int = 5, retry_delay: int = 5) -> List[Dict]:
+        materials = super().get_all_materials(max_retries, retry_delay)
+        if not self._late_ids:
+            return materials
+        return [material for material in materials if material["_id"] not in self._late_ids]
+
+    def connect(self, max_retries: int = 5, retry_delay: int = 3) -> None:
+        """Nothing to connect to"""
+
+    def disconnect(self) -> None:
+        self.aio.shutdown()
+
+    def products(self) -> List[Dict]:
+        """Stored product documents (without the BM25 index document)"""
+        return [doc for doc_id, doc in self.collection.documents.items() if doc_id != "bm25_index"]
+
+
+@contextmanager
+def offline_encoder(encoder) -> Iterator[None]:
+    """Make SemanticSearchEngine.load_model() use ``encoder`` instead of downloading a model"""
+    original = search_module.load_encoder
+    search_module.load_encoder = lambda model_name, **kwargs: encoder
+    try:
+        yield
+    finally:
+        search_module.load_encoder = original
+
+
+def create_engine(
+    db: InMemoryDatabase,
+    cache_dir: str,
+    quantization: Optional[str] = None
+) -> HybridSearchEngine:
+    """
+    An uninitialized HybridSearchEngine wired to ``db``
+
+    Both engines read and write ``db``; BM25 cache files go to
+    ``cache_dir`` instead of the service's cache directory. Call
+    initialize() inside ``offline_encoder()``.
+    """
+    engine = HybridSearchEngine()
+    engine.semantic_engine.db_manager = db
+    engine.keyword_engine.db_manager = db
+    if quantization is not None:
+        engine.semantic_engine.index = EmbeddingIndex(quantization, settings.EMBEDDING_RERANK_CANDIDATES)
+
+    keyword_engine = engine.keyword_engine
+    for attr in ("index_path", "docmap_path", "term_frequency_path", "doc_lengths_path"):
+        setattr(keyword_engine, attr, os.path.join(cache_dir, os.path.basename(getattr(keyword_engine, attr))))
+    return engine
+
+
+# ── Gemini stand-in ─────────────────────────────────────────────────────────
+
+FOLLOW_UP_QUESTIONS = (
+    "Got it! What size is the project, and which part are you working on right now?",
+    "Thanks! Do you have a budget or a preferred brand in mind?",
+    "Understood. Is this for indoor or outdoor use, and how much quantity do you need?",
+)
+
+SUMMARY_TEMPLATE = (
+    "Here are {count} products that fit what you described. The first option offers the best "
+    "balance of price and quality, while the others give you alternatives in different price "
+    "ranges. Let me know if you want me to narrow these down further."
+)
+
+
+class FakeGenaiError(Exception):
+    """Injected model failure (see FakeGenaiClient error_rate)"""
+
+
+class _FakeModels:
+    def __init__(self, client: "FakeGenaiClient"):
+        self._client = client
+
+    async def generate_content(self, model: str, contents, config=None):
+        await self._client.wait()
+        return self._client.respond(contents)
+
+    async def generate_content_stream(self, model: str, contents, config=None) -> AsyncIterator:
+        await self._client.wait()
+        return self._client.stream(self._client.respond(contents))
+
+
+class _FakeAio:
+    def __init__(self, client: "FakeGenaiClient"):
+        self.models = _FakeModels(client)
+
+
+class FakeGenaiClient:
+    """
+    Stand-in for ``genai.Client`` as used by GeminiChatService
+
+    The model asks a follow-up question for the first ``search_after_turns
+    - 1`` user turns, then calls search_and_recommend_products with the
+    latest user message as the query, and summarizes once the tool result
+    comes back.
+
+    Args:
+        latency_ms: Mean time before a response (or the first stream chunk)
+        jitter_ms: Uniform +/- spread around ``latency_ms``
+        error_rate: Fraction of calls that raise FakeGenaiError
+        search_after_turns: User turns before the model searches
+        stream_chunks: Text chunks per streamed reply
+        chunk_delay_ms: Delay between streamed chunks
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 800.0,
+        jitter_ms: float = 200.0,
+        error_rate: float = 0.0,
+        search_after_turns: int = 2,
+        stream_chunks: int = 8,
+        chunk_delay_ms: float = 25.0,
+        seed: Optional[int] = None
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.search_after_turns = search_after_turns
+        self.stream_chunks = stream_chunks
+        self.chunk_delay_ms = chunk_delay_ms
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self.aio = _FakeAio(self)
+
+    async def wait(self) -> None:
+        self.calls += 1
+        delay = self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        await asyncio.sleep(max(0.0, delay) / 1000)
+        if self._rng.random() < self.error_rate:
+            raise FakeGenaiError("Injected Gemini failure")
+
+    def respond(self, contents):
+        """The response Gemini would plausibly give to ``contents``"""
+        from google.genai import types
+
+        contents = contents if isinstance(contents, list) else [contents]
+        last = contents[-1] if contents else None
+        if getattr(last, "role", None) == "tool":
+            part = types.Part.from_text(text=SUMMARY_TEMPLATE.format(count=self._products_found(last)))
+        else:
+            user_texts = [
+                part.text
+                for content in contents if getattr(content, "role", None) == "user"
+                for part in (content.parts or []) if part.text
+            ]
+            if len(user_texts) >= self.search_after_turns:
+                part = types.Part.from_function_call(
+                    name="search_and_recommend_products",
+                    args={"query": user_texts[-1], "reasoning": "Enough context gathered from the conversation"},
+                )
+            else:
+                part = types.Part.from_text(text=self._rng.choice(FOLLOW_UP_QUESTIONS))
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=[part]))]
+        )
+
+    @staticmethod
+    def _products_found(tool_content) -> int:
+        import json
+
+        try:
+            response = tool_content.parts[0].function_response.response
+            return json.loads(response["result"])["products_found"]
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+            return 0
+
+    async def stream(self, response) -> AsyncIterator:
+        """Replay ``response`` as chunks: function calls whole, text in pieces"""
+        from google.genai import types
+
+        part = response.candidates[0].content.parts[0]
+        if part.function_call:
+            yield response
+            return
+        words = part.text.split(" ")
+        size = max(1, len(words) // self.stream_chunks)
+        for start in range(0, len(words), size):
+            if start:
+                await asyncio.sleep(self.chunk_delay_ms / 1000)
+            text = " ".join(words[start:start + size]) + (" " if start + size < len(words) else "")
+            yield types.GenerateContentResponse(
+                candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part.from_text(text=text)]))]
+            )
@@ -0,0 +1,111 @@
+"""Import-time budget check for the search service entry points
+
+Imports each entry module in a fresh interpreter with ``-X importtime``
+and fails if it takes longer than its budget or pulls in a dependency
+that must stay deferred until first use (model, NLP, Gemini, MongoDB
+driver).
+
+Usage (from services/search):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget-ms app.main=800
+
+Prints a JSON report on stdout; exits non-zero if any entry point is over
+budget or imports a deferred module (usable as a CI gate). The test suite
+runs the same check against BUDGETS_MS in tests/test_import_time.py.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+
+# Entry point -> import-time budget (ms, summed self time of every module)
+BUDGETS_MS = {
+    "app.main": 1000,
+    "app.services.keyword_search": 300,
+    "app.services.hybrid_search": 400,
+}
+
+# Loaded on first use only (model load, tokenization, chat, DB connect)
+DEFERRED_MODULES = (
+    "sentence_transformers",
+    "torch",
+    "transformers",
+    "onnxruntime",
+    "nltk",
+    "google.genai",
+    "pymongo",
+    "dns.resolver",
+)
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(module: str) -> List[Tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for every module imported by ``module``"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVICE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def check(module: str, budget_ms: float, top: int = 10) -> Dict:
+    """Import ``module`` and compare it against its budget and DEFERRED_MODULES"""
+    rows = import_profile(module)
+    total_ms = sum(self_us for _, self_us, _ in rows) / 1000
+    loaded = {name for name, _, _ in rows}
+    deferred = [name for name in DEFERRED_MODULES if name in loaded]
+    slowest = sorted(rows, key=lambda row: row[2], reverse=True)[:top]
+    return {
+        "import_ms": round(total_ms, 1),
+        "budget_ms": budget_ms,
+        "modules": len(rows),
+        "deferred_modules_loaded": deferred,
+        "slowest_cumulative_ms": {name: round(cumulative / 1000, 1) for name, _, cumulative in slowest},
+        "ok": total_ms <= budget_ms and not deferred,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", action="append", default=[], metavar="MODULE=MS",
+                        help="Override or add an entry point budget (repeatable)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports listed per entry point")
+    args = parser.parse_args(argv)
+
+    budgets = dict(BUDGETS_MS)
+    for item in args.budget_ms:
+        module, _, ms = item.partition("=")
+        budgets[module] = float(ms)
+
+    report = {"python": sys.version.split()[0], "entry_points": {}}
+    ok = True
+    for module, budget_ms in budgets.items():
+        result = check(module, budget_ms, args.top)
+        report["entry_points"][module] = result
+        ok = ok and result["ok"]
+        status = "✅" if result["ok"] else "❌"
+        print(f"{status} {module}: {result['import_ms']} ms (budget {budget_ms} ms)", file=sys.stderr)
+        if result["deferred_modules_loaded"]:
+            print(f"   imports deferred modules: {', '.join(result['deferred_modules_loaded'])}", file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
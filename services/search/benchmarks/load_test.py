@@ -0,0 +1,426 @@
+"""HTTP load test for the search service with local MongoDB and Gemini stand-ins
+
+Boots the FastAPI app against an in-memory catalog (benchmarks/fakes.py
+InMemoryDatabase, hashing query encoder) and a fake ``genai.Client`` with
+configurable latency, then drives a weighted mix of /search, /recommend,
+/webhook/* and /chat/* requests from concurrent clients. Nothing talks to
+Atlas or Gemini.
+
+Usage (from services/search):
+    python -m benchmarks.load_test run --concurrency 32 --duration 60
+    python -m benchmarks.load_test run --mix search=60,recommend=20,webhook_updated=20
+    python -m benchmarks.load_test run --in-process --duration 10       # no uvicorn needed
+    python -m benchmarks.load_test serve --port 8001 --products 100000  # server only
+    python -m benchmarks.load_test run --target http://127.0.0.1:8001 --products 100000
+
+``run`` starts ``serve`` in a subprocess (one uvicorn worker) unless
+--target is given, so client overhead doesn't share the server's GIL.
+--in-process runs app and clients on one event loop instead (quick smoke
+runs; latencies include the client's own work). When targeting a server,
+pass the same --products / --seed it was started with so webhook product
+IDs line up.
+
+Prints a JSON report on stdout: throughput, p50/p95/p99 latency, status
+codes and error rate per endpoint, plus totals.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.encoder_backends import QUERIES
+from benchmarks.fakes import FakeGenaiClient, InMemoryDatabase, create_engine, offline_encoder
+from benchmarks.search_suite import git_commit
+from benchmarks.synthetic import CATEGORIES, HashingEncoder, generate_catalog, iter_products, parse_size
+
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Operation -> relative weight; a chat operation is one whole conversation
+DEFAULT_MIX = {
+    "search": 40,
+    "search_post": 15,
+    "recommend": 15,
+    "webhook_added": 3,
+    "webhook_updated": 2,
+    "chat": 20,
+    "chat_stream": 5,
+}
+
+CHAT_OPENERS = [
+    "I'm building a two storey house and need materials for the foundation",
+    "Looking for waterproofing for my terrace, it leaks during monsoon",
+    "Need tiles for a new bathroom and kitchen",
+    "What should I use for the boundary wall of my plot?",
+    "I want to repaint the exterior walls of my building",
+]
+
+CHAT_FOLLOW_UPS = [
+    "about 1500 sq ft, budget is moderate, prefer good brands",
+    "mid range budget, around 2000 sq ft in Pune",
+    "outdoor use, need it delivered within a week",
+    "quality matters more than price",
+]
+
+# Chat turns before giving up on a conversation that never completes
+MAX_CHAT_TURNS = 4
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _late_product_ids(products: int, count: int) -> List[str]:
+    """IDs of the products create_app() keeps out of the startup catalog"""
+    return [str(product["_id"]) for product in iter_products(count, start=products)]
+
+
+def create_app(args: argparse.Namespace):
+    """
+    The FastAPI app wired to in-memory stand-ins
+
+    The catalog is generated from --products / --seed; --webhook-pool
+    more products exist in the fake database but not in the startup
+    catalog, for the product-added webhook. Call inside offline_encoder().
+    """
+    import app.main as main
+    from app.services.gemini_chat import GeminiChatService
+
+    products = parse_size(args.products)
+    catalog = generate_catalog(products, seed=args.seed, storage="int8")
+    late = list(iter_products(args.webhook_pool, start=products))
+    db = InMemoryDatabase(catalog, late)
+    cache_dir = tempfile.mkdtemp(prefix="search-loadtest-")
+
+    def create_chat_service() -> GeminiChatService:
+        service = GeminiChatService()
+        service.client = FakeGenaiClient(
+            latency_ms=args.llm_latency_ms,
+            jitter_ms=args.llm_jitter_ms,
+            error_rate=args.llm_error_rate,
+            seed=args.seed,
+        )
+        service.model_name = "fake-gemini"
+        return service
+
+    # Resolved by the lifespan at startup
+    main.HybridSearchEngine = lambda: create_engine(db, cache_dir)
+    main._create_chat_service = create_chat_service
+    return main.app
+
+
+def serve(args: argparse.Namespace) -> int:
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ uvicorn is not installed (pip install -r requirements.txt), or use run --in-process",
+              file=sys.stderr)
+        return 1
+    with offline_encoder(HashingEncoder()):
+        app = create_app(args)
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+    return 0
+
+
+# ── Load generation ─────────────────────────────────────────────────────────
+
+
+class Recorder:
+    """Latency samples and status codes per endpoint"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+        self.recording = False
+
+    def record(self, endpoint: str, started: float, status: str) -> None:
+        if not self.recording:
+            return
+        self.samples.setdefault(endpoint, []).append((time.perf_counter() - started) * 1000)
+        codes = self.statuses.setdefault(endpoint, {})
+        codes[status] = codes.get(status, 0) + 1
+
+    def report(self, duration: float) -> Dict:
+        endpoints = {}
+        total = errors = 0
+        for endpoint, samples in sorted(self.samples.items()):
+            codes = self.statuses[endpoint]
+            failed = sum(count for status, count in codes.items() if not status.startswith(("2", "3")))
+            total += len(samples)
+            errors += failed
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / duration, 2),
+                "error_rate": round(failed / len(samples), 4),
+                "p50_ms": round(float(np.percentile(samples, 50)), 2),
+                "p95_ms": round(float(np.percentile(samples, 95)), 2),
+                "p99_ms": round(float(np.percentile(samples, 99)), 2),
+                "mean_ms": round(float(np.mean(samples)), 2),
+                "max_ms": round(max(samples), 2),
+                "status_codes": dict(sorted(codes.items())),
+            }
+        return {
+            "duration_s": round(duration, 2),
+            "requests": total,
+            "throughput_rps": round(total / duration, 2) if duration else 0.0,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+class Workload:
+    """Picks and issues the mixed requests"""
+
+    def __init__(self, client, recorder: Recorder, args: argparse.Namespace):
+        self.client = client
+        self.recorder = recorder
+        self.products = parse_size(args.products)
+        self.late_ids = _late_product_ids(self.products, args.webhook_pool)
+        self.operations = list(args.mix)
+        self.weights = [args.mix[name] for name in self.operations]
+
+    async def _call(self, endpoint: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception as e:
+            self.recorder.record(endpoint, started, type(e).__name__)
+            return None
+        self.recorder.record(endpoint, started, str(response.status_code))
+        return response
+
+    async def search(self, rng: random.Random) -> None:
+        params = {"query": rng.choice(QUERIES), "top_k": rng.choice((5, 10, 20))}
+        if rng.random() < 0.3:
+            params["category"] = rng.choice(CATEGORIES)
+        if rng.random() < 0.2:
+            params["in_stock"] = "true"
+        await self._call("GET /search", "GET", "/search", params=params)
+
+    async def search_post(self, rng: random.Random) -> None:
+        body = {"query": rng.choice(QUERIES), "top_k": 10, "fusion": rng.choice(("minmax", "rrf"))}
+        if rng.random() < 0.3:
+            body["filters"] = {"categories": [rng.choice(CATEGORIES)], "max_price": 5000}
+        await self._call("POST /search", "POST", "/search", json=body)
+
+    async def recommend(self, rng: random.Random) -> None:
+        params = {"query": rng.choice(QUERIES), "include_products": str(rng.random() < 0.5).lower()}
+        await self._call("GET /recommend", "GET", "/recommend", params=params)
+
+    async def webhook_added(self, rng: random.Random) -> None:
+        if not self.late_ids:
+            # Every pre-seeded new product is indexed; keep the webhook share
+            await self.webhook_updated(rng)
+            return
+        product_id = self.late_ids.pop()
+        await self._call("POST /webhook/product-added", "POST", "/webhook/product-added",
+                         json={"product_id": product_id})
+
+    async def webhook_updated(self, rng: random.Random) -> None:
+        product_id = f"{rng.randrange(self.products) + 1:024x}"
+        await self._call("POST /webhook/product-updated", "POST", "/webhook/product-updated",
+                         json={"product_id": product_id})
+
+    async def chat(self, rng: random.Random, stream: bool = False) -> None:
+        response = await self._call("POST /chat/start", "POST", "/chat/start")
+        if response is None or response.status_code != 200:
+            return
+        session_id = response.json()["session_id"]
+        message = rng.choice(CHAT_OPENERS)
+        for _ in range(MAX_CHAT_TURNS):
+            body = {"session_id": session_id, "message": message}
+            if stream:
+                response = await self._call("POST /chat/message/stream", "POST", "/chat/message/stream", json=body)
+                completed = response is not None and b'"status":"completed"' in response.content
+            else:
+                response = await self._call("POST /chat/message", "POST", "/chat/message", json=body)
+                completed = response is not None and response.status_code == 200 \
+                    and response.json().get("status") == "completed"
+            if response is None or response.status_code != 200 or completed:
+                break
+            message = rng.choice(CHAT_FOLLOW_UPS)
+        await self._call("DELETE /chat/{id}", "DELETE", f"/chat/{session_id}")
+
+    async def chat_stream(self, rng: random.Random) -> None:
+        await self.chat(rng, stream=True)
+
+    async def worker(self, seed: int, deadline: float) -> None:
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            operation = rng.choices(self.operations, self.weights)[0]
+            await getattr(self, operation)(rng)
+
+
+async def _wait_ready(client, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            response = await client.get("/health/ready")
+            if response.status_code == 200:
+                return
+            if response.json().get("status") == "failed":
+                raise RuntimeError(f"Search engine startup failed: {response.text}")
+        except Exception as e:
+            if isinstance(e, RuntimeError):
+                raise
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"Service not ready after {timeout:.0f}s")
+
+
+async def drive(client, args: argparse.Namespace) -> Dict:
+    """Wait for readiness, warm up, then run the mixed workload"""
+    await _wait_ready(client, args.startup_timeout)
+    recorder = Recorder()
+    workload = Workload(client, recorder, args)
+
+    started = time.perf_counter()
+    deadline = started + args.warmup + args.duration
+    workers = [
+        asyncio.create_task(workload.worker(args.seed * 10_000 + i, deadline))
+        for i in range(args.concurrency)
+    ]
+    await asyncio.sleep(args.warmup)
+    recorder.recording = True
+    measured_from = time.perf_counter()
+    await asyncio.gather(*workers)
+    return recorder.report(time.perf_counter() - measured_from)
+
+
+async def _run_in_process(args: argparse.Namespace) -> Dict:
+    import httpx
+    import app.main as main
+
+    with offline_encoder(HashingEncoder()):
+        app = create_app(args)
+        async with main.lifespan(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=120) as client:
+                return await drive(client, args)
+
+
+async def _run_http(args: argparse.Namespace, base_url: str) -> Dict:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        return await drive(client, args)
+
+
+def run(args: argparse.Namespace) -> int:
+    server = None
+    target = args.target
+    if args.in_process:
+        target = "in-process"
+    elif not target:
+        port = _free_port()
+        target = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.load_test", "serve", "--port", str(port),
+             "--products", str(args.products), "--seed", str(args.seed),
+             "--webhook-pool", str(args.webhook_pool),
+             "--llm-latency-ms", str(args.llm_latency_ms), "--llm-jitter-ms", str(args.llm_jitter_ms),
+             "--llm-error-rate", str(args.llm_error_rate)],
+            cwd=SERVICE_DIR,
+            # Engine progress logs would mix into the JSON report
+            stdout=None if args.verbose else subprocess.DEVNULL,
+        )
+    print(f"🚀 {args.concurrency} clients for {args.duration}s (+{args.warmup}s warm-up) against {target}",
+          file=sys.stderr)
+
+    try:
+        if args.in_process:
+            with contextlib.redirect_stdout(sys.stderr if args.verbose else open(os.devnull, "w")):
+                result = asyncio.run(_run_in_process(args))
+        else:
+            result = asyncio.run(_run_http(args, target))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "target": target,
+            "products": parse_size(args.products),
+            "concurrency": args.concurrency,
+            "mix": args.mix,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_error_rate": args.llm_error_rate,
+            "seed": args.seed,
+        },
+        **result,
+    }
+    for endpoint, stats in report["endpoints"].items():
+        print(f"   {endpoint:30s} {stats['throughput_rps']:>8.1f} rps  p50 {stats['p50_ms']:>8.1f}  "
+              f"p95 {stats['p95_ms']:>8.1f}  p99 {stats['p99_ms']:>8.1f} ms  errors {stats['error_rate']:.1%}",
+              file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    return 0
+
+
+def _parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation '{name}' (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--products", default="10k", help="Catalog size (1k, 10k, 100k, 1m or a number)")
+    common.add_argument("--seed", type=int, default=0)
+    common.add_argument("--webhook-pool", type=int, default=1000,
+                        help="Products in the database but not the startup catalog (product-added targets)")
+    common.add_argument("--llm-latency-ms", type=float, default=800.0, help="Fake Gemini response time")
+    common.add_argument("--llm-jitter-ms", type=float, default=200.0)
+    common.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of Gemini calls that fail")
+
+    serve_parser = subparsers.add_parser("serve", parents=[common], help="Run the app on fakes under uvicorn")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8001)
+
+    run_parser = subparsers.add_parser("run", parents=[common], help="Drive the mixed workload and report")
+    run_parser.add_argument("--target", help="Base URL of an already running server")
+    run_parser.add_argument("--in-process", action="store_true", help="App and clients on one event loop")
+    run_parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    run_parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    run_parser.add_argument("--warmup", type=float, default=5.0, help="Unrecorded seconds before measuring")
+    run_parser.add_argument("--mix", type=_parse_mix, default=dict(DEFAULT_MIX),
+                            help="Operation weights, e.g. search=60,chat=20 (default: %(default)s)")
+    run_parser.add_argument("--startup-timeout", type=float, default=600.0)
+    run_parser.add_argument("--output", help="Also write the JSON report to this file")
+    run_parser.add_argument("--verbose", action="store_true", help="Show the server's logs on stderr")
+
+    args = parser.parse_args(argv)
+    return serve(args) if args.command == "serve" else run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
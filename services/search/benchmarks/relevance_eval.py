@@ -0,0 +1,476 @@
+"""Offline relevance evaluation: result quality next to latency per search configuration
+
+Runs a labeled query set through each ranking the service can produce and
+reports recall@k, nDCG@k and MRR@k with p50/p95 latency, so speed changes
+(quantization, pruning, fusion, weights) can be judged against what they
+cost in quality:
+
+- semantic leg, exact float32 SemanticSearchEngine.search (the reference)
+- semantic leg on int8 / binary indexes, plus overlap@k with the exact
+  top-k (binary once per --rerank-candidates value)
+- BM25 leg (KeywordSearchEngine.search)
+- HybridSearchEngine.search for every --fusions x --weights combination
+
+Queries and judgments either come from --queries, or are generated from
+the synthetic catalog (synthetic.py): "<product> for <use>", "<brand>
+<product>" and "<category> for <use>", graded 2 when a product matches
+every attribute in the query and 1 when it matches the product type (or,
+for category queries, category and use).
+
+With the default hashing encoder and generated catalog nothing is
+downloaded; absolute numbers then describe that stand-in, but relative
+changes between configurations and commits are meaningful. For the real
+model, evaluate an exported catalog with your own judgments:
+--catalog products.json --queries labeled.jsonl --encoder model.
+
+Labeled query file (JSON lines):
+    {"query": "cement for plastering", "relevant": {"<product _id>": 2, "<product _id>": 1}}
+    {"query": "tmt bars", "relevant": ["<product _id>", ...]}          # all grade 1
+
+Usage (from services/search):
+    python -m benchmarks.relevance_eval --output benchmarks/results/relevance-$(git rev-parse --short HEAD).json
+    python -m benchmarks.relevance_eval --products 100k --rerank-candidates 50,200,1000
+    python -m benchmarks.relevance_eval --weights 0,0.2,0.4,0.6,0.8,1 --fusions minmax,rrf,zscore
+    python -m benchmarks.relevance_eval --compare benchmarks/results/relevance-<base>.json
+
+Prints a JSON report on stdout (and to --output). With --compare, lists
+metrics that dropped by more than --tolerance against the baseline and
+exits non-zero if there are any.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.quantization import EmbeddingIndex
+from benchmarks.fakes import InMemoryDatabase, create_engine, offline_encoder
+from benchmarks.search_suite import git_commit
+from benchmarks.synthetic import CATEGORY_TEMPLATES, HashingEncoder, document_text, generate_catalog, parse_size
+
+
+REPORT_VERSION = 1
+
+METRICS = ("recall", "ndcg", "mrr")
+
+# Quality changes below this are noise, not regressions
+MIN_REGRESSION_DROP = 0.001
+
+
+class LabeledQuery(NamedTuple):
+    text: str
+    # Product _id (str) -> graded relevance (> 0)
+    relevant: Dict[str, int]
+
+
+# ── Query sets ──────────────────────────────────────────────────────────────
+
+
+def load_queries(path: str) -> List[LabeledQuery]:
+    """Labeled queries from a JSON lines file (see module docstring)"""
+    queries = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            relevant = entry.get("relevant") or {}
+            if isinstance(relevant, list):
+                relevant = {doc_id: 1 for doc_id in relevant}
+            relevant = {str(doc_id): int(grade) for doc_id, grade in relevant.items() if int(grade) > 0}
+            if not relevant:
+                print(f"⚠️  {path}:{line_no}: no relevant products, skipped", file=sys.stderr)
+                continue
+            queries.append(LabeledQuery(entry["query"], relevant))
+    return queries
+
+
+def load_catalog(path: str) -> List[Dict]:
+    """Products exported from MongoDB (mongoexport --jsonArray, or one document per line)"""
+    from bson import json_util
+
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        return json_util.loads(text)
+    return [json_util.loads(line) for line in text.splitlines() if line.strip()]
+
+
+class _Attributes(NamedTuple):
+    category: str
+    product: str
+    brand: str
+    uses: Tuple[str, ...]
+
+
+def _attributes(material: Dict) -> Optional[_Attributes]:
+    """Template attributes of a synthetic product (None for other documents)"""
+    template = CATEGORY_TEMPLATES.get(material.get("category"))
+    if template is None:
+        return None
+    brands, products, _, uses, _ = template
+    title, description = material.get("title", ""), material.get("description", "")
+    matches = [product for product in products if f" {product} " in f" {title} "]
+    if not matches:
+        return None
+    product = max(matches, key=len)
+    brand = title[:title.index(product)].strip()
+    return _Attributes(
+        material["category"], product, brand,
+        tuple(use for use in uses if f"for {use}." in description or f"suited to {use}." in description),
+    )
+
+
+def generate_queries(materials: List[Dict], count: int, seed: int = 0) -> List[LabeledQuery]:
+    """
+    Queries with graded judgments derived from synthetic catalog attributes
+
+    Each query is built from a sampled product, so it has at least one
+    grade-2 match; grades cover every product in ``materials``.
+    """
+    attributes = {}
+    by_product = defaultdict(list)
+    by_category = defaultdict(list)
+    for material in materials:
+        attrs = _attributes(material)
+        if attrs is not None:
+            doc_id = str(material["_id"])
+            attributes[doc_id] = attrs
+            by_product[attrs.product].append(doc_id)
+            by_category[attrs.category].append(doc_id)
+    if not attributes:
+        raise ValueError("Catalog has no synthetic products to generate queries from; pass --queries")
+
+    rng = random.Random(seed)
+    doc_ids = sorted(attributes)
+    queries = []
+    for i in range(count):
+        seed_attrs = attributes[rng.choice(doc_ids)]
+        kind = i % 3
+        if kind == 0 and seed_attrs.uses:
+            use = rng.choice(seed_attrs.uses)
+            text = f"{seed_attrs.product} for {use}"
+            relevant = {
+                doc_id: 2 if use in attributes[doc_id].uses else 1
+                for doc_id in by_product[seed_attrs.product]
+            }
+        elif kind == 1 or not seed_attrs.uses:
+            text = f"{seed_attrs.brand} {seed_attrs.product}"
+            relevant = {
+                doc_id: 2 if attributes[doc_id].brand == seed_attrs.brand else 1
+                for doc_id in by_product[seed_attrs.product]
+            }
+        else:
+            use = rng.choice(seed_attrs.uses)
+            text = f"{seed_attrs.category.replace('/', ' ')} for {use}"
+            relevant = {
+                doc_id: 1 for doc_id in by_category[seed_attrs.category]
+                if use in attributes[doc_id].uses
+            }
+        queries.append(LabeledQuery(text.lower(), relevant))
+    return queries
+
+
+# ── Metrics ─────────────────────────────────────────────────────────────────
+
+
+def score_ranking(
+    ranked: List[str],
+    relevant: Dict[str, int],
+    ks: List[int],
+    min_grade: int = 1
+) -> Dict[str, float]:
+    """
+    recall@k, nDCG@k and MRR@k of one ranked list of product IDs
+
+    Recall and MRR count products graded ``min_grade`` or higher; recall
+    is capped (hits / min(k, relevant)) so large relevant sets can still
+    reach 1.0. nDCG uses every grade with exponential gain (2^grade - 1).
+    """
+    grades = [relevant.get(doc_id, 0) for doc_id in ranked]
+    ideal = sorted(relevant.values(), reverse=True)
+    relevant_count = sum(1 for grade in ideal if grade >= min_grade)
+    first_hit = next((rank for rank, grade in enumerate(grades, 1) if grade >= min_grade), None)
+    scores = {}
+    for k in ks:
+        top = grades[:k]
+        dcg = sum((2 ** grade - 1) / math.log2(rank + 1) for rank, grade in enumerate(top, 1))
+        idcg = sum((2 ** grade - 1) / math.log2(rank + 1) for rank, grade in enumerate(ideal[:k], 1))
+        hits = sum(1 for grade in top if grade >= min_grade)
+        scores[f"recall@{k}"] = hits / min(k, relevant_count) if relevant_count else 0.0
+        scores[f"ndcg@{k}"] = dcg / idcg if idcg else 0.0
+        scores[f"mrr@{k}"] = 1.0 / first_hit if first_hit is not None and first_hit <= k else 0.0
+    return scores
+
+
+def overlap(ranked: List[str], reference: List[str], k: int) -> float:
+    """Fraction of the reference top-k that ``ranked`` also returns in its top-k"""
+    reference = reference[:k]
+    return len(set(ranked[:k]) & set(reference)) / len(reference) if reference else 1.0
+
+
+def evaluate(
+    search: Callable[[str, int], List[str]],
+    queries: List[LabeledQuery],
+    ks: List[int],
+    reference: Optional[List[List[str]]] = None,
+    min_grade: int = 1
+) -> Tuple[Dict, List[List[str]]]:
+    """
+    Run every query through ``search`` and average its metrics
+
+    Args:
+        search: (query text, top_k) -> ranked product IDs
+        queries: Labeled queries
+        ks: Cutoffs to report
+        reference: Exact-search rankings per query, for overlap@k
+        min_grade: Lowest grade that counts as a hit for recall and MRR
+
+    Returns:
+        (metrics with latency, the rankings)
+    """
+    depth = max(ks)
+    totals: Dict[str, float] = defaultdict(float)
+    latencies, rankings = [], []
+    for i, query in enumerate(queries):
+        started = time.perf_counter()
+        ranked = search(query.text, depth)
+        latencies.append((time.perf_counter() - started) * 1000)
+        rankings.append(ranked)
+        for name, value in score_ranking(ranked, query.relevant, ks, min_grade).items():
+            totals[name] += value
+        if reference is not None:
+            for k in ks:
+                totals[f"overlap@{k}"] += overlap(ranked, reference[i], k)
+
+    result = {name: round(value / len(queries), 4) for name, value in sorted(totals.items())}
+    result.update({
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "mean_ms": round(float(np.mean(latencies)), 3),
+    })
+    return result, rankings
+
+
+# ── Configurations ──────────────────────────────────────────────────────────
+
+
+def _ids(results: List[Dict]) -> List[str]:
+    return [str(result["_id"]) for result in results]
+
+
+def run_evaluation(engine, queries: List[LabeledQuery], args: argparse.Namespace) -> Dict[str, Dict]:
+    """Metrics per configuration name, e.g. "semantic/int8" or "hybrid/rrf/w0.6" """
+    ks, min_grade = args.k, args.min_grade
+    semantic = engine.semantic_engine
+    results: Dict[str, Dict] = {}
+
+    def log(name: str) -> None:
+        result = results[name]
+        k = max(ks)
+        print(f"   {name:28s} ndcg@{k} {result[f'ndcg@{k}']:.4f}  recall@{k} {result[f'recall@{k}']:.4f}  "
+              f"mrr@{k} {result[f'mrr@{k}']:.4f}  p50 {result['p50_ms']:>8.3f} ms", file=sys.stderr)
+
+    # Exact float32 semantic search is the reference for the approximate modes
+    exact_index = semantic.index
+    if exact_index.mode != "none":
+        raise ValueError("Engine must load with EmbeddingIndex('none') to serve as the exact reference")
+    semantic_search = lambda text, k: _ids(semantic.search(text, top_k=k, min_score=-1.0))
+    results["semantic/exact"], reference = evaluate(semantic_search, queries, ks, min_grade=min_grade)
+    results["semantic/exact"]["index_bytes"] = exact_index.nbytes
+    log("semantic/exact")
+
+    approximate = []
+    for mode in args.quantization:
+        if mode == "binary":
+            approximate += [(f"semantic/binary@{candidates}", mode, candidates) for candidates in args.rerank_candidates]
+        elif mode != "none":
+            approximate.append((f"semantic/{mode}", mode, settings.EMBEDDING_RERANK_CANDIDATES))
+    try:
+        for name, mode, candidates in approximate:
+            semantic.index = EmbeddingIndex(mode, candidates)
+            semantic.index.build(exact_index.vectors)
+            results[name], _ = evaluate(semantic_search, queries, ks, reference, min_grade)
+            results[name]["index_bytes"] = semantic.index.nbytes
+            log(name)
+    finally:
+        semantic.index = exact_index
+
+    keyword = engine.keyword_engine
+    results["keyword/bm25"], _ = evaluate(lambda text, k: _ids(keyword.search(text, top_k=k)), queries, ks,
+                                       min_grade=min_grade)
+    log("keyword/bm25")
+
+    for fusion in args.fusions:
+        for weight in args.weights:
+            name = f"hybrid/{fusion}/w{weight:g}"
+            hybrid_search = lambda text, k: _ids(engine.search(
+                text, top_k=k, min_score=-math.inf, semantic_weight=weight,
+                keyword_weight=round(1.0 - weight, 4), fusion=fusion, exact_union=args.exact_union,
+            ))
+            results[name], _ = evaluate(hybrid_search, queries, ks, min_grade=min_grade)
+            results[name].update({"semantic_weight": weight, "fusion": fusion})
+            log(name)
+    return results
+
+
+def best_hybrid(results: Dict[str, Dict], metric: str) -> Dict[str, str]:
+    """Best hybrid configuration per fusion method by ``metric``"""
+    best: Dict[str, str] = {}
+    for name, result in results.items():
+        fusion = result.get("fusion")
+        if fusion and (fusion not in best or result[metric] > results[best[fusion]][metric]):
+            best[fusion] = name
+    return best
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """Quality metrics that dropped by more than ``tolerance`` (absolute) vs ``baseline``"""
+    regressions = []
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        for metric, value in result.items():
+            if not metric.startswith(METRICS + ("overlap",)) or metric not in base:
+                continue
+            drop = base[metric] - value
+            if drop > max(tolerance, MIN_REGRESSION_DROP):
+                regressions.append({
+                    "configuration": name, "metric": metric,
+                    "baseline": base[metric], "value": value, "change": round(-drop, 4),
+                })
+    return regressions
+
+
+def _float_list(value: str) -> List[float]:
+    return [float(item) for item in value.split(",") if item.strip()]
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def _str_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", default="10k", help="Synthetic catalog size (1k, 10k, 100k, 1m or a number)")
+    parser.add_argument("--catalog", help="Evaluate an exported catalog (JSON array or lines) instead")
+    parser.add_argument("--queries", help="Labeled queries (JSON lines); generated from the catalog if omitted")
+    parser.add_argument("--num-queries", type=int, default=300, help="Generated queries")
+    parser.add_argument("--encoder", choices=["hashing", "model"], default="hashing",
+                        help="Query/document encoder: hashing stub or the configured model (MODEL_NAME)")
+    parser.add_argument("--min-grade", type=int, default=1,
+                        help="Lowest relevance grade counted by recall and MRR (2: exact matches only)")
+    parser.add_argument("--k", type=_int_list, default=[5, 10], help="Cutoffs, e.g. 1,5,10")
+    parser.add_argument("--quantization", type=_str_list, default=["int8", "binary"],
+                        help="Approximate semantic indexes to compare against exact search")
+    parser.add_argument("--rerank-candidates", type=_int_list, default=[settings.EMBEDDING_RERANK_CANDIDATES],
+                        help="Binary index re-rank depths to try")
+    parser.add_argument("--weights", type=_float_list, default=[0.0, 0.2, 0.4, 0.6, 0.8, 1.0],
+                        help="Hybrid semantic weights (keyword weight is 1 - w)")
+    parser.add_argument("--fusions", type=_str_list, default=["minmax", "rrf"], help="Hybrid fusion methods")
+    parser.add_argument("--exact-union", action="store_true", help="Hybrid with exact_union=True")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="Report from an earlier run to diff against")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Allowed absolute drop per metric")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.quantization) - {"none", "int8", "binary"}
+    if unknown:
+        parser.error(f"unknown quantization modes: {', '.join(sorted(unknown))}")
+
+    # The model encodes the catalog itself at startup (pending embeddings)
+    embeddings = "hashed" if args.encoder == "hashing" else None
+    if args.catalog:
+        catalog = load_catalog(args.catalog)
+        if args.encoder == "hashing":
+            encoder = HashingEncoder()
+            vectors = encoder.encode([document_text(material) for material in catalog])
+            for material, vector in zip(catalog, vectors):
+                material.pop("embedding_int8", None)
+                material.pop("embedding_scale", None)
+                material["embedding"] = vector.tolist()
+    else:
+        catalog = generate_catalog(parse_size(args.products), seed=args.seed, embeddings=embeddings)
+    print(f"📦 {len(catalog)} products", file=sys.stderr)
+
+    queries = load_queries(args.queries) if args.queries else generate_queries(catalog, args.num_queries, args.seed)
+    # Queries with nothing at --min-grade would only score zero recall and MRR
+    queries = [query for query in queries if max(query.relevant.values()) >= args.min_grade]
+    if not queries:
+        parser.error("no labeled queries to evaluate")
+    print(f"🔎 {len(queries)} queries", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory(prefix="search-eval-") as cache_dir:
+        engine = create_engine(InMemoryDatabase(catalog), cache_dir, quantization="none")
+        del catalog
+        encoder_patch = offline_encoder(HashingEncoder()) if args.encoder == "hashing" else contextlib.nullcontext()
+        with encoder_patch:
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                engine.initialize()
+            results = run_evaluation(engine, queries, args)
+
+    metric = f"ndcg@{max(args.k)}"
+    best = best_hybrid(results, metric)
+    for fusion, name in best.items():
+        print(f"⭐ best {fusion} by {metric}: {name} ({results[name][metric]:.4f})", file=sys.stderr)
+
+    report = {
+        "version": REPORT_VERSION,
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "catalog": args.catalog or f"synthetic:{args.products}",
+            "products": len(engine.semantic_engine.materials),
+            "queries": args.queries or f"generated:{len(queries)}",
+            "encoder": "hashing stub" if args.encoder == "hashing" else settings.MODEL_NAME,
+            "k": args.k,
+            "min_grade": args.min_grade,
+            "exact_union": args.exact_union,
+            "seed": args.seed,
+        },
+        "best_hybrid": best,
+        "results": results,
+    }
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        report["regressions"] = regressions
+        report["baseline_commit"] = baseline.get("meta", {}).get("git_commit")
+        for regression in regressions:
+            print(f"❌ {regression['configuration']} {regression['metric']}: "
+                  f"{regression['baseline']} -> {regression['value']} ({regression['change']:+})", file=sys.stderr)
+        if regressions:
+            exit_code = 1
+        else:
+            print(f"✅ No metric dropped by more than {args.tolerance} vs {args.compare}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
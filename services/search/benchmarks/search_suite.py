@@ -0,0 +1,357 @@
+"""Reproducible offline benchmark suite for the search engines
+
+Generates a synthetic catalog per size (see synthetic.py), serves it from
+an in-memory MongoDB stand-in and a hashing query encoder (fakes.py), and
+times the service's real code paths:
+
+- cold start: HybridSearchEngine.initialize() on first boot (BM25 built
+  and persisted) and on restart (BM25 loaded from the stored index)
+- index build: embedding index, BM25 index, product cache, filter columns
+- search: SemanticSearchEngine.search, KeywordSearchEngine.search,
+  HybridSearchEngine.search (plain and with filters)
+- webhooks: product added / updated, as the webhook handlers run them
+
+Nothing is downloaded and no database is needed. Encoder time is not
+representative (the stub is far cheaper than the model); use
+encoder_backends.py for that, and relevance_eval.py for result quality.
+
+Usage (from services/search):
+    python -m benchmarks.search_suite --output benchmarks/results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.search_suite --sizes 1k,10k,100k,1m --quantization int8
+    python -m benchmarks.search_suite --compare benchmarks/results/<base>.json --tolerance 0.2
+
+Prints a JSON report on stdout (and to --output). With --compare, lists
+timings that got slower than the baseline by more than --tolerance and
+exits non-zero if there are any.
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.schemas import SearchFilters
+from app.services.keyword_search import KeywordSearchEngine
+from app.services.quantization import EmbeddingIndex, stored_vector
+from benchmarks.encoder_backends import QUERIES
+from benchmarks.fakes import InMemoryDatabase, create_engine, offline_encoder
+from benchmarks.synthetic import HashingEncoder, generate_catalog, iter_products, parse_size
+
+
+REPORT_VERSION = 1
+
+BENCHMARKS = ("cold_start", "build", "search", "webhook")
+
+# Timings below this are too noisy to flag as regressions
+MIN_REGRESSION_MS = 0.05
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    return round(float(np.percentile(samples, pct)), 4) if samples else 0.0
+
+
+def measure(func: Callable[[int], object], iterations: int, warmup: int = 0) -> Dict[str, float]:
+    """
+    Call ``func(i)`` ``iterations`` times and summarize the latency
+
+    Returns:
+        Milliseconds (median, p95, p99, mean, min, max) and iterations
+    """
+    for i in range(warmup):
+        func(i)
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        func(i)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "iterations": iterations,
+        "median_ms": _percentile(samples, 50),
+        "p95_ms": _percentile(samples, 95),
+        "p99_ms": _percentile(samples, 99),
+        "mean_ms": round(float(np.mean(samples)), 4),
+        "min_ms": round(min(samples), 4),
+        "max_ms": round(max(samples), 4),
+    }
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Silence the engines' progress prints (stdout carries the report)"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def _log(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
+
+
+class SizeRun:
+    """All benchmarks for one catalog size, sharing one catalog and engine"""
+
+    def __init__(self, size: int, args: argparse.Namespace, cache_dir: str):
+        self.size = size
+        self.args = args
+        self.cache_dir = cache_dir
+        self.encoder = HashingEncoder()
+        self.results: Dict[str, Dict] = {}
+
+        started = time.perf_counter()
+        catalog = generate_catalog(size, seed=args.seed, embeddings=args.embeddings, storage=args.storage,
+                                   encoder=self.encoder)
+        self.db = InMemoryDatabase(catalog)
+        self.catalog_seconds = round(time.perf_counter() - started, 3)
+        self.engine = None
+
+    def _new_engine(self):
+        return create_engine(self.db, self.cache_dir, self.args.quantization)
+
+    def _initialize(self, engine) -> None:
+        with _quiet(), offline_encoder(self.encoder):
+            engine.initialize()
+
+    def _forget_bm25(self) -> None:
+        """Drop the persisted BM25 index so the next start builds it"""
+        self.db.collection.documents.pop("bm25_index", None)
+        for name in os.listdir(self.cache_dir):
+            os.remove(os.path.join(self.cache_dir, name))
+
+    def cold_start(self) -> None:
+        repeats = self.args.repeats
+        stages: Dict[str, List[float]] = {}
+
+        def first_boot(i: int) -> None:
+            self._forget_bm25()
+            engine = self._new_engine()
+            self._initialize(engine)
+            for stage, seconds in engine.startup_timings.items():
+                stages.setdefault(stage, []).append(seconds)
+
+        self.results["cold_start.first_boot"] = measure(first_boot, repeats)
+        self.results["cold_start.first_boot"]["stages_s"] = {
+            stage: round(float(np.median(values)), 3) for stage, values in stages.items()
+        }
+        gc.collect()
+
+        self.engine = self._new_engine()
+        self.results["cold_start.restart"] = measure(lambda i: self._initialize(self._new_engine()), repeats)
+        self._initialize(self.engine)
+        gc.collect()
+
+    def build(self) -> None:
+        repeats = self.args.repeats
+        engine = self.engine
+        vectors = np.stack([stored_vector(material) for material in self.db.products()])
+
+        index = EmbeddingIndex(engine.semantic_engine.index.mode, settings.EMBEDDING_RERANK_CANDIDATES)
+        self.results["build.embedding_index"] = measure(lambda i: index.build(vectors), repeats)
+        del vectors
+
+        def keyword_build(i: int) -> None:
+            keyword_engine = KeywordSearchEngine()
+            keyword_engine.db_manager = self.db
+            keyword_engine.build()
+
+        self.results["build.keyword_index"] = measure(keyword_build, repeats)
+        with _quiet():
+            self.results["build.product_cache"] = measure(lambda i: engine.refresh_product_cache(), repeats)
+        self.results["build.filter_index"] = measure(lambda i: engine.refresh_filter_index(), repeats)
+        gc.collect()
+
+    def search(self) -> None:
+        engine = self.engine
+        iterations, warmup = self.args.iterations, min(10, self.args.iterations)
+        query = lambda i: QUERIES[i % len(QUERIES)]
+        filters = SearchFilters(categories=["Cement", "Metals", "Aggregates"], in_stock=True)
+
+        self.results["search.semantic"] = measure(
+            lambda i: engine.semantic_engine.search(query(i), top_k=10, min_score=0.0), iterations, warmup)
+        self.results["search.keyword"] = measure(
+            lambda i: engine.keyword_engine.search(query(i), top_k=10), iterations, warmup)
+        self.results["search.hybrid"] = measure(
+            lambda i: engine.search(query(i), top_k=10), iterations, warmup)
+        self.results["search.hybrid_filtered"] = measure(
+            lambda i: engine.search(query(i), top_k=10, filters=filters), iterations, warmup)
+
+    def webhook(self) -> None:
+        """Product added / updated, mirroring the webhook handlers in main.py"""
+        engine, db = self.engine, self.db
+        iterations = self.args.webhook_iterations
+        new_products = list(iter_products(iterations, seed=self.args.seed + 1, start=self.size))
+        for product in new_products:
+            db.collection.insert_one(product)
+
+        def added(i: int) -> None:
+            product = db.find_by_id(str(new_products[i]["_id"]))
+            engine.semantic_engine.add_material(product["_id"], dict(product))
+            engine.keyword_engine.add_document(product["_id"], product["title"], dict(product))
+            engine.refresh_product(product)
+
+        existing = [doc["_id"] for doc in db.products()[:iterations]]
+
+        def updated(i: int) -> None:
+            db.collection.update_one({"_id": existing[i]}, {"$set": {"title": f"Updated product {i}"}})
+            product = db.find_by_id(str(existing[i]))
+            engine.semantic_engine.update_material(product["_id"], dict(product))
+            engine.keyword_engine.update_document(product["_id"], product["title"], dict(product))
+            engine.refresh_product(product)
+
+        with _quiet():
+            self.results["webhook.product_added"] = measure(added, iterations)
+            self.results["webhook.product_updated"] = measure(updated, iterations)
+
+    def run(self, benchmarks: List[str]) -> Dict:
+        # cold_start also brings up the engine the later benchmarks use
+        if "cold_start" in benchmarks:
+            self.cold_start()
+        else:
+            self.engine = self._new_engine()
+            self._initialize(self.engine)
+        for name in ("build", "search", "webhook"):
+            if name in benchmarks:
+                _log(f"   {name}...")
+                getattr(self, name)()
+        return {
+            "products": self.size,
+            "catalog_generation_s": self.catalog_seconds,
+            "embedding_index_bytes": self.engine.semantic_engine.index.nbytes,
+            "bm25_postings": self.engine.keyword_engine.postings_count(),
+            "max_rss_mb": _max_rss_mb(),
+            "benchmarks": self.results,
+        }
+
+
+def _max_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        return completed.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(report: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """Benchmarks whose median got slower than ``baseline`` by more than ``tolerance``"""
+    regressions = []
+    for size, run in report["sizes"].items():
+        base_run = baseline.get("sizes", {}).get(size)
+        if not base_run:
+            continue
+        for name, result in run["benchmarks"].items():
+            base = base_run["benchmarks"].get(name)
+            if not base:
+                continue
+            old, new = base["median_ms"], result["median_ms"]
+            if new - old > MIN_REGRESSION_MS and new > old * (1 + tolerance):
+                regressions.append({
+                    "size": size, "benchmark": name,
+                    "baseline_ms": old, "median_ms": new,
+                    "change": f"+{(new / old - 1) * 100:.0f}%" if old else "new",
+                })
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1k,10k,100k", help="Catalog sizes, e.g. 1k,10k,100k,1m")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS), help=f"Subset of {','.join(BENCHMARKS)}")
+    parser.add_argument("--iterations", type=int, default=200, help="Queries timed per search benchmark")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per cold start / build benchmark")
+    parser.add_argument("--webhook-iterations", type=int, default=5, help="Products added and updated")
+    parser.add_argument("--quantization", choices=["none", "int8", "binary"], default=settings.EMBEDDING_QUANTIZATION)
+    parser.add_argument("--embeddings", choices=["hashed", "random"], default="hashed",
+                        help="Stored catalog embeddings (hashed: consistent with the query encoder)")
+    parser.add_argument("--storage", choices=["float", "int8"], default="int8",
+                        help="Stored embedding format (int8 keeps 1M products in memory)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="Report from an earlier run to diff against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    benchmarks = [name.strip() for name in args.benchmarks.split(",") if name.strip()]
+    unknown = set(benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    report = {
+        "version": REPORT_VERSION,
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "encoder": "hashing stub",
+            "quantization": args.quantization,
+            "embeddings": args.embeddings,
+            "storage": args.storage,
+            "seed": args.seed,
+            "iterations": args.iterations,
+            "repeats": args.repeats,
+        },
+        "sizes": {},
+    }
+
+    for label in args.sizes.split(","):
+        label = label.strip().lower()
+        size = parse_size(label)
+        _log(f"📦 {label}: generating {size} products...")
+        with tempfile.TemporaryDirectory(prefix="search-bench-") as cache_dir:
+            run = SizeRun(size, args, cache_dir)
+            _log(f"   cold start / engine up ({run.catalog_seconds}s to generate)...")
+            report["sizes"][label] = run.run(benchmarks)
+            del run
+            gc.collect()
+        for name, result in report["sizes"][label]["benchmarks"].items():
+            _log(f"   {name:28s} median {result['median_ms']:>10.3f} ms  p95 {result['p95_ms']:>10.3f} ms")
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        report["regressions"] = regressions
+        report["baseline_commit"] = baseline.get("meta", {}).get("git_commit")
+        for regression in regressions:
+            _log(f"❌ {regression['size']} {regression['benchmark']}: "
+                 f"{regression['baseline_ms']} -> {regression['median_ms']} ms ({regression['change']})")
+        if regressions:
+            exit_code = 1
+        else:
+            _log(f"✅ No regressions beyond {args.tolerance:.0%} vs {args.compare}")
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
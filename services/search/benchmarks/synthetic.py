@@ -0,0 +1,302 @@
+"""Synthetic construction-materials catalog and offline query encoder
+
+Generates product documents shaped like the backend's Product model
+(title, description, category, price, quantity, address, phone_no, GeoJSON
+location) from per-category templates, reproducible from a seed.
+
+``HashingEncoder`` stands in for the sentence-transformers model: a
+query or document embeds as the normalized sum of fixed random vectors of
+its tokens, so texts sharing words score as similar and nothing has to be
+downloaded. Catalog embeddings come from the same encoder ("hashed", so
+semantic results are meaningful) or are plain random unit vectors
+("random", fastest for index-size benchmarks). They are stored as float
+lists or, as with EMBEDDING_STORAGE=int8, as int8 codes plus a scale
+(~400 bytes per product, which keeps 1M-product catalogs in memory).
+"""
+import random
+import re
+import zlib
+from typing import Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+from bson import Binary, ObjectId
+
+from app.core.config import settings
+from app.services.quantization import quantize_int8
+
+
+# category -> (brands, products, variants, uses, price range)
+CATEGORY_TEMPLATES: Dict[str, tuple] = {
+    "Cement": (
+        ["UltraTech", "ACC", "Ambuja", "Shree", "Dalmia", "JK Lakshmi", "Ramco", "Birla A1"],
+        ["OPC 53 Grade Cement", "OPC 43 Grade Cement", "PPC Cement", "PSC Cement",
+         "White Cement", "Rapid Hardening Cement", "Ready Mix Concrete M20", "Ready Mix Concrete M25"],
+        ["50 kg bag", "25 kg bag", "1 tonne jumbo bag", "per cubic metre"],
+        ["foundations", "RCC slabs and columns", "plastering", "brick masonry", "precast work"],
+        (320, 7500),
+    ),
+    "Metals": (
+        ["Tata Tiscon", "JSW Neosteel", "SAIL", "Kamdhenu", "Jindal Panther", "Vizag Steel"],
+        ["TMT Bar Fe 500D", "TMT Bar Fe 550D", "MS Angle", "MS Channel", "MS Flat Bar",
+         "GI Binding Wire", "MS Square Pipe", "Structural I Beam"],
+        ["8 mm", "10 mm", "12 mm", "16 mm", "20 mm", "25 mm", "per tonne"],
+        ["reinforcement of beams and columns", "slab reinforcement", "fabrication", "steel structures"],
+        (55, 75000),
+    ),
+    "Bricks/Blocks": (
+        ["Siporex", "Magicrete", "Renacon", "Biltech", "local kiln"],
+        ["Red Clay Brick", "Fly Ash Brick", "AAC Block", "Concrete Hollow Block",
+         "Solid Concrete Block", "Wire Cut Brick", "Interlocking Paver Block"],
+        ["9x4x3 in", "600x200x100 mm", "600x200x150 mm", "400x200x200 mm", "per 1000 pieces"],
+        ["load bearing walls", "partition walls", "boundary walls", "lightweight masonry"],
+        (6, 9500),
+    ),
+    "Ceramic Materials": (
+        ["Kajaria", "Somany", "Johnson", "Nitco", "Orientbell", "AGL"],
+        ["Vitrified Floor Tile", "Ceramic Wall Tile", "Anti-Skid Bathroom Tile",
+         "Glazed Porcelain Tile", "Parking Tile", "Kitchen Backsplash Tile"],
+        ["600x600 mm", "300x450 mm", "800x1600 mm", "300x300 mm", "per box"],
+        ["living room flooring", "bathroom walls", "kitchen walls", "outdoor parking areas"],
+        (35, 2400),
+    ),
+    "Paint/Coatings": (
+        ["Asian Paints", "Berger", "Nerolac", "Dulux", "Indigo", "Nippon"],
+        ["Exterior Emulsion", "Interior Emulsion", "Waterproof Exterior Coating", "Cement Primer",
+         "Synthetic Enamel Paint", "Wall Putty", "Texture Paint"],
+        ["1 L", "4 L", "10 L", "20 L", "40 kg bag"],
+        ["exterior walls", "interior walls", "metal grills and doors", "damp walls"],
+        (180, 12000),
+    ),
+    "Roofing Materials": (
+        ["Tata Shaktee", "JSW Colouron", "Everest", "Visaka", "Mangalore Tiles"],
+        ["Galvalume Roofing Sheet", "Colour Coated Roofing Sheet", "Fibre Cement Roofing Sheet",
+         "Polycarbonate Sheet", "Clay Roof Tile", "Ridge Cap"],
+        ["0.45 mm", "0.50 mm", "8 ft", "10 ft", "12 ft", "per piece"],
+        ["industrial sheds", "residential roofs", "car parking shades", "verandas"],
+        (45, 3800),
+    ),
+    "Aggregates": (
+        ["Robo", "Sri Balaji Quarry", "Rock Crusher", "local supplier"],
+        ["River Sand", "M Sand", "P Sand", "20 mm Crushed Stone Aggregate",
+         "40 mm Crushed Stone Aggregate", "Stone Dust", "Gravel"],
+        ["per cubic ft", "per tonne", "per truckload", "per brass"],
+        ["concrete mixing", "plastering", "road base", "block making"],
+        (40, 45000),
+    ),
+    "Plumbing Materials": (
+        ["Supreme", "Finolex", "Astral", "Ashirvad", "Prince", "Sintex"],
+        ["CPVC Pipe", "UPVC Pipe", "PVC SWR Pipe", "Brass Ball Valve", "Solvent Cement",
+         "Overhead Water Tank", "PPR Pipe"],
+        ["1/2 inch", "3/4 inch", "1 inch", "2 inch", "4 inch", "500 L", "1000 L"],
+        ["hot and cold water lines", "drainage", "rainwater outlets", "water storage"],
+        (60, 14000),
+    ),
+    "Electrical Materials": (
+        ["Havells", "Polycab", "Finolex", "Anchor", "RR Kabel", "Legrand"],
+        ["FR PVC Insulated Copper Wire", "Modular Switch", "MCB", "PVC Conduit Pipe",
+         "Distribution Board", "LED Panel Light"],
+        ["1.5 sq mm", "2.5 sq mm", "4 sq mm", "90 m coil", "6 A", "32 A", "8 way"],
+        ["house wiring", "concealed conduits", "circuit protection", "lighting"],
+        (25, 9000),
+    ),
+    "Wood": (
+        ["Greenply", "CenturyPly", "Kitply", "Archidply", "Sainik"],
+        ["BWP Marine Plywood", "MR Grade Plywood", "Flush Door", "Block Board",
+         "MDF Board", "Teak Wood Frame", "Decorative Laminate Sheet"],
+        ["8x4 ft 18 mm", "8x4 ft 12 mm", "8x4 ft 6 mm", "7x3 ft", "1 mm"],
+        ["modular kitchens", "wardrobes", "doors and frames", "furniture"],
+        (400, 16000),
+    ),
+    "Glass": (
+        ["Saint-Gobain", "Asahi", "Modiguard", "Gold Plus"],
+        ["Toughened Glass", "Clear Float Glass", "Frosted Glass", "Laminated Safety Glass",
+         "Reflective Glass"],
+        ["5 mm", "8 mm", "10 mm", "12 mm", "per sq ft"],
+        ["windows", "shower partitions", "balcony railings", "facades"],
+        (45, 650),
+    ),
+    "Adhesives/Sealants": (
+        ["Dr. Fixit", "Fosroc", "Sika", "MYK Laticrete", "Pidilite Fevicol"],
+        ["Waterproofing Compound", "Tile Adhesive", "Crack Filler", "Silicone Sealant",
+         "Epoxy Grout", "Bituminous Membrane", "Wood Adhesive"],
+        ["1 kg", "5 kg", "20 kg", "20 L", "280 ml cartridge"],
+        ["roof terraces", "wall and floor tiles", "bathroom waterproofing", "joints and cracks"],
+        (90, 8500),
+    ),
+    "Insulation Materials": (
+        ["Owens Corning", "Rockwool", "UP Twiga", "Supreme"],
+        ["Glass Wool Insulation Roll", "Rock Wool Slab", "XPS Insulation Board",
+         "Underdeck Roof Insulation", "Acoustic Panel"],
+        ["25 mm", "50 mm", "per roll", "per sq m"],
+        ["roof heat insulation", "sound proofing", "cold storage walls", "duct lining"],
+        (150, 6500),
+    ),
+    "Hardware/Fasteners": (
+        ["Hettich", "Godrej", "Dorset", "Hafele", "local"],
+        ["SS Door Hinge", "Anchor Fastener", "Drywall Screw", "Mortise Lock", "Tower Bolt",
+         "Chemical Anchor"],
+        ["4 inch", "M10", "M12", "pack of 100", "pack of 10"],
+        ["doors and windows", "ceiling fixings", "gypsum partitions", "cabinets"],
+        (30, 3500),
+    ),
+    "Landscaping Materials": (
+        ["GreenTurf", "Kota Stone Traders", "local nursery"],
+        ["Artificial Grass Turf", "Kota Stone Slab", "Cobble Stone", "Garden Kerb Stone",
+         "Pebble Stones"],
+        ["per sq ft", "per tonne", "25 kg bag"],
+        ["garden paths", "driveways", "lawns", "outdoor seating areas"],
+        (25, 1800),
+    ),
+}
+
+CATEGORIES = list(CATEGORY_TEMPLATES)
+
+CITIES = [
+    ("Mumbai", 19.076, 72.8777), ("Pune", 18.5204, 73.8567), ("Bengaluru", 12.9716, 77.5946),
+    ("Hyderabad", 17.385, 78.4867), ("Chennai", 13.0827, 80.2707), ("Delhi", 28.7041, 77.1025),
+    ("Ahmedabad", 23.0225, 72.5714), ("Kolkata", 22.5726, 88.3639),
+]
+
+QUALITIES = ["premium", "ISI marked", "high strength", "economy", "durable", "weather resistant", "certified"]
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def parse_size(value: Union[str, int]) -> int:
+    """``1k`` / ``10k`` / ``100k`` / ``1m`` or a plain integer"""
+    text = str(value).strip().lower()
+    return SIZES[text] if text in SIZES else int(text)
+
+
+def _product(rng: random.Random, category: str) -> Dict:
+    brands, products, variants, uses, (low, high) = CATEGORY_TEMPLATES[category]
+    brand, product, variant = rng.choice(brands), rng.choice(products), rng.choice(variants)
+    use, other_use = rng.sample(uses, 2)
+    city, lat, lng = rng.choice(CITIES)
+    return {
+        "title": f"{brand} {product} {variant}",
+        "description": (
+            f"{rng.choice(QUALITIES).capitalize()} {product.lower()} by {brand} for {use}. "
+            f"Also suited to {other_use}. Supplied {variant} from our {city} depot."
+        ),
+        "category": category,
+        "price": round(rng.uniform(low, high), 2),
+        "quantity": rng.choice((0, rng.randint(1, 50), rng.randint(50, 5000))),
+        "address": f"{rng.randint(1, 250)}, Industrial Area, {city}",
+        "phone_no": f"+91 9{rng.randint(100000000, 999999999)}",
+        "location": {
+            "type": "Point",
+            # GeoJSON order: [lng, lat], scattered ~30 km around the city
+            "coordinates": [round(lng + rng.uniform(-0.3, 0.3), 6), round(lat + rng.uniform(-0.3, 0.3), 6)],
+        },
+    }
+
+
+def iter_products(count: int, seed: int = 0, start: int = 0) -> Iterator[Dict]:
+    """Product documents without embeddings; ``_id`` is a deterministic ObjectId"""
+    rng = random.Random(seed * 1_000_003 + start)
+    for i in range(start, start + count):
+        product = _product(rng, rng.choice(CATEGORIES))
+        product["_id"] = ObjectId(f"{i + 1:024x}")
+        yield product
+
+
+def document_text(material: Dict) -> str:
+    """The text the service embeds for a material (see SemanticSearchEngine)"""
+    return f"{material.get('title', '')} {material.get('category', '')} {material.get('description', '')}"
+
+
+class HashingEncoder:
+    """
+    Deterministic bag-of-words encoder with the SentenceTransformer.encode API
+
+    Each token maps to a fixed random unit vector (seeded by its CRC32);
+    a text's embedding is the normalized sum over its tokens.
+    """
+
+    def __init__(self, dimension: int = settings.EMBEDDING_DIMENSION):
+        self.dimension = dimension
+        self._vectors: Dict[str, np.ndarray] = {}
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vector = self._vectors.get(token)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(token.encode()))
+            vector = rng.standard_normal(self.dimension).astype(np.float32)
+            self._vectors[token] = vector
+        return vector
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        embedding = np.zeros(self.dimension, dtype=np.float32)
+        for token in _TOKEN.findall(text.lower()):
+            embedding += self._token_vector(token)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def encode(self, sentences: Union[str, Sequence[str]], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self._encode_one(sentences)
+        if not sentences:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.stack([self._encode_one(text) for text in sentences])
+
+
+def random_embeddings(count: int, dimension: int = settings.EMBEDDING_DIMENSION, seed: int = 0) -> np.ndarray:
+    """Random unit vectors (float32), for benchmarks where relevance doesn't matter"""
+    vectors = np.random.default_rng(seed).standard_normal((count, dimension), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def generate_catalog(
+    count: int,
+    seed: int = 0,
+    embeddings: Optional[str] = "hashed",
+    storage: str = "float",
+    encoder: Optional[HashingEncoder] = None
+) -> List[Dict]:
+    """
+    Build ``count`` product documents as they are stored in MongoDB
+
+    Args:
+        count: Number of products
+        seed: Catalog seed; the same seed always gives the same catalog
+        embeddings: "hashed" (HashingEncoder over the document text),
+            "random" (unit vectors) or None (no stored embedding, as for
+            products the service still has to encode)
+        storage: "float" (``embedding`` list) or "int8"
+            (``embedding_int8`` + ``embedding_scale``)
+        encoder: Encoder for "hashed"; a new HashingEncoder by default
+
+    Returns:
+        Documents with an ObjectId ``_id``, as the service reads them
+    """
+    if storage not in ("float", "int8"):
+        raise ValueError(f"Unknown embedding storage '{storage}'")
+    products = list(iter_products(count, seed))
+    if embeddings is None:
+        return products
+
+    # Chunked so 1M-product catalogs never hold all float vectors at once
+    chunk_size = 10_000
+    for start in range(0, count, chunk_size):
+        chunk = products[start:start + chunk_size]
+        if embeddings == "hashed":
+            encoder = encoder or HashingEncoder()
+            vectors = encoder.encode([document_text(product) for product in chunk])
+        elif embeddings == "random":
+            vectors = random_embeddings(len(chunk), seed=seed * 1_000_003 + start)
+        else:
+            raise ValueError(f"Unknown embeddings '{embeddings}' (expected 'hashed', 'random' or None)")
+
+        if storage == "int8":
+            codes, scales = quantize_int8(vectors)
+            for product, row, scale in zip(chunk, codes, scales):
+                product["embedding_int8"] = Binary(row.tobytes())
+                product["embedding_scale"] = float(scale)
+        else:
+            for product, vector in zip(chunk, vectors):
+                product["embedding"] = vector.tolist()
+    return products
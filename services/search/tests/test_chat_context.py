@@ -0,0 +1,112 @@
+"""ChatContext history compaction and prompt-prefix cache fallback"""
+import asyncio
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+from google.genai import errors, types
+
+from app.core.config import settings
+from app.services.chat_context import ChatContext, estimate_tokens, is_user_text
+
+
+def _text(role: str, text: str) -> types.Content:
+    return types.Content(role=role, parts=[types.Part(text=text)])
+
+
+def _search_turn(query: str) -> List[types.Content]:
+    """Model function call and the user-role function response it pairs with"""
+    return [
+        types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(
+            name="search_and_recommend_products", args={"query": query}
+        ))]),
+        types.Content(role="user", parts=[types.Part(function_response=types.FunctionResponse(
+            name="search_and_recommend_products", response={"products": ["x" * 40] * 5}
+        ))]),
+    ]
+
+
+def _conversation(turns: int) -> List[types.Content]:
+    contents = []
+    for i in range(turns):
+        contents.append(_text("user", f"Turn {i}: I need cement for a {i} m2 slab " + "please " * 20))
+        contents.extend(_search_turn(f"cement slab {i}"))
+        contents.append(_text("model", f"Here are options for turn {i}. " + "details " * 20))
+    return contents
+
+
+@pytest.fixture
+def context():
+    return ChatContext("You are a construction materials advisor.", [])
+
+
+def test_short_history_is_sent_as_is(context, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_CONTEXT_TOKEN_BUDGET", 10_000)
+    contents = _conversation(3)
+    assert context.build_contents(contents) is contents
+
+
+def test_long_history_is_folded_into_a_summary(context, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_CONTEXT_TOKEN_BUDGET", 300)
+    monkeypatch.setattr(settings, "CHAT_CONTEXT_SUMMARY_CHARS", 400)
+    contents = _conversation(8)
+
+    built = context.build_contents(contents)
+    first, kept = built[0], built[1:]
+    cut = len(contents) - len(kept)
+
+    # Newest turns verbatim, starting at a plain user turn
+    assert kept == contents[cut:]
+    assert is_user_text(contents[cut - 1]) and first.parts[1:] == contents[cut - 1].parts
+    assert sum(estimate_tokens(c) for c in built) < sum(estimate_tokens(c) for c in contents) / 2
+
+    # The summary leads with the most recent dropped turns, within its budget
+    summary = first.parts[0].text
+    assert summary.startswith("(Summary of earlier conversation: ")
+    assert len(summary) <= 400 + len("(Summary of earlier conversation: )")
+    assert "Advisor searched for: cement slab" in summary and "Turn 0:" not in summary
+
+    # Every kept function response still follows its call
+    for i, content in enumerate(built):
+        if any(part.function_response for part in content.parts):
+            assert built[i - 1].parts[0].function_call is not None
+
+
+def test_no_safe_cut_point_keeps_everything(context, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_CONTEXT_TOKEN_BUDGET", 50)
+    contents = [_text("user", "long question " * 50)] + _search_turn("cement") * 3
+    assert context.build_contents(contents) is contents
+
+
+class _Caches:
+    def __init__(self, error: Exception):
+        self.error = error
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise self.error
+
+
+def test_transient_cache_failure_backs_off(context, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_CONTEXT_CACHING", True)
+    caches = _Caches(errors.ServerError(503, {"error": {"message": "unavailable"}}))
+    client = SimpleNamespace(aio=SimpleNamespace(caches=caches))
+
+    async def run():
+        return [await context.get_config(client, "gemini") for _ in range(3)]
+
+    assert all(config is context.base_config for config in asyncio.run(run()))
+    assert caches.calls == 1 and not context._cache_unsupported
+    assert context._cache_retry_at > 0
+
+
+def test_unsupported_cache_is_not_retried(context, monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_CONTEXT_CACHING", True)
+    caches = _Caches(errors.ClientError(400, {"error": {"message": "too small"}}))
+    client = SimpleNamespace(aio=SimpleNamespace(caches=caches))
+
+    asyncio.run(context.get_config(client, "gemini"))
+    assert context._cache_unsupported
+    assert asyncio.run(context.get_config(client, "gemini")) is context.base_config
+    assert caches.calls == 1
@@ -0,0 +1,114 @@
+"""/chat/message/stream event order against in-memory Mongo and Gemini stand-ins"""
+import asyncio
+import json
+import tempfile
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+import pytest
+from fastapi import FastAPI
+
+from app.routers import chat
+from app.services.gemini_chat import GeminiChatService
+from benchmarks.fakes import FakeGenaiClient, InMemoryDatabase, create_engine, offline_encoder
+from benchmarks.synthetic import HashingEncoder, generate_catalog
+
+
+class RecordingGenaiClient(FakeGenaiClient):
+    """FakeGenaiClient that searches on the first turn and logs each text chunk it generates"""
+
+    def __init__(self, log: List[Tuple[str, Any]]):
+        super().__init__(
+            latency_ms=0, jitter_ms=0, search_after_turns=1,
+            stream_chunks=4, chunk_delay_ms=5, seed=0
+        )
+        self.log = log
+
+    async def stream(self, response) -> AsyncIterator:
+        async for chunk in super().stream(response):
+            text = chunk.candidates[0].content.parts[0].text
+            if text:
+                self.log.append(("model", text))
+            yield chunk
+
+
+@pytest.fixture(scope="module")
+def search_engine():
+    db = InMemoryDatabase(generate_catalog(200, seed=0))
+    engine = create_engine(db, tempfile.mkdtemp(prefix="search-test-"))
+    with offline_encoder(HashingEncoder()):
+        engine.initialize()
+    return engine
+
+
+async def _post_stream(app: FastAPI, path: str, body: Dict, log: List[Tuple[str, Any]]) -> int:
+    """Call ``app`` over raw ASGI, logging each response body chunk as it is sent"""
+    request = [{"type": "http.request", "body": json.dumps(body).encode(), "more_body": False}]
+    status = {}
+
+    async def receive():
+        if request:
+            return request.pop()
+        # No client disconnect; the response finishes on its own
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            log.append(("wire", message["body"]))
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [(b"content-type", b"application/json")],
+        "client": ("test", 1), "server": ("test", 80),
+    }
+    await app(scope, receive, send)
+    return status["code"]
+
+
+def _parse_event(chunk: bytes) -> Tuple[str, Dict]:
+    event, data = chunk.decode().strip().split("\n", 1)
+    return event[len("event: "):], json.loads(data[len("data: "):])
+
+
+def test_stream_sends_products_before_summary(search_engine, monkeypatch):
+    log: List[Tuple[str, Any]] = []
+    service = GeminiChatService()
+    service.client = RecordingGenaiClient(log)
+    service.model_name = "fake-gemini"
+    service.set_search_engine(search_engine)
+    monkeypatch.setattr(chat, "chat_service", service)
+
+    app = FastAPI()
+    app.include_router(chat.router)
+
+    async def run() -> int:
+        session = await service.create_session()
+        return await _post_stream(
+            app, "/chat/message/stream",
+            {"session_id": session["session_id"], "message": "waterproof cement for a bathroom floor"},
+            log
+        )
+
+    assert asyncio.run(run()) == 200
+
+    wire = [(position, *_parse_event(item)) for position, (kind, item) in enumerate(log) if kind == "wire"]
+    names = [name for _, name, _ in wire]
+    assert names[0] == "tool_call"
+    assert names[1] == "products"
+    assert names[-1] == "done"
+    assert len(names) > 3 and set(names[2:-1]) == {"token"}
+
+    products = wire[1][2]
+    assert products["products"]
+    assert products["query_used"] == wire[0][2]["query"]
+
+    # Products go out before the model has generated any of the summary
+    summary_generated = [position for position, (kind, _) in enumerate(log) if kind == "model"]
+    assert summary_generated and wire[1][0] < summary_generated[0]
+
+    done = wire[-1][2]
+    assert done["status"] == "completed"
+    assert done["message"] == "".join(data["text"] for _, name, data in wire if name == "token")
+    assert [p["_id"] for p in done["products"]] == [p["_id"] for p in products["products"]]
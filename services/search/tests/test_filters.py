@@ -0,0 +1,62 @@
+"""FilterIndex masks over a small hand-built catalog"""
+import numpy as np
+import pytest
+
+from app.models.schemas import SearchFilters
+from app.services.filters import FilterIndex
+
+
+CATALOG = [
+    {"_id": "p0", "category": "Cement", "price": 400, "quantity": 10},
+    {"_id": "p1", "category": "cement ", "price": 350, "quantity": 0},
+    {"_id": "p2", "category": "Metals", "price": 60000, "quantity": 5},
+    {"_id": "p3", "category": "Paint/Coatings", "price": "900", "quantity": 3},
+    {"_id": "p4", "category": "Cement", "price": None, "quantity": 2},
+]
+
+
+@pytest.fixture
+def index():
+    index = FilterIndex()
+    index.build(CATALOG)
+    return index
+
+
+def _rows(index: FilterIndex, size: int = len(CATALOG), **filters):
+    return np.flatnonzero(index.mask(SearchFilters(**filters), size)).tolist()
+
+
+def test_no_filters_is_no_mask(index):
+    assert index.mask(None, len(CATALOG)) is None
+    assert index.mask(SearchFilters(), len(CATALOG)) is None
+
+
+def test_category_is_case_and_whitespace_insensitive(index):
+    assert _rows(index, categories=["CEMENT"]) == [0, 1, 4]
+    assert _rows(index, categories=["metals", "paint/coatings"]) == [2, 3]
+    assert _rows(index, categories=["Glass"]) == []
+
+
+def test_price_and_stock(index):
+    # Missing prices never match a price bound
+    assert _rows(index, min_price=400, max_price=1000) == [0, 3]
+    assert _rows(index, in_stock=True) == [0, 2, 3, 4]
+    assert _rows(index, min_quantity=5) == [0, 2]
+    assert _rows(index, categories=["cement"], in_stock=True) == [0, 4]
+
+
+def test_rows_beyond_index_never_pass(index):
+    mask = index.mask(SearchFilters(categories=["cement"]), len(CATALOG) + 2)
+    assert mask.tolist() == [True, True, False, False, True, False, False]
+
+
+def test_set_and_remove_rows(index):
+    index.set(1, {"category": "Metals", "price": 70, "quantity": 4})
+    index.set(5, {"category": "Cement", "price": 500, "quantity": 1})
+    assert index.size == 6
+    assert _rows(index, size=6, categories=["cement"]) == [0, 4, 5]
+    assert _rows(index, size=6, categories=["metals"], in_stock=True) == [1, 2]
+
+    index.remove(0)
+    assert _rows(index, size=6, categories=["cement"]) == [4, 5]
+    assert _rows(index, size=6, max_price=1000) == [1, 3, 5]
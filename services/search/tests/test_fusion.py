@@ -0,0 +1,83 @@
+"""Score fusion over fixed per-leg score arrays"""
+import math
+from typing import List
+
+import numpy as np
+import pytest
+
+from app.services.hybrid_search import HybridSearchEngine, _erf, _normalize_rrf, _normalize_z_score
+
+
+@pytest.fixture
+def engine():
+    engine = HybridSearchEngine()
+    materials = [{"_id": f"p{i}", "title": f"Product {i}"} for i in range(5)]
+    engine.semantic_engine.materials = materials
+    engine.product_cache.load(materials)
+    return engine
+
+
+def _fuse(engine, semantic: List[float], keyword: List[float], top_k: int = 4, fusion: str = "minmax",
+          semantic_weight: float = 0.6, keyword_weight: float = 0.4, exact_union: bool = False):
+    return engine._fuse(
+        np.array(semantic, dtype=float), np.array(keyword, dtype=float), None, top_k, 0.0,
+        semantic_weight, keyword_weight, fusion, exact_union, None
+    )
+
+
+# One clear semantic winner (p0) that BM25 ranks last; p1 tops BM25
+SEMANTIC = [0.9, 0.5, 0.49, 0.48]
+KEYWORD = [0.0, 3.0, 2.0, 1.0]
+
+
+def test_minmax_follows_score_gaps(engine):
+    results = _fuse(engine, SEMANTIC, KEYWORD, fusion="minmax")
+    assert [r["_id"] for r in results] == ["p0", "p1", "p2", "p3"]
+    assert [r["combined_score"] for r in results] == [0.6, 0.4286, 0.281, 0.1333]
+
+
+def test_zscore_ranking(engine):
+    results = _fuse(engine, SEMANTIC, KEYWORD, fusion="zscore")
+    assert [r["_id"] for r in results] == ["p0", "p1", "p2", "p3"]
+    assert [r["combined_score"] for r in results] == [0.6109, 0.5448, 0.4383, 0.2889]
+
+
+def test_rrf_ignores_score_gaps(engine):
+    # By rank alone p1 (2nd semantic, 1st BM25) edges out p0 (1st semantic,
+    # last BM25), although p0 wins the semantic leg by a wide margin
+    results = _fuse(engine, SEMANTIC, KEYWORD, fusion="rrf")
+    assert [r["_id"] for r in results] == ["p1", "p0", "p2", "p3"]
+    assert results[0]["combined_score"] == round(0.6 * 61 / 62 + 0.4, 4)
+
+
+def test_exact_union_scores_both_legs(engine):
+    # top_k=1 fetches 3 per leg: p3 is a BM25 candidate outside the semantic top list
+    semantic, keyword = [0.9, 0.8, 0.7, 0.1, 0.05], [0.0, 0.0, 0.0, 10.0, 3.0]
+    kwargs = dict(top_k=1, semantic_weight=0.0, keyword_weight=1.0)
+
+    top, = _fuse(engine, semantic, keyword, **kwargs)
+    assert (top["_id"], top["semantic_score"]) == ("p3", 0.0)
+
+    top, = _fuse(engine, semantic, keyword, exact_union=True, **kwargs)
+    assert (top["_id"], top["semantic_score"]) == ("p3", 0.1)
+
+
+def test_rrf_normalization_ranks_within_mask():
+    scores = np.array([0.2, 0.9, 0.5, 0.7])
+    mask = np.array([True, True, False, True])
+    np.testing.assert_allclose(_normalize_rrf(scores, mask), [61 / 63, 1.0, 0.0, 61 / 62])
+
+
+def test_zscore_normalization_handles_tombstones():
+    scores = np.array([0.1, 0.4, 0.8, -np.inf])
+    mask = np.array([True, True, True, False])
+    normalized = _normalize_z_score(scores, mask)
+    assert np.all(np.isfinite(normalized))
+    assert normalized[3] == 0.0
+    assert 0.0 < normalized[0] < normalized[1] < normalized[2] < 1.0
+
+
+def test_erf_matches_math_erf():
+    x = np.concatenate([np.linspace(-6.0, 6.0, 2001), [np.inf, -np.inf]])
+    expected = np.array([math.erf(v) for v in x])
+    np.testing.assert_allclose(_erf(x), expected, atol=2e-7)
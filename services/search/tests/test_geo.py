@@ -0,0 +1,89 @@
+"""GeoIndex radius masks and the combined filter + geo prefilter"""
+import math
+
+import numpy as np
+import pytest
+
+from app.models.schemas import GeoQuery, SearchFilters
+from app.services.geo import EARTH_RADIUS_KM, GeoIndex
+from app.services.hybrid_search import HybridSearchEngine
+from benchmarks.synthetic import generate_catalog
+
+
+def _point(lat: float, lng: float):
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+
+MUMBAI, PUNE, DELHI = (19.076, 72.8777), (18.5204, 73.8567), (28.6139, 77.209)
+
+CATALOG = [
+    {"_id": "p0", "category": "Cement", "price": 400, "quantity": 10, "location": _point(*MUMBAI)},
+    {"_id": "p1", "category": "Cement", "price": 350, "quantity": 0, "location": _point(*PUNE)},
+    {"_id": "p2", "category": "Metals", "price": 60000, "quantity": 5, "location": _point(*MUMBAI)},
+    {"_id": "p3", "category": "Cement", "price": 900, "quantity": 3, "location": _point(*DELHI)},
+    {"_id": "p4", "category": "Cement", "price": 700, "quantity": 2},
+    # Either side of the antimeridian, ~175 km apart
+    {"_id": "p5", "category": "Roofing Materials", "price": 500, "quantity": 1, "location": _point(-18.0, -179.9)},
+    {"_id": "p6", "category": "Roofing Materials", "price": 500, "quantity": 1, "location": _point(-18.14, 178.44)},
+]
+
+
+def _haversine_km(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 \
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+@pytest.fixture
+def engine():
+    engine = HybridSearchEngine()
+    engine.filter_index.build(CATALOG)
+    engine.geo_index.build(CATALOG)
+    return engine
+
+
+def _radius_rows(index: GeoIndex, lat: float, lng: float, radius_km: float):
+    return np.flatnonzero(index.radius_mask(lat, lng, radius_km, len(CATALOG))).tolist()
+
+
+def test_radius_mask(engine):
+    index = engine.geo_index
+    assert _radius_rows(index, *MUMBAI, 50) == [0, 2]
+    assert _radius_rows(index, *MUMBAI, 200) == [0, 1, 2]
+    assert _radius_rows(index, *MUMBAI, 1500) == [0, 1, 2, 3]
+
+
+def test_radius_mask_wraps_antimeridian(engine):
+    assert _radius_rows(engine.geo_index, -18.14, 178.44, 300) == [5, 6]
+    assert _radius_rows(engine.geo_index, -18.0, -179.9, 100) == [5]
+
+
+def test_radius_mask_matches_brute_force():
+    catalog = generate_catalog(500, seed=0, embeddings=None)
+    index = GeoIndex()
+    index.build(catalog)
+    points = [tuple(reversed(m["location"]["coordinates"])) for m in catalog]
+    for lat, lng, radius_km in [(19.07, 72.88, 150), (28.6, 77.2, 400), (13.0, 80.2, 25), (22.5, 88.4, 1000)]:
+        expected = [i for i, (plat, plng) in enumerate(points) if _haversine_km(lat, lng, plat, plng) <= radius_km]
+        assert np.flatnonzero(index.radius_mask(lat, lng, radius_km, len(catalog))).tolist() == expected
+
+
+def test_removed_and_moved_rows(engine):
+    index = engine.geo_index
+    index.remove(0)
+    index.set(3, {"location": _point(19.1, 72.9)})
+    assert _radius_rows(index, *MUMBAI, 50) == [2, 3]
+
+
+def test_filters_and_radius_combine(engine):
+    mumbai = GeoQuery(lat=MUMBAI[0], lng=MUMBAI[1], radius_km=200)
+    mask, rows = engine._prefilter(SearchFilters(categories=["cement"]), mumbai, len(CATALOG))
+    assert rows.tolist() == [0, 1]
+    assert mask.tolist() == [i in (0, 1) for i in range(len(CATALOG))]
+
+    _, rows = engine._prefilter(SearchFilters(categories=["cement"], in_stock=True), mumbai, len(CATALOG))
+    assert rows.tolist() == [0]
+
+    # Decay-only geo queries boost, they don't filter
+    assert engine._prefilter(None, GeoQuery(lat=0.0, lng=0.0, decay_km=10), len(CATALOG)) == (None, None)
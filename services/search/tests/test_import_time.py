@@ -0,0 +1,14 @@
+"""Entry points import within budget and without the heavy dependencies"""
+import pytest
+
+from benchmarks.import_time import BUDGETS_MS, check
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS_MS))
+def test_import_within_budget(module):
+    result = check(module, BUDGETS_MS[module])
+    assert result["deferred_modules_loaded"] == [], f"{module} imports deferred modules eagerly"
+    assert result["import_ms"] <= result["budget_ms"], (
+        f"{module} imports in {result['import_ms']} ms (budget {result['budget_ms']} ms); "
+        f"slowest: {result['slowest_cumulative_ms']}"
+    )
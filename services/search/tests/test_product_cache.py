@@ -0,0 +1,73 @@
+"""ProductCache serialization and pre-encoded JSON"""
+import json
+from datetime import date, datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from app.services.product_cache import ProductCache, serialize_product
+
+
+PRODUCT_ID = ObjectId("0000000000000000000000aa")
+SELLER_ID = ObjectId("0000000000000000000000bb")
+
+MATERIAL = {
+    "_id": PRODUCT_ID,
+    "title": "PPC Cement 50 kg bag",
+    "category": "Cement",
+    "price": 420,
+    "quantity": 12,
+    "seller": SELLER_ID,
+    "createdAt": datetime(2024, 5, 1, 10, 20, 30, 123456),
+    "updatedAt": datetime(2024, 5, 1, 16, 0, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+    "available_from": date(2024, 6, 1),
+    "reviews": [{"user": SELLER_ID, "at": datetime(2024, 5, 2)}],
+    "embedding": [0.1, 0.2],
+    "embedding_model": "all-MiniLM-L6-v2",
+    "__v": 0,
+}
+
+
+def test_serialize_matches_mongoose_json():
+    product = serialize_product(MATERIAL)
+    # Naive datetimes are UTC from pymongo; written like Mongoose's toJSON()
+    assert product["createdAt"] == "2024-05-01T10:20:30.123Z"
+    assert product["updatedAt"] == "2024-05-01T16:00:00.000+05:30"
+    assert product["available_from"] == "2024-06-01"
+    assert product["_id"] == str(PRODUCT_ID)
+    assert product["reviews"] == [{"user": str(SELLER_ID), "at": "2024-05-02T00:00:00.000Z"}]
+    assert not {"embedding", "embedding_model", "__v"} & product.keys()
+
+
+def test_encoded_payloads_match_serialized_product():
+    cache = ProductCache()
+    cache.load([MATERIAL])
+    product_id = str(PRODUCT_ID)
+    product = cache.get(product_id)
+
+    assert json.loads(cache.get_encoded(product_id)) == product
+    assert json.loads(cache.encode_products([product_id, "missing"])) == [product]
+
+    result = dict(product, semantic_score=0.81, keyword_score=3.2, combined_score=0.74)
+    body = json.loads(cache.encode_search_response("cement", [result]))
+    assert body["query"] == "cement" and body["total"] == 1
+    hit, = body["results"]
+    assert hit["_id"] == product_id
+    assert hit["price"] == 420.0 and isinstance(hit["price"], float)
+    assert (hit["combined_score"], hit["distance_km"]) == (0.74, None)
+    # Only Material fields go into /search results
+    assert "createdAt" not in hit and hit["brand"] == ""
+
+
+def test_upsert_and_remove_refresh_encodings():
+    cache = ProductCache()
+    cache.load([MATERIAL])
+    product_id = str(PRODUCT_ID)
+
+    cache.upsert(dict(MATERIAL, price=399.5, updatedAt=datetime(2024, 7, 1)))
+    assert json.loads(cache.get_encoded(product_id))["updatedAt"] == "2024-07-01T00:00:00.000Z"
+    hit, = json.loads(cache.encode_search_response("cement", [cache.get(product_id)]))["results"]
+    assert hit["price"] == 399.5
+
+    cache.remove(product_id)
+    assert product_id not in cache and cache.get_encoded(product_id) is None
+    assert cache.encode_products([product_id]) == b"[]"
@@ -0,0 +1,80 @@
+"""Deleted products stay out of every search path while their rows remain as tombstones"""
+import asyncio
+import tempfile
+
+import pytest
+
+from app.models.schemas import HybridSearchRequest, SearchFilters
+from benchmarks.fakes import InMemoryDatabase, create_engine, offline_encoder
+from benchmarks.synthetic import HashingEncoder, generate_catalog
+
+
+@pytest.fixture(scope="module")
+def deleted():
+    """An initialized engine with one product removed, and that product"""
+    catalog = generate_catalog(200, seed=1)
+    engine = create_engine(InMemoryDatabase(catalog), tempfile.mkdtemp(prefix="search-test-"))
+    with offline_encoder(HashingEncoder()):
+        engine.initialize()
+    product = catalog[17]
+    assert _ids(engine.search(product["title"], top_k=5, min_score=0.0))[0] == str(product["_id"])
+
+    assert engine.remove_product(str(product["_id"]))
+    return engine, product
+
+
+def _ids(results):
+    return [r["_id"] for r in results]
+
+
+def test_remove_keeps_dense_ids(deleted):
+    engine, product = deleted
+    semantic = engine.semantic_engine
+    assert len(semantic.materials) == 200
+    assert semantic.material_count == 199
+    assert semantic.removed_rows.tolist() == [17]
+    assert str(product["_id"]) not in semantic.id_to_index
+    assert engine.product_cache.get(str(product["_id"])) is None
+    assert not engine.remove_product(str(product["_id"]))
+
+
+@pytest.mark.parametrize("fusion", ["minmax", "zscore", "rrf"])
+@pytest.mark.parametrize("exact_union", [False, True])
+def test_search_skips_tombstone(deleted, fusion, exact_union):
+    engine, product = deleted
+    results = engine.search(product["title"], top_k=20, min_score=0.0, fusion=fusion, exact_union=exact_union)
+    assert len(results) == 20
+    assert str(product["_id"]) not in _ids(results)
+
+
+def test_filtered_and_batch_search_skip_tombstone(deleted):
+    engine, product = deleted
+    query, product_id = product["title"], str(product["_id"])
+    filters = SearchFilters(categories=[product["category"]])
+    assert product_id not in _ids(engine.search(query, top_k=20, min_score=0.0, filters=filters))
+
+    batch = engine.search_batch([
+        HybridSearchRequest(query=query, top_k=20, min_score=0.0),
+        HybridSearchRequest(query=query, top_k=20, min_score=0.0, filters=filters),
+    ])
+    assert all(results and product_id not in _ids(results) for results in batch)
+
+
+def test_streamed_search_skips_tombstone(deleted):
+    engine, product = deleted
+
+    async def run():
+        return [(stage, results) async for stage, results in engine.search_stages(
+            product["title"], top_k=20, min_score=0.0
+        )]
+
+    stages = asyncio.run(run())
+    assert [stage for stage, _ in stages] == ["keyword", "final"]
+    assert all(str(product["_id"]) not in _ids(results) for _, results in stages)
+
+
+def test_keyword_only_search_skips_tombstone(deleted, monkeypatch):
+    engine, product = deleted
+    monkeypatch.setattr(engine, "state", "warming")
+    results = engine.search(product["title"], top_k=20, min_score=0.0)
+    assert results and str(product["_id"]) not in _ids(results)
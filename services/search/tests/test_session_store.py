@@ -0,0 +1,109 @@
+"""SessionStore LRU bounds, expiry sweep and disk backend"""
+import asyncio
+import os
+import time
+from typing import Any, Dict
+
+from app.services.session_store import DiskSessionBackend, SessionStore
+
+
+class Session:
+    def __init__(self, id: str, expires_at: float, turns: int = 0):
+        self.id = id
+        self.expires_at = expires_at
+        self.turns = turns
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "expires_at": self.expires_at, "turns": self.turns}
+
+
+def _live(session_id: str, ttl: float = 3600.0) -> Session:
+    return Session(session_id, time.time() + ttl)
+
+
+def test_lru_evicts_least_recently_used():
+    store = SessionStore(max_sessions=3, shards=1)
+    for session_id in ("a", "b", "c"):
+        store.save(_live(session_id))
+    assert store.get("a") is not None
+
+    store.save(_live("d"))
+    assert sorted(store) == ["a", "c", "d"]
+    assert store.get("b") is None
+    assert store.evictions == 1
+    assert store.get_stats()["max_sessions"] == 3
+
+
+def test_expired_session_is_dropped_on_access():
+    store = SessionStore(max_sessions=10, shards=2)
+    store.save(Session("old", time.time() - 1))
+    assert store.get("old") is None
+    assert "old" not in list(store)
+    assert store.expirations == 1
+
+
+def test_sweep_removes_only_due_sessions():
+    store = SessionStore(max_sessions=10, shards=2)
+    now = time.time()
+    store.save(Session("due", now + 10))
+    store.save(Session("later", now + 100))
+    extended = Session("extended", now + 10)
+    store.save(extended)
+    # Activity pushed this one's expiry out after its heap entry was queued
+    extended.expires_at = now + 100
+
+    assert store.sweep_expired(now + 50) == 1
+    assert sorted(store) == ["extended", "later"]
+    assert store.sweep_expired(now + 50) == 0
+    assert store.sweep_expired(now + 150) == 2
+    assert len(store) == 0 and store.get_stats()["pending_expiry_entries"] == 0
+
+
+def test_expiry_heap_compacts_stale_entries():
+    store = SessionStore(max_sessions=2, shards=1)
+    for i in range(50):
+        store.save(_live(f"s{i}"))
+        assert len(store._expiry) <= 2 * store.shard_capacity
+    # Only evicted sessions were dropped; the live ones are still tracked
+    assert sorted(store) == ["s48", "s49"]
+    assert {"s48", "s49"} <= {session_id for _, session_id in store._expiry}
+    assert store.evictions == 48
+
+
+def test_disk_backend_reloads_evicted_and_shared_sessions(tmp_path):
+    def backend():
+        return DiskSessionBackend(str(tmp_path), lambda data: Session(**data), ttl_seconds=3600)
+
+    store = SessionStore(max_sessions=1, shards=1, backend=backend())
+    store.save(_live("a", ttl=60))
+    store.save(_live("b", ttl=60))
+    assert "a" not in list(store)
+    assert store.get("a").id == "a"
+
+    # A second worker sees the first one's write, and vice versa
+    other = SessionStore(max_sessions=10, shards=1, backend=backend())
+
+    async def update():
+        session = await other.aget("b")
+        session.turns = 3
+        await other.asave(session)
+
+    asyncio.run(update())
+    # mtime is the version stamp; make sure the rewrite is visibly newer
+    os.utime(tmp_path / "b.json", ns=(time.time_ns() + 10**9,) * 2)
+    assert store.get("b").turns == 3
+
+    assert asyncio.run(other.adelete("a"))
+    assert store.get("a") is None and not (tmp_path / "a.json").exists()
+
+
+def test_disk_backend_purges_files_untouched_for_a_ttl(tmp_path):
+    backend = DiskSessionBackend(str(tmp_path), lambda data: Session(**data), ttl_seconds=60)
+    store = SessionStore(max_sessions=10, shards=1, backend=backend)
+    store.save(_live("fresh", ttl=60))
+    store.save(_live("stale", ttl=60))
+    stale = tmp_path / "stale.json"
+    os.utime(stale, (time.time() - 120, time.time() - 120))
+
+    assert backend.purge_expired(time.time()) == 1
+    assert not stale.exists() and (tmp_path / "fresh.json").exists()
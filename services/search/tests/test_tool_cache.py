@@ -0,0 +1,48 @@
+"""ToolResultCache version handling and near-duplicate lookups"""
+import numpy as np
+
+from app.services.tool_cache import ToolResultCache
+
+
+def _unit(*values: float) -> np.ndarray:
+    vector = np.array(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_newer_index_version_drops_entries():
+    cache = ToolResultCache()
+    cache.put("roof waterproofing", 1, [{"_id": "a"}])
+    assert cache.get("roof waterproofing", 1) == [{"_id": "a"}]
+
+    assert cache.get("roof waterproofing", 2) is None
+    assert len(cache) == 0 and cache.invalidations == 1
+
+
+def test_stale_version_does_not_overwrite_newer_entries():
+    cache = ToolResultCache()
+    # Search A reads version 1, then a webhook bumps the index to 2 and
+    # search B caches its result before A finishes
+    cache.put("cement", 2, [{"_id": "fresh"}])
+    cache.put("roof waterproofing", 1, [{"_id": "stale"}])
+
+    assert cache.get("cement", 2) == [{"_id": "fresh"}]
+    assert cache.get("roof waterproofing", 2) is None
+    assert cache.get("cement", 1) is None
+    assert cache.get("cement", 2) == [{"_id": "fresh"}]
+    assert cache.invalidations == 0
+
+
+def test_similar_query_lookup():
+    cache = ToolResultCache(max_entries=2, min_similarity=0.9)
+    assert cache.semantic
+    cache.put("cement bags", 1, [{"_id": "c"}], _unit(1, 0, 0))
+    cache.put("roof sheets", 1, [{"_id": "r"}], _unit(0, 1, 0))
+
+    assert cache.get_similar(_unit(1, 0.1, 0), 1) == ("cement bags", [{"_id": "c"}])
+    assert cache.get_similar(_unit(1, 1, 0), 1) is None
+    assert cache.get_similar(_unit(1, 0.1, 0), 0) is None
+
+    # LRU eviction also forgets the evicted query's embedding
+    cache.put("paint", 1, [{"_id": "p"}], _unit(0, 0, 1))
+    assert cache.get("roof sheets", 1) is None
+    assert cache.get_similar(_unit(0, 1, 0.1), 1) is None